@@ -14,30 +14,127 @@ Features:
 import os
 import sys
 import json
+import fcntl
+import struct
 import subprocess
+from subprocess import CalledProcessError
 import logging
 import time
-import math
+import mmap
 import datetime
 import re
+import shutil
+import functools
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import namedtuple
 
-# Try to import rich for better CLI experience
+# rich (opcional) se importa al crear la primera UIConsole, no al cargar el módulo:
+# importarlo cuesta decenas de ms que '--help' no necesita
+RICH_AVAILABLE = False
+RichConsole = Table = Panel = Prompt = Confirm = Progress = SpinnerColumn = TextColumn = Text = None
+
+
+@functools.lru_cache(maxsize=None)
+def _load_rich() -> bool:
+    """Importa rich una sola vez y publica sus clases en el módulo; retorna si está disponible"""
+    global RICH_AVAILABLE, RichConsole, Table, Panel, Prompt, Confirm, Progress, SpinnerColumn, TextColumn, Text
+    try:
+        from rich.console import Console as RichConsole
+        from rich.table import Table
+        from rich.panel import Panel
+        from rich.prompt import Prompt, Confirm
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+        from rich.text import Text
+        RICH_AVAILABLE = True
+    except ImportError:
+        RICH_AVAILABLE = False
+        print("⚠️  Para una mejor experiencia, instala rich: pip install rich")
+    return RICH_AVAILABLE
+
+# orjson (opcional) parsea la salida JSON de lsblk bastante más rápido; acepta str igual que json
 try:
-    from rich.console import Console as RichConsole
-    from rich.table import Table
-    from rich.panel import Panel
-    from rich.prompt import Prompt, Confirm
-    from rich.progress import Progress, SpinnerColumn, TextColumn
-    from rich.text import Text
-    RICH_AVAILABLE = True
+    from orjson import loads as _json_loads
 except ImportError:
-    RICH_AVAILABLE = False
-    print("⚠️  Para una mejor experiencia, instala rich: pip install rich")
+    _json_loads = json.loads
+
+# ioctl de linux/fs.h para poner a cero un rango de un dispositivo de bloques: _IO(0x12, 127)
+BLKZEROOUT = 0x127f
+
+
+@functools.lru_cache(maxsize=None)
+def _which(name: str) -> Optional[str]:
+    """Ruta absoluta de una herramienta en el PATH (cacheada, sin lanzar procesos)"""
+    return shutil.which(name)
+
+
+def _tool_exists(name: str) -> bool:
+    """Verifica si una herramienta está en el PATH"""
+    return _which(name) is not None
+
+
+@functools.lru_cache(maxsize=None)
+def _zfs_module_loaded() -> bool:
+    """Verifica si el módulo zfs está cargado leyendo /proc/modules (cacheado)"""
+    try:
+        with open('/proc/modules') as f:
+            return any(line.startswith('zfs ') for line in f)
+    except OSError:
+        return False
+
+
+# Escapes octales (\ooo) con los que el kernel codifica espacios y otros caracteres en mountinfo
+_OCTAL_ESCAPE_RE = re.compile(r'\\([0-7]{3})')
+
+
+def _read_mountinfo() -> List[Tuple[str, str, str]]:
+    """Lee /proc/self/mountinfo y retorna (dispositivo, punto de montaje, fstype) sin lanzar procesos"""
+    def unescape(value: str) -> str:
+        return _OCTAL_ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 8)), value)
+    
+    mounts = []
+    try:
+        with open('/proc/self/mountinfo') as f:
+            lines = f.readlines()
+    except OSError:
+        return mounts
+    
+    for line in lines:
+        left, sep, right = line.partition(' - ')
+        fields, fs_fields = left.split(), right.split()
+        if not sep or len(fields) < 5 or len(fs_fields) < 2:
+            continue
+        
+        fstype, source = fs_fields[0], unescape(fs_fields[1])
+        # /dev/root (típico en Raspberry Pi) no es un nodo real: resolver por major:minor
+        if not source.startswith('/dev/') or source == '/dev/root':
+            sys_path = f'/sys/dev/block/{fields[2]}'
+            if os.path.exists(sys_path):
+                source = f'/dev/{os.path.basename(os.path.realpath(sys_path))}'
+        mounts.append((source, unescape(fields[4]), fstype))
+    
+    return mounts
+
+
+def _render_retention_config(retention_config: Dict[str, int], current_config: Dict[str, str]) -> str:
+    """Genera /etc/default/zfs-auto-snapshot; las frecuencias no indicadas conservan su valor actual"""
+    values = {freq.upper(): str(retention_config.get(freq, current_config.get(freq.upper(), '0')))
+              for freq in _SNAPSHOT_FREQUENCY_NAMES}
+    values['timestamp'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return _ZFS_AUTO_SNAPSHOT_TEMPLATE % values
+
+
+def _parse_ini_lines(data: str):
+    """Genera pares (clave, valor) de un archivo CLAVE=valor, ignorando comentarios"""
+    for line in data.splitlines():
+        key, sep, value = line.partition('=')
+        if sep and not key.lstrip().startswith('#'):
+            yield key.strip(), value.strip()
+
 
 class RAIDType(Enum):
     """Tipos de RAID soportados"""
@@ -57,6 +154,154 @@ class FilesystemType(Enum):
     ZFS = "zfs"
     BTRFS = "btrfs"
 
+# Opciones de RAID por filesystem: (tecla, tipo, discos mínimos, descripción)
+ZFS_RAID_OPTIONS = [
+    ("1", RAIDType.STRIPE, 1, "Stripe - Sin redundancia, máximo rendimiento"),
+    ("2", RAIDType.MIRROR, 2, "Mirror - Datos duplicados (50% capacidad)"),
+    ("3", RAIDType.RAIDZ1, 3, "RAIDZ1 - Tolerancia a 1 fallo (equivalente RAID 5)"),
+    ("4", RAIDType.RAIDZ2, 4, "RAIDZ2 - Tolerancia a 2 fallos (equivalente RAID 6)"),
+    ("5", RAIDType.RAIDZ3, 5, "RAIDZ3 - Tolerancia a 3 fallos"),
+]
+
+BTRFS_RAID_OPTIONS = [
+    ("1", RAIDType.BTRFS_RAID0, 1, "RAID 0 - Sin redundancia, máximo rendimiento"),
+    ("2", RAIDType.BTRFS_RAID1, 2, "RAID 1 - Datos duplicados (50% capacidad)"),
+    ("3", RAIDType.BTRFS_RAID10, 4, "RAID 10 - Combinación RAID 0+1 (requiere 4+ discos)"),
+    ("4", RAIDType.BTRFS_RAID5, 3, "RAID 5 - Tolerancia a 1 fallo ⚠️ EXPERIMENTAL"),
+    ("5", RAIDType.BTRFS_RAID6, 4, "RAID 6 - Tolerancia a 2 fallos ⚠️ EXPERIMENTAL"),
+]
+
+# Agrupaciones de tipos de RAID para comprobaciones de pertenencia
+_NO_REDUNDANCY = frozenset({RAIDType.STRIPE, RAIDType.BTRFS_RAID0})
+_MIRROR_LIKE = frozenset({RAIDType.MIRROR, RAIDType.BTRFS_RAID1})
+_EXPERIMENTAL = frozenset({RAIDType.BTRFS_RAID5, RAIDType.BTRFS_RAID6})
+
+# Nombres válidos de pool y dataset: solo letras, números, _ y - (ASCII)
+_VALID_NAME_RE = re.compile(r'[A-Za-z0-9_-]+\Z')
+
+# Palabra clave de vdev para 'zpool create' (stripe no lleva ninguna)
+_ZFS_VDEV_KEYWORDS = {
+    RAIDType.MIRROR: "mirror",
+    RAIDType.RAIDZ1: "raidz1",
+    RAIDType.RAIDZ2: "raidz2",
+    RAIDType.RAIDZ3: "raidz3",
+}
+
+# Opciones de montaje BTRFS para fstab: compresión zstd, noatime y cache de espacio v2
+_BTRFS_FSTAB_OPTS = "defaults,compress=zstd,noatime,space_cache=v2"
+
+# Parámetros del módulo zfs para que un L2ARC recién añadido sea efectivo: cachear también
+# lecturas secuenciales y alimentar la cache a 128 MiB por ciclo (el defecto es 8 MiB)
+_L2ARC_TUNABLES = {
+    'l2arc_noprefetch': '0',
+    'l2arc_write_max': str(128 * 1024**2),
+    'l2arc_write_boost': str(128 * 1024**2),
+}
+
+# secondarycache por caso de uso una vez hay L2ARC: el streaming se lee una sola vez, así que
+# solo compensa llevar metadatos al L2ARC (el resto de casos de uso mantiene el defecto 'all')
+_L2ARC_WORKLOAD_PROPERTIES = {
+    'media': [('secondarycache', 'metadata', 'L2ARC solo para metadatos (el streaming no se relee)')],
+}
+
+# Explicación de L2ARC y SLOG que se muestra antes de elegir cache devices
+_CACHE_INFO_TEXT = (
+    "🚀 L2ARC (Level 2 Adaptive Replacement Cache):\n"
+    "   • Cache de segundo nivel para lecturas frecuentes\n"
+    "   • Ideal: SSD rápido (NVMe > SATA SSD)\n"
+    "   • Mejora rendimiento de lectura en datasets accedidos frecuentemente\n"
+    "   • No es crítico - si falla, el pool sigue funcionando\n\n"
+    "📝 SLOG (Separate Intent Log):\n"
+    "   • Log de transacciones para escrituras síncronas\n"
+    "   • Ideal: SSD con baja latencia (NVMe recomendado)\n"
+    "   • Mejora rendimiento de escrituras síncronas (bases de datos, VMs)\n"
+    "   • Crítico para integridad - usar dispositivos confiables"
+)
+
+# Retención recomendada de snapshots por opción de frecuencia
+_SNAPSHOT_RETENTION_DEFAULTS = {
+    "1": {'daily': 30},
+    "2": {'weekly': 12},
+    "3": {'monthly': 12},
+    "4": {'daily': 30, 'weekly': 12},
+    "5": {'weekly': 12, 'monthly': 12},
+    "6": {'hourly': 24, 'daily': 30, 'weekly': 12, 'monthly': 12},
+}
+_SNAPSHOT_FREQUENCY_NAMES = {
+    'hourly': "por hora",
+    'daily': "diarios",
+    'weekly': "semanales",
+    'monthly': "mensuales",
+}
+
+# Ayuda de acceso a snapshots; se imprime de una vez con la ruta del dataset interpolada
+_SNAPSHOT_ACCESS_METHODS_TEMPLATE = """         
+         📁 1. Acceso directo por navegación:
+            cd {dataset_path}/.zfs/snapshot/
+            ls -la                    # Ver todos los snapshots
+            cd auto-2024MMDD-HHMM/    # Entrar en snapshot específico
+            
+         📁 2. Restaurar archivos específicos:
+            cp {dataset_path}/.zfs/snapshot/SNAPSHOT_NAME/archivo.txt {dataset_path}/
+            # Copia archivo desde snapshot a ubicación actual
+            
+         📁 3. Explorar contenido de snapshots:
+            find {dataset_path}/.zfs/snapshot/ -name '*archivo*' -type f
+            # Busca archivos en todos los snapshots
+            
+         📁 4. Comparar versiones:
+            diff {dataset_path}/archivo.txt {dataset_path}/.zfs/snapshot/SNAPSHOT/archivo.txt
+            # Compara archivo actual con versión en snapshot
+            
+         💡 Los snapshots son de solo lectura y no ocupan espacio inicialmente
+         💡 Solo los cambios posteriores al snapshot consumen espacio adicional"""
+
+# Plantilla de /etc/default/zfs-auto-snapshot; solo se interpolan la fecha y las retenciones
+_ZFS_AUTO_SNAPSHOT_TEMPLATE = """# ZFS Auto-Snapshot Configuration
+# Configurado por raid_manager.py - %(timestamp)s
+
+# Número de snapshots a mantener para cada frecuencia
+# 0 = deshabilitado, >0 = número de snapshots a conservar
+
+# Snapshots por hora (0-24 recomendado)
+HOURLY=%(HOURLY)s
+
+# Snapshots diarios (7-60 recomendado)
+DAILY=%(DAILY)s
+
+# Snapshots semanales (4-12 recomendado)
+WEEKLY=%(WEEKLY)s
+
+# Snapshots mensuales (6-24 recomendado)
+MONTHLY=%(MONTHLY)s
+
+# Configuraciones adicionales
+VERBOSE=false
+DRYRUN=false
+"""
+
+# Discos que se protegen siempre: TODA la familia mmcblk0 (Raspberry Pi) y el NVMe del sistema
+_PROTECTED_DISKS = frozenset({'mmcblk0', 'mmcblk0boot0', 'mmcblk0boot1', 'mmcblk0rpmb', 'nvme0n1'})
+
+# Unidades binarias para mostrar tamaños (B, KB = 2^10, MB = 2^20, ...)
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+def _format_size(value) -> str:
+    """Convierte bytes (int o texto de 'zfs/zpool list -p') a formato legible; '-' y similares se devuelven tal cual"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if size < 1024:
+        return f"{size:.1f} B"
+    # La unidad sale directamente de la posición del bit más alto (cada unidad son 10 bits)
+    index = min((size.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size / (1 << (10 * index)):.1f} {_SIZE_UNITS[index]}"
+
+# Filas de 'zpool list -H -p' y 'zfs list -H -p' (mismo orden que las columnas pedidas con -o)
+ZpoolRow = namedtuple('ZpoolRow', 'name size allocated free health altroot')
+ZfsDatasetRow = namedtuple('ZfsDatasetRow', 'name used avail mountpoint compression')
+
 @dataclass
 class Disk:
     """Representa un disco en el sistema"""
@@ -69,20 +314,20 @@ class Disk:
     has_partitions: bool = False
     filesystem_type: Optional[str] = None
     mount_points: List[str] = field(default_factory=list)
+    cache_class: Optional[str] = None  # 'nvme', 'ssd' o 'hdd'; se clasifica al buscar cache devices
     
     @property
     def device_path(self) -> str:
         return f"/dev/{self.name}"
     
+    def partition_name(self, number: int) -> str:
+        """Nombre de la partición N (el kernel añade 'p' si el nombre acaba en dígito: nvme0n1p1, mmcblk0p1)"""
+        return f"{self.name}{'p' if self.name[-1].isdigit() else ''}{number}"
+    
     @property
     def size_human(self) -> str:
         """Tamaño en formato legible"""
-        size = self.size
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024:
-                return f"{size:.1f} {unit}"
-            size /= 1024
-        return f"{size:.1f} PB"
+        return _format_size(self.size)
 
 @dataclass
 class Pool:
@@ -105,7 +350,7 @@ class UIConsole:
     """Manejo de la interfaz de usuario"""
     
     def __init__(self):
-        if RICH_AVAILABLE:
+        if _load_rich():
             self.console = RichConsole()
         else:
             self.console = None
@@ -276,7 +521,7 @@ class RequirementsChecker:
                                           capture_output=True)
                     self.console.print(f"   ✅ python3-{package} instalado desde repositorios", style="green")
                     success_count += 1
-                except subprocess.CalledProcessError as e:
+                except CalledProcessError as e:
                     self.console.print(f"   ❌ Error instalando python3-{package}: {e}", style="red")
             else:
                 # Para otros paquetes futuros, usar la misma estrategia
@@ -286,7 +531,7 @@ class RequirementsChecker:
                                           capture_output=True)
                     self.console.print(f"   ✅ python3-{package} instalado desde repositorios", style="green")
                     success_count += 1
-                except subprocess.CalledProcessError as e:
+                except CalledProcessError as e:
                     self.console.print(f"   ❌ Error instalando python3-{package}: {e}", style="red")
         
         # Evaluar resultado
@@ -353,7 +598,7 @@ class RequirementsChecker:
                 result = self.system.run_command(['btrfs', '--version'], capture_output=True)
                 version = result.stdout.strip().split()[-1] if result.stdout else "desconocida"
                 self.console.print(f"✅ BTRFS disponible (versión: {version})", style="green")
-            except subprocess.CalledProcessError:
+            except CalledProcessError:
                 self.console.print("⚠️  BTRFS detectado pero con problemas", style="yellow")
         else:
             self.console.print("❌ BTRFS no disponible", style="red")
@@ -365,10 +610,10 @@ class RequirementsChecker:
         if zfs_ok:
             try:
                 result = self.system.run_command(['zpool', '--version'], capture_output=True)
-                version_line = result.stdout.strip().split('\n')[0] if result.stdout else ""
+                version_line = result.stdout.strip().partition('\n')[0] if result.stdout else ""
                 version = version_line.split()[-1] if version_line else "desconocida"
                 self.console.print(f"✅ ZFS disponible (versión: {version})", style="green")
-            except subprocess.CalledProcessError:
+            except CalledProcessError:
                 self.console.print("⚠️  ZFS detectado pero con problemas", style="yellow")
         else:
             self.console.print("❌ ZFS no disponible", style="red")
@@ -386,11 +631,7 @@ class RequirementsChecker:
     
     def _command_exists(self, command: str) -> bool:
         """Verifica si un comando existe en el sistema"""
-        try:
-            self.system.run_command(['which', command], capture_output=True, use_sudo=False)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return _tool_exists(command)
     
     def _show_tools_summary(self, tools_status: dict):
         """Muestra resumen de herramientas disponibles"""
@@ -425,7 +666,7 @@ class RequirementsChecker:
         self.console.print("🔄 Actualizando lista de paquetes...")
         try:
             self.system.run_command(['apt', 'update'], capture_output=False)
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("⚠️  Error actualizando lista de paquetes", style="yellow")
         
         # Instalar paquetes básicos
@@ -484,7 +725,7 @@ class RequirementsChecker:
         self.console.print("🔄 Actualizando lista de paquetes...")
         try:
             self.system.run_command(['apt', 'update'], capture_output=True)
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("⚠️  Error actualizando lista de paquetes", style="yellow")
         
         # Instalar cada herramienta según lo que falte
@@ -557,7 +798,7 @@ class RequirementsChecker:
         self.console.print("🔄 Actualizando lista de paquetes...")
         try:
             self.system.run_command(['apt', 'update'], capture_output=True)
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("⚠️  Error actualizando lista de paquetes", style="yellow")
         
         # Instalar herramienta específica
@@ -620,8 +861,11 @@ class RequirementsChecker:
                 
                 self.console.print(f"   ✅ {package} instalado", style="green")
                 
-            except subprocess.CalledProcessError:
+            except CalledProcessError:
                 self.console.print(f"   ❌ Error instalando {package}", style="red")
+        
+        # Los binarios instalados invalidan la caché de herramientas
+        _which.cache_clear()
 
 class SystemManager:
     """Gestión de operaciones del sistema"""
@@ -633,8 +877,13 @@ class SystemManager:
         self.sudo_commands = {
             'umount', 'mount', 'mkfs', 'wipefs', 'dd', 'zpool', 'zfs', 
             'btrfs', 'mdadm', 'pvremove', 'vgchange', 'vgreduce', 'lvremove',
-            'partprobe', 'sgdisk', 'mkdir', 'chown', 'chmod', 'apt', 'pip', 'pip3'
+            'partprobe', 'sgdisk', 'mkdir', 'chown', 'chmod', 'apt', 'pip', 'pip3', 'tee',
+            'blkdiscard'
         }
+        # El euid no cambia durante la ejecución; sudo solo se cachea cuando funciona
+        # (si pedía contraseña, un comando posterior puede haberla cacheado)
+        self._is_root = os.geteuid() == 0
+        self._sudo_ok = False
     
     def _setup_logging(self) -> logging.Logger:
         """Configura el logging"""
@@ -658,7 +907,8 @@ class SystemManager:
     
     def run_command(self, command: List[str], check: bool = True, 
                    capture_output: bool = True, show_errors: bool = False,
-                   use_sudo: bool = None) -> subprocess.CompletedProcess:
+                   use_sudo: bool = None, input: Optional[str] = None,
+                   discard_output: bool = False) -> subprocess.CompletedProcess:
         """Ejecuta un comando del sistema con sudo automático cuando sea necesario"""
         
         # Determinar si necesita sudo automáticamente
@@ -674,14 +924,23 @@ class SystemManager:
         
         try:
             self.logger.info(f"Ejecutando: {' '.join(command)}")
+            # Pasar la ruta ya resuelta evita que el hijo recorra el PATH probando execve
+            executable = _which(command[0]) if '/' not in command[0] else None
+            if discard_output:
+                # Solo interesa el código de salida: stdout a /dev/null, stderr se conserva para el log
+                streams = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.PIPE}
+            else:
+                streams = {'capture_output': capture_output}
             result = subprocess.run(
                 command,
+                executable=executable,
                 check=check,
-                capture_output=capture_output,
-                text=True
+                input=input,
+                text=True,
+                **streams
             )
             return result
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             # Asegurar que stderr esté disponible en la excepción
             if hasattr(e, 'stderr') and e.stderr:
                 error_detail = e.stderr.strip()
@@ -707,22 +966,104 @@ class SystemManager:
     def run_command_safe(self, command: List[str], show_errors: bool = False) -> bool:
         """Ejecuta un comando de forma segura, retorna True si fue exitoso"""
         try:
-            self.run_command(command, check=True, show_errors=show_errors)
+            self.run_command(command, check=True, show_errors=show_errors, discard_output=True)
+            return True
+        except CalledProcessError:
+            return False
+    
+    def write_file(self, path: str, content: str, atomic: bool = True) -> bool:
+        """Escribe un archivo del sistema: como root sin lanzar procesos, si no con 'tee' (sudo automático)"""
+        if self.is_root():
+            try:
+                if not atomic:
+                    # Archivos especiales (p. ej. parámetros en /sys) no admiten rename
+                    with open(path, 'w') as f:
+                        f.write(content)
+                    return True
+                
+                # Temporal en el mismo directorio para que el rename sea atómico; fsync para
+                # que un corte de luz no deje el archivo a medias
+                temp_path = f'{path}.tmp'
+                try:
+                    mode = os.stat(path).st_mode & 0o7777
+                except FileNotFoundError:
+                    mode = 0o644
+                with open(temp_path, 'w') as f:
+                    # El rename sustituye el inodo: conservar los permisos del original
+                    os.fchmod(f.fileno(), mode)
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+                return True
+            except OSError as e:
+                self.logger.error(f"Error escribiendo {path}: {e}")
+                return False
+        
+        try:
+            self.run_command(['tee', path], input=content)
+            return True
+        except (CalledProcessError, OSError):
+            return False
+    
+    def make_dirs(self, path: str) -> bool:
+        """Crea un directorio (y sus padres) en proceso; sin permisos recurre a 'mkdir -p' con sudo"""
+        try:
+            Path(path).mkdir(parents=True, exist_ok=True)
             return True
-        except subprocess.CalledProcessError:
+        except PermissionError:
+            return self.run_command_safe(['mkdir', '-p', path])
+        except OSError as e:
+            self.logger.error(f"Error creando {path}: {e}")
+            return False
+    
+    def get_rotational_map(self, names: List[str]) -> Dict[str, bool]:
+        """Indica para cada disco si es rotacional, leyendo sysfs (un solo lsblk para los que falten)"""
+        rotational = {}
+        for name in names:
+            try:
+                with open(f'/sys/class/block/{name}/queue/rotational') as f:
+                    rotational[name] = f.read(1) == '1'
+            except OSError:
+                pass
+        
+        missing = [name for name in names if name not in rotational]
+        if missing:
+            result = self.run_command(['lsblk', '-d', '-n', '-o', 'NAME,ROTA', *(f'/dev/{name}' for name in missing)],
+                                      check=False)
+            for fields in (line.split() for line in result.stdout.splitlines()):
+                if len(fields) == 2:
+                    rotational[fields[0]] = fields[1] == '1'
+        return rotational
+    
+    def apt_lists_are_fresh(self, max_age: int = 3600) -> bool:
+        """Indica si las listas de paquetes de apt se actualizaron hace menos de max_age segundos"""
+        try:
+            return time.time() - os.path.getmtime('/var/lib/apt/lists') < max_age
+        except OSError:
             return False
     
+    def run_commands_parallel(self, commands: List[List[str]], max_workers: int = 4) -> List[bool]:
+        """Ejecuta comandos independientes en paralelo, retorna el éxito de cada uno en orden"""
+        if not commands:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(commands))) as executor:
+            return list(executor.map(self.run_command_safe, commands))
+    
     def is_root(self) -> bool:
         """Verifica si el script se ejecuta como root"""
-        return os.geteuid() == 0
+        return self._is_root
     
     def check_sudo(self) -> bool:
-        """Verifica disponibilidad de sudo"""
-        try:
-            self.run_command(['sudo', '-n', 'true'], use_sudo=False)
+        """Verifica disponibilidad de sudo (sin volver a lanzar 'sudo -n true' una vez confirmado)"""
+        if self._sudo_ok:
             return True
-        except subprocess.CalledProcessError:
-            return False
+        try:
+            self.run_command(['sudo', '-n', 'true'], use_sudo=False, discard_output=True)
+            self._sudo_ok = True
+        except CalledProcessError:
+            pass
+        return self._sudo_ok
 
 class DiskManager:
     """Gestión de discos del sistema"""
@@ -738,12 +1079,13 @@ class DiskManager:
         disks = []
         try:
             # Usar lsblk para obtener información de discos
+            # -b: tamaños en bytes, sin tener que interpretar "931.5G"
             result = self.system.run_command([
-                'lsblk', '-J', '-o', 
+                'lsblk', '-J', '-b', '-o', 
                 'NAME,SIZE,MODEL,SERIAL,PHY-SEC,TYPE,MOUNTPOINT,FSTYPE'
             ])
             
-            data = json.loads(result.stdout)
+            data = _json_loads(result.stdout)
             system_disks = self._get_system_disks()
             
             for device in data['blockdevices']:
@@ -757,73 +1099,40 @@ class DiskManager:
             
         return disks
     
-    def _get_system_disks(self) -> set:
-        """Obtiene lista de discos del sistema que no deben tocarse"""
-        system_disks = set()
+    def snapshot_block_devices(self) -> Dict[str, Dict]:
+        """Obtiene una instantánea de los dispositivos de bloque con un único lsblk --json"""
         try:
-            # Disco raíz
-            result = self.system.run_command(['findmnt', '-n', '-o', 'SOURCE', '/'])
-            root_device = result.stdout.strip()
-            if root_device:
-                # Extraer nombre del disco (sin partición)
-                disk_name = root_device.split('/')[-1].rstrip('0123456789')
-                system_disks.add(disk_name)
-                
-            # Otros puntos de montaje críticos del sistema
-            critical_mounts = ['/boot', '/usr', '/var', '/etc', '/lib', '/bin', '/sbin', '/home']
-            for mount_point in critical_mounts:
-                try:
-                    result = self.system.run_command(['findmnt', '-n', '-o', 'SOURCE', mount_point])
-                    device = result.stdout.strip()
-                    if device:
-                        disk_name = device.split('/')[-1].rstrip('0123456789')
-                        system_disks.add(disk_name)
-                except subprocess.CalledProcessError:
-                    continue
-            
-            # Detectar todos los dispositivos montados con filesystems críticos
-            try:
-                result = self.system.run_command(['findmnt', '-rn', '-o', 'SOURCE,TARGET'])
-                for line in result.stdout.strip().split('\n'):
-                    if line.strip():
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            device = parts[0]
-                            mount_point = parts[1]
-                            
-                            # Si está montado en puntos críticos del sistema
-                            if any(mount_point.startswith(critical) for critical in ['/', '/boot', '/usr', '/var', '/etc']):
-                                if device.startswith('/dev/'):
-                                    disk_name = device.split('/')[-1].rstrip('0123456789')
-                                    system_disks.add(disk_name)
-            except subprocess.CalledProcessError:
-                pass
-            
-            # PROTECCIÓN CRÍTICA: Agregar TODA la familia mmcblk0 (Raspberry Pi)
-            # Esto incluye mmcblk0, mmcblk0boot0, mmcblk0boot1, mmcblk0rpmb, etc.
-            system_disks.add('mmcblk0')
-            # También proteger cualquier variante de mmcblk0
-            system_disks.add('mmcblk0boot0')
-            system_disks.add('mmcblk0boot1')
-            system_disks.add('mmcblk0rpmb')
-            
-            # Proteger otros dispositivos típicos del sistema
-            system_disks.add('nvme0n1')  # SSD NVMe del sistema
-                    
-        except Exception as e:
-            self.console.print(f"⚠️  Error detectando discos del sistema: {e}", style="yellow")
-            # Fallback de seguridad: agregar discos típicos del sistema
-            system_disks.update(['sda', 'mmcblk0', 'mmcblk0boot0', 'mmcblk0boot1', 'mmcblk0rpmb', 'nvme0n1'])
-            
-        return system_disks
-    
-    def _parse_disk_info(self, device: dict, system_disks: set) -> Optional[Disk]:
+            result = self.system.run_command([
+                'lsblk', '-J', '-b', '-o', 'NAME,SIZE,TYPE,MOUNTPOINT,FSTYPE'
+            ])
+            data = _json_loads(result.stdout)
+        except (CalledProcessError, ValueError):
+            return {}
+        
+        # Indexar por nombre de disco; las particiones quedan en 'children'
+        return {device['name']: device for device in data.get('blockdevices', [])}
+    
+    @staticmethod
+    def iter_descendants(device: Dict):
+        """Recorre particiones y dispositivos anidados de una entrada de lsblk --json"""
+        for child in device.get('children', []):
+            yield child
+            yield from DiskManager.iter_descendants(child)
+    
+    def _get_system_disks(self) -> frozenset:
+        """Discos del sistema que se protegen siempre, estén o no montados"""
+        # Los discos montados se detectan en _parse_disk_info con los datos del mismo lsblk
+        return _PROTECTED_DISKS
+    
+    def _parse_disk_info(self, device: dict, system_disks: frozenset) -> Optional[Disk]:
         """Parsea información de un disco desde lsblk"""
         name = device['name']
         
-        # Convertir tamaño a bytes
-        size_str = device['size']
-        size_bytes = self._parse_size(size_str)
+        # Tamaño en bytes (lsblk -b); según la versión llega como número o como cadena
+        try:
+            size_bytes = int(device.get('size') or 0)
+        except (TypeError, ValueError):
+            size_bytes = 0
         
         # Filtrar discos con tamaño 0 o inválido
         if size_bytes <= 0:
@@ -848,9 +1157,13 @@ class DiskManager:
                     filesystem_type = child['fstype']
                 if child.get('mountpoint'):
                     mount_points.append(child['mountpoint'])
-                    # Si tiene montajes críticos del sistema, marcarlo como sistema
-                    if child['mountpoint'] in ['/', '/boot', '/usr', '/var', '/etc', '/lib', '/bin', '/sbin']:
-                        is_system_disk = True
+        
+        # Si el disco o algo por debajo (particiones, LVM, cifrado) está montado, está en uso:
+        # marcarlo como sistema para que el asistente no lo ofrezca (la swap no cuenta)
+        for node in (device, *DiskManager.iter_descendants(device)):
+            mount_point = node.get('mountpoint')
+            if mount_point and mount_point != '[SWAP]':
+                is_system_disk = True
         
         return Disk(
             name=name,
@@ -863,40 +1176,6 @@ class DiskManager:
             filesystem_type=filesystem_type,
             mount_points=mount_points
         )
-    
-    def _parse_size(self, size_str: str) -> int:
-        """Convierte string de tamaño a bytes"""
-        if not size_str:
-            return 0
-            
-        # Normalizar formato (cambiar comas por puntos)
-        size_str = size_str.replace(',', '.').upper().strip()
-        
-        multipliers = {
-            'B': 1,
-            'K': 1024,
-            'M': 1024**2,
-            'G': 1024**3,
-            'T': 1024**4,
-            'P': 1024**5
-        }
-        
-        # Buscar sufijo
-        for suffix, multiplier in multipliers.items():
-            if size_str.endswith(suffix):
-                try:
-                    number_str = size_str[:-1].strip()
-                    number = float(number_str)
-                    return int(number * multiplier)
-                except ValueError:
-                    break
-        
-        # Sin sufijo, asumir bytes
-        try:
-            # Intentar parsear como número directo
-            return int(float(size_str))
-        except ValueError:
-            return 0
 
 class RAIDManager:
     """Gestor principal de RAID"""
@@ -907,6 +1186,17 @@ class RAIDManager:
         self.disk_manager = DiskManager(self.system, self.console)
         self.requirements_checker = RequirementsChecker(self.console, self.system)
         self.raid_tools_status = {}  # Cache del estado de herramientas RAID
+        self._zfs_autosnapshot_verified: Optional[bool] = None  # Cache por sesión de datasets
+        self._cached_disks: Optional[List[Disk]] = None  # Discos detectados en la sesión del asistente
+        self._zfs_use_case: Optional[str] = None  # Caso de uso elegido para el último pool ZFS
+        
+        # Resolver una sola vez la variante de presentación (Rich o texto plano)
+        if RICH_AVAILABLE:
+            self._show_disk_selection_table = self._show_disk_selection_table_rich
+            self._show_raid_summary_tables = self._show_raid_summary_tables_rich
+        else:
+            self._show_disk_selection_table = self._show_disk_selection_table_plain
+            self._show_raid_summary_tables = self._show_raid_summary_tables_plain
         
     def run(self):
         """Punto de entrada principal del programa"""
@@ -929,6 +1219,13 @@ class RAIDManager:
     def _update_raid_tools_status(self):
         """Actualiza el cache del estado de herramientas RAID"""
         self.raid_tools_status = self.requirements_checker._check_raid_tools()
+        # Forzar un nuevo sondeo de ZFS tras posibles instalaciones
+        self.__dict__.pop('zfs_available', None)
+    
+    @functools.cached_property
+    def zfs_available(self) -> bool:
+        """Indica si las herramientas ZFS están instaladas (se sondea una sola vez)"""
+        return _tool_exists('zpool')
     
     def _show_banner(self):
         """Muestra el banner inicial del programa"""
@@ -1007,23 +1304,22 @@ class RAIDManager:
         if not self.system.is_root() and not self.system.check_sudo():
             self.console.print("⚠️  Algunas funciones requieren permisos de administrador", style="yellow")
         
-        found_anything = False
-        
-        # Detectar pools ZFS
-        if self._detect_zfs_pools():
-            found_anything = True
-        
-        # Detectar filesystems BTRFS
-        if self._detect_btrfs_filesystems():
-            found_anything = True
-        
-        # Detectar arrays MDADM
-        if self._detect_mdadm_arrays():
-            found_anything = True
+        # Sondear ZFS, BTRFS, MDADM y LVM en paralelo (cada sondeo espera a su propio proceso)
+        # y mostrar después los detalles en orden fijo para no mezclar la salida
+        detectors = [
+            (self._detect_zfs_pools, self._show_zfs_pools_detailed),
+            (self._detect_btrfs_filesystems, self._show_btrfs_detailed),
+            (self._detect_mdadm_arrays, self._show_mdadm_detailed),
+            (self._detect_lvm_volumes, self._show_lvm_detailed),
+        ]
+        with ThreadPoolExecutor(max_workers=len(detectors)) as executor:
+            futures = [executor.submit(detect) for detect, _ in detectors]
+            found = [future.result() for future in futures]
         
-        # Detectar Volume Groups LVM
-        if self._detect_lvm_volumes():
-            found_anything = True
+        for (_, show_detailed), present in zip(detectors, found):
+            if present:
+                show_detailed()
+        found_anything = any(found)
         
         # Si no se encontró nada
         if not found_anything:
@@ -1060,7 +1356,7 @@ class RAIDManager:
         try:
             self.system.run_command(['apt', 'update'], capture_output=True)
             self.console.print("✅ Lista de paquetes actualizada", style="green")
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("❌ Error actualizando lista de paquetes", style="red")
             return
         
@@ -1084,7 +1380,7 @@ class RAIDManager:
                         package_status[package] = "actualizado"
                 else:
                     package_status[package] = "no_instalado"
-            except subprocess.CalledProcessError:
+            except CalledProcessError:
                 package_status[package] = "error"
         
         # Mostrar estado actual
@@ -1215,7 +1511,7 @@ class RAIDManager:
             # Actualizar cache del estado de herramientas después de la actualización
             self._update_raid_tools_status()
                 
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error actualizando paquetes: {e}", style="red")
     
     def _install_required_packages(self, packages: list):
@@ -1242,6 +1538,9 @@ class RAIDManager:
                 self.console.print(f"   ✅ {package} instalado", style="green")
                 success_count += 1
             
+            # Los binarios instalados invalidan la caché de herramientas
+            _which.cache_clear()
+            
             self.console.print_panel(
                 f"✅ {success_count} paquetes instalados exitosamente.\n"
                 "💡 Reinicia el script para aprovechar todas las funcionalidades.",
@@ -1270,7 +1569,7 @@ class RAIDManager:
             # Actualizar cache del estado de herramientas después de la instalación
             self._update_raid_tools_status()
                 
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error instalando paquetes: {e}", style="red")
     
     def fix_realtek_rtl8125_driver(self):
@@ -1345,7 +1644,7 @@ class RAIDManager:
             
             return rtl8125_devices
             
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("❌ Error ejecutando lspci", style="red")
             return []
 
@@ -1383,7 +1682,7 @@ class RAIDManager:
                         issues.append(f"Dispositivo usando driver desconocido '{driver}': {current_device}")
                     # Si es r8125, está correcto, no añadir a issues
                     
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             issues.append("Error verificando estado del driver con lspci")
             
         return issues
@@ -1474,7 +1773,7 @@ class RAIDManager:
             
             return True
             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print_panel(
                 f"❌ Error durante la instalación del driver:\n{str(e)}",
                 title="❌ Error de Instalación",
@@ -1494,7 +1793,7 @@ class RAIDManager:
         try:
             result = self.system.run_command(['uname', '-r'], capture_output=True)
             return result.stdout.strip()
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             return "$(uname -r)"  # Fallback
 
     def recover_raid_after_reinstall(self):
@@ -1605,7 +1904,7 @@ class RAIDManager:
             for line in result.stdout.split('\n'):
                 line = line.strip()
                 if line.startswith('pool:'):
-                    current_pool = line.split('pool:')[1].strip()
+                    current_pool = line.partition('pool:')[2].strip()
                     pools_found.append(current_pool)
             
             if not pools_found:
@@ -1615,7 +1914,7 @@ class RAIDManager:
                     # Parsear esta salida también
                     for line in result.stdout.split('\n'):
                         if line.strip().startswith('pool:'):
-                            pool_name = line.split('pool:')[1].strip()
+                            pool_name = line.partition('pool:')[2].strip()
                             if pool_name not in pools_found:
                                 pools_found.append(pool_name)
                 except:
@@ -1649,7 +1948,7 @@ class RAIDManager:
                             else:
                                 self.console.print(f"   ❌ Error verificando pool '{pool}'", style="red")
                                 
-                        except subprocess.CalledProcessError as e:
+                        except CalledProcessError as e:
                             # Capturar stderr para mostrar el error específico
                             error_msg = e.stderr.strip() if hasattr(e, 'stderr') and e.stderr else str(e)
                             
@@ -1674,7 +1973,7 @@ class RAIDManager:
             else:
                 self.console.print("   ℹ️ No se encontraron pools ZFS para importar", style="blue")
                 
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("   ❌ Error ejecutando zpool import", style="red")
         
         return recovered
@@ -1696,7 +1995,7 @@ class RAIDManager:
                         style="blue"
                     )
                     return
-            except subprocess.CalledProcessError:
+            except CalledProcessError:
                 pass  # Pool no está activo, continuar diagnóstico
             
             # 2. Verificar disponibilidad de dispositivos
@@ -1725,7 +2024,7 @@ class RAIDManager:
                             title=f"🔍 Diagnóstico: {pool_name}",
                             style="yellow"
                         )
-            except subprocess.CalledProcessError as e:
+            except CalledProcessError as e:
                 self.console.print(f"   ❌ Error obteniendo información detallada: {e.stderr if hasattr(e, 'stderr') else e}")
             
             # 3. Verificar cachés ZFS
@@ -1736,7 +2035,7 @@ class RAIDManager:
                     self.console.print("   ✅ Pool encontrado en caché ZFS")
                 else:
                     self.console.print("   ⚠️ Pool no encontrado en caché ZFS")
-            except subprocess.CalledProcessError:
+            except CalledProcessError:
                 self.console.print("   ℹ️ No se pudo verificar caché ZFS")
             
             # 4. Sugerir acciones de recuperación
@@ -1800,7 +2099,7 @@ class RAIDManager:
             else:
                 self.console.print("Opción inválida")
                 
-        except (ValueError, subprocess.CalledProcessError) as e:
+        except (ValueError, CalledProcessError) as e:
             self.console.print(f"❌ Error: {e}", style="red")
 
     def _recover_btrfs_filesystems(self) -> list:
@@ -1825,12 +2124,12 @@ class RAIDManager:
                             'uuid': current_uuid,
                             'devices': current_devices.copy()
                         })
-                    current_uuid = line.split('uuid:')[1].strip()
+                    current_uuid = line.partition('uuid:')[2].strip()
                     current_devices = []
                 elif line.startswith('devid') and 'path' in line:
                     # Extraer ruta del dispositivo
                     if 'path ' in line:
-                        device_path = line.split('path ')[1].strip()
+                        device_path = line.partition('path ')[2].strip()
                         current_devices.append(device_path)
             
             # Agregar último filesystem si existe
@@ -1872,24 +2171,24 @@ class RAIDManager:
                                 
                                 try:
                                     # Crear directorio de montaje
-                                    self.system.run_command(['mkdir', '-p', mountpoint], capture_output=True)
+                                    self.system.make_dirs(mountpoint)
                                     
                                     # Montar filesystem
                                     self.system.run_command(['mount', '-t', 'btrfs', primary_device, mountpoint], capture_output=True)
                                     self.console.print(f"   ✅ Filesystem montado en {mountpoint}", style="green")
                                     recovered.append(f"BTRFS: {uuid_short}... (montado en {mountpoint})")
-                                except subprocess.CalledProcessError as e:
+                                except CalledProcessError as e:
                                     self.console.print(f"   ❌ Error montando filesystem: {e}", style="red")
                                     recovered.append(f"BTRFS: {uuid_short}... (detectado)")
                             else:
                                 recovered.append(f"BTRFS: {uuid_short}... (detectado)")
-                    except subprocess.CalledProcessError:
+                    except CalledProcessError:
                         self.console.print(f"   ℹ️ Filesystem {uuid_short}... detectado", style="blue")
                         recovered.append(f"BTRFS: {uuid_short}... (detectado)")
             else:
                 self.console.print("   ℹ️ No se encontraron filesystems BTRFS", style="blue")
                 
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("   ❌ Error ejecutando btrfs filesystem show", style="red")
         
         return recovered
@@ -1952,11 +2251,11 @@ class RAIDManager:
                                                     
                                                     try:
                                                         # Crear directorio y montar
-                                                        self.system.run_command(['mkdir', '-p', mountpoint], capture_output=True)
+                                                        self.system.make_dirs(mountpoint)
                                                         self.system.run_command(['mount', array_name, mountpoint], capture_output=True)
                                                         self.console.print(f"   ✅ Array montado en {mountpoint}", style="green")
                                                         recovered.append(f"MDADM Array: {array_name} (montado en {mountpoint})")
-                                                    except subprocess.CalledProcessError as e:
+                                                    except CalledProcessError as e:
                                                         self.console.print(f"   ❌ Error montando array: {e}", style="red")
                                                         recovered.append(f"MDADM Array: {array_name}")
                                                 else:
@@ -1967,12 +2266,12 @@ class RAIDManager:
                                     else:
                                         self.console.print(f"   ❌ Error verificando array '{array_name}'", style="red")
                                         
-                                except subprocess.CalledProcessError as e:
+                                except CalledProcessError as e:
                                     self.console.print(f"   ❌ Error reensamblando '{array_name}': {e}", style="red")
             else:
                 self.console.print("   ℹ️ No se encontraron arrays MDADM para reensamblar", style="blue")
                 
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("   ❌ Error ejecutando mdadm --examine --scan", style="red")
         
         return recovered
@@ -1988,7 +2287,7 @@ class RAIDManager:
             datasets_result = self.system.run_command(['zfs', 'list', '-H', '-o', 'name,mountpoint', pool_name], capture_output=True)
             
             datasets_info = "Datasets montados automáticamente:\n"
-            for line in datasets_result.stdout.strip().split('\n'):
+            for line in datasets_result.stdout.splitlines():
                 if line.strip():
                     parts = line.split('\t')
                     if len(parts) >= 2:
@@ -1997,7 +2296,7 @@ class RAIDManager:
             
             pool_state = "Unknown"
             if 'state:' in status_result.stdout:
-                pool_state = status_result.stdout.split('state:')[1].split()[0]
+                pool_state = status_result.stdout.partition('state:')[2].split()[0]
             
             self.console.print_panel(
                 f"Pool: {pool_name}\n" +
@@ -2007,7 +2306,7 @@ class RAIDManager:
                 style="blue"
             )
             
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass
 
     def _setup_fstab_mounting(self, items_for_fstab: list):
@@ -2046,7 +2345,7 @@ class RAIDManager:
             result = self.system.run_command(['zfs', 'list', '-H', '-o', 'name,canmount,mountpoint', pool_name], capture_output=True)
             
             datasets_info = []
-            for line in result.stdout.strip().split('\n'):
+            for line in result.stdout.splitlines():
                 if line.strip():
                     parts = line.split('\t')
                     if len(parts) >= 3:
@@ -2094,7 +2393,7 @@ class RAIDManager:
                 style="green"
             )
             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error configurando ZFS: {e}", style="red")
 
     def _configure_btrfs_automount(self, btrfs_item):
@@ -2115,10 +2414,10 @@ class RAIDManager:
             for line in result.stdout.split('\n'):
                 line = line.strip()
                 if line.startswith('uuid:') and uuid_short in line:
-                    full_uuid = line.split('uuid:')[1].strip()
+                    full_uuid = line.partition('uuid:')[2].strip()
                     in_target_fs = True
                 elif in_target_fs and line.startswith('devid') and 'path' in line:
-                    device_path = line.split('path ')[1].strip()
+                    device_path = line.partition('path ')[2].strip()
                     devices.append(device_path)
                 elif in_target_fs and line.startswith('uuid:'):
                     break
@@ -2144,7 +2443,7 @@ class RAIDManager:
                     )
                     
                     # Crear directorio de montaje
-                    self.system.run_command(['mkdir', '-p', mountpoint], capture_output=True)
+                    self.system.make_dirs(mountpoint)
                     
                     # Montar filesystem
                     self.system.run_command(['mount', '-t', 'btrfs', primary_device, mountpoint], capture_output=True)
@@ -2175,7 +2474,7 @@ class RAIDManager:
                 self._add_to_fstab(fstab_entries)
                 self.console.print("✅ Montaje automático configurado para BTRFS", style="green")
             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error configurando BTRFS: {e}", style="red")
 
     def _configure_mdadm_automount(self, mdadm_item):
@@ -2220,7 +2519,7 @@ class RAIDManager:
                         )
                         
                         # Crear directorio y montar
-                        self.system.run_command(['mkdir', '-p', mountpoint], capture_output=True)
+                        self.system.make_dirs(mountpoint)
                         self.system.run_command(['mount', array_name, mountpoint], capture_output=True)
                         self.console.print(f"✅ Array montado en {mountpoint}", style="green")
                     else:
@@ -2238,7 +2537,7 @@ class RAIDManager:
             else:
                 self.console.print("⚠️ No se pudo detectar filesystem en el array", style="yellow")
                 
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error configurando MDADM: {e}", style="red")
 
     def _get_current_mountpoint(self, device):
@@ -2246,7 +2545,7 @@ class RAIDManager:
         try:
             result = self.system.run_command(['findmnt', '-n', '-o', 'TARGET', '-S', device], capture_output=True)
             return result.stdout.strip() if result.stdout.strip() else None
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             return None
 
     def _get_btrfs_subvolumes(self, device, mountpoint=None):
@@ -2258,25 +2557,25 @@ class RAIDManager:
                 result = self.system.run_command(['btrfs', 'subvolume', 'list', mountpoint], capture_output=True)
                 for line in result.stdout.split('\n'):
                     if 'path ' in line:
-                        subvol_path = line.split('path ')[1].strip()
+                        subvol_path = line.partition('path ')[2].strip()
                         subvolumes.append(subvol_path)
             else:
                 # Si no está montado, montar temporalmente para inspeccionar
                 temp_mount = f"/tmp/btrfs_inspect_{int(time.time())}"
-                self.system.run_command(['mkdir', '-p', temp_mount], capture_output=True)
+                self.system.make_dirs(temp_mount)
                 self.system.run_command(['mount', '-t', 'btrfs', device, temp_mount], capture_output=True)
                 
                 result = self.system.run_command(['btrfs', 'subvolume', 'list', temp_mount], capture_output=True)
                 for line in result.stdout.split('\n'):
                     if 'path ' in line:
-                        subvol_path = line.split('path ')[1].strip()
+                        subvol_path = line.partition('path ')[2].strip()
                         subvolumes.append(subvol_path)
                 
                 # Desmontar temporal
                 self.system.run_command(['umount', temp_mount], capture_output=True)
                 self.system.run_command(['rmdir', temp_mount], capture_output=True)
                 
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass
         
         return subvolumes
@@ -2287,8 +2586,8 @@ class RAIDManager:
             result = self.system.run_command(['mdadm', '--detail', array_name], capture_output=True)
             for line in result.stdout.split('\n'):
                 if 'UUID :' in line:
-                    return line.split('UUID :')[1].strip()
-        except subprocess.CalledProcessError:
+                    return line.partition('UUID :')[2].strip()
+        except CalledProcessError:
             pass
         return None
 
@@ -2297,7 +2596,7 @@ class RAIDManager:
         try:
             result = self.system.run_command(['blkid', '-o', 'value', '-s', 'TYPE', device], capture_output=True)
             return result.stdout.strip() if result.stdout.strip() else None
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             return None
 
     def _get_filesystem_uuid(self, device):
@@ -2305,7 +2604,7 @@ class RAIDManager:
         try:
             result = self.system.run_command(['blkid', '-o', 'value', '-s', 'UUID', device], capture_output=True)
             return result.stdout.strip() if result.stdout.strip() else None
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             return None
 
     def _show_fstab_preview(self, entries):
@@ -2319,7 +2618,6 @@ class RAIDManager:
 
     def _add_to_fstab(self, entries):
         """Añade entradas a /etc/fstab de forma segura"""
-        import time
         try:
             # Crear backup
             backup_path = f"/etc/fstab.backup.{int(time.time())}"
@@ -2357,7 +2655,6 @@ class RAIDManager:
 
     def _add_to_mdadm_conf(self, config):
         """Añade configuración a /etc/mdadm/mdadm.conf"""
-        import time
         try:
             conf_path = '/etc/mdadm/mdadm.conf'
             backup_path = f"{conf_path}.backup.{int(time.time())}"
@@ -2394,7 +2691,7 @@ class RAIDManager:
             self.console.print("🧪 Probando configuración de montaje...")
             self.system.run_command(['mount', '-a'], capture_output=True)
             self.console.print("✅ Configuración de montaje válida", style="green")
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print_panel(
                 f"❌ Error en configuración de montaje:\n{str(e)}\n\n"
                 "Revisa /etc/fstab manualmente antes del próximo reinicio.",
@@ -2408,21 +2705,34 @@ class RAIDManager:
             # Verificar y habilitar servicios ZFS necesarios
             services = ['zfs-import-cache', 'zfs-mount', 'zfs.target']
             
-            for service in services:
-                try:
-                    # Verificar si está habilitado
-                    result = self.system.run_command(['systemctl', 'is-enabled', service], capture_output=True)
-                    if 'enabled' not in result.stdout:
-                        self.system.run_command(['systemctl', 'enable', service], capture_output=True)
-                        self.console.print(f"✅ Servicio {service} habilitado", style="green")
-                except subprocess.CalledProcessError:
-                    # Algunos servicios pueden no estar disponibles en todos los sistemas
-                    pass
+            # Algunos servicios pueden no estar disponibles en todos los sistemas (estado None)
+            statuses = self._get_units_enabled_state(services)
+            to_enable = [service for service in services if statuses.get(service) == 'disabled']
+            if to_enable:
+                if not self.system.run_command_safe(['systemctl', 'enable', *to_enable]):
+                    to_enable = [service for service in to_enable
+                                 if self.system.run_command_safe(['systemctl', 'enable', service])]
+                for service in to_enable:
+                    self.console.print(f"✅ Servicio {service} habilitado", style="green")
                     
         except Exception as e:
             self.console.print(f"⚠️ Advertencia configurando servicios ZFS: {e}", style="yellow")
     
     
+    def _get_units_enabled_state(self, units: List[str]) -> Dict[str, Optional[str]]:
+        """Estado 'is-enabled' de varias unidades systemd con una sola llamada (None si no existe)"""
+        result = self.system.run_command(['systemctl', 'is-enabled', *units], check=False)
+        lines = result.stdout.splitlines()
+        if len(lines) == len(units):
+            return dict(zip(units, lines))
+        
+        # Las unidades inexistentes no imprimen línea: consultar una a una para no desalinear
+        states = {}
+        for unit in units:
+            result = self.system.run_command(['systemctl', 'is-enabled', unit], check=False)
+            states[unit] = result.stdout.strip() or None
+        return states
+    
     def create_raid_wizard(self):
         """Asistente para crear nueva configuración RAID"""
         self.console.print_panel(
@@ -2440,6 +2750,7 @@ class RAIDManager:
         # Paso 1: Detectar discos disponibles
         self.console.print_panel("Paso 1: Detectando discos disponibles", title="🔍 Detección")
         disks = self.disk_manager.detect_disks()
+        self._cached_disks = disks
         available_disks = [d for d in disks if not d.is_system]
         
         if not available_disks:
@@ -2500,26 +2811,23 @@ class RAIDManager:
         self.console.print_panel("Paso 6: Creando RAID", title="🔨 Ejecución")
         self._configure_raid(fs_type, raid_type, selected_disks)
     
-    def _detect_zfs_pools(self):
-        """Detecta pools ZFS existentes"""
+    def _detect_zfs_pools(self) -> bool:
+        """Detecta si hay pools ZFS existentes (sin mostrar nada)"""
+        # Verificar si ZFS está disponible
+        if not self.zfs_available:
+            return False
+        
         try:
-            # Verificar si ZFS está disponible
-            self.system.run_command(['which', 'zpool'])
-            
             result = self.system.run_command(['zpool', 'list', '-H'])
-            if result.stdout.strip():
-                self._show_zfs_pools_detailed()
-                return True
-            else:
-                return False
-        except subprocess.CalledProcessError:
+            return bool(result.stdout.strip())
+        except CalledProcessError:
             return False
     
     def _show_zfs_pools_detailed(self):
         """Muestra información detallada de pools ZFS"""
         try:
             # Obtener lista de pools con información detallada
-            result = self.system.run_command(['zpool', 'list', '-H', '-o', 'name,size,allocated,free,health,altroot'])
+            result = self.system.run_command(['zpool', 'list', '-H', '-p', '-o', 'name,size,allocated,free,health,altroot'])
             
             if RICH_AVAILABLE:
                 table = Table(title="🔷 Pools ZFS", show_header=True, header_style="bold blue")
@@ -2530,24 +2838,24 @@ class RAIDManager:
                 table.add_column("Estado", style="magenta")
                 table.add_column("Datasets", style="white")
                 
-                for line in result.stdout.strip().split('\n'):
-                    if line.strip():
-                        parts = line.split('\t')
-                        if len(parts) >= 5:
-                            pool_name = parts[0]
-                            size = parts[1]
-                            allocated = parts[2]
-                            free = parts[3]
-                            health = parts[4]
-                            
-                            # Obtener número de datasets
-                            datasets_count = self._get_zfs_datasets_count(pool_name)
-                            
-                            # Formatear estado con emojis
-                            health_emoji = "💚" if health == "ONLINE" else "⚠️" if health == "DEGRADED" else "❌"
-                            health_display = f"{health_emoji} {health}"
-                            
-                            table.add_row(pool_name, size, allocated, free, health_display, str(datasets_count))
+                # Número de datasets de todos los pools con una sola consulta
+                datasets_counts = self._get_zfs_datasets_counts()
+                
+                for line in result.stdout.splitlines():
+                    try:
+                        row = ZpoolRow._make(line.split('\t'))
+                    except TypeError:
+                        continue
+                    
+                    # Obtener número de datasets
+                    datasets_count = datasets_counts.get(row.name, 0)
+                    
+                    # Formatear estado con emojis
+                    health_emoji = "💚" if row.health == "ONLINE" else "⚠️" if row.health == "DEGRADED" else "❌"
+                    health_display = f"{health_emoji} {row.health}"
+                    
+                    table.add_row(row.name, _format_size(row.size), _format_size(row.allocated),
+                                  _format_size(row.free), health_display, str(datasets_count))
                 
                 self.console.console.print(table)
                 
@@ -2556,107 +2864,131 @@ class RAIDManager:
                 
             else:
                 print("\n🔷 Pools ZFS:")
-                for line in result.stdout.strip().split('\n'):
-                    if line.strip():
-                        parts = line.split('\t')
-                        if len(parts) >= 5:
-                            print(f"  📦 {parts[0]} - {parts[1]} (Usado: {parts[2]}, Libre: {parts[3]}, Estado: {parts[4]})")
+                for line in result.stdout.splitlines():
+                    try:
+                        row = ZpoolRow._make(line.split('\t'))
+                    except TypeError:
+                        continue
+                    print(f"  📦 {row.name} - {_format_size(row.size)} (Usado: {_format_size(row.allocated)}, Libre: {_format_size(row.free)}, Estado: {row.health})")
                             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error obteniendo información de pools ZFS: {e}", style="red")
     
     def _show_zfs_datasets_info(self):
         """Muestra información de datasets para cada pool ZFS"""
         try:
-            pools_result = self.system.run_command(['zpool', 'list', '-H', '-o', 'name'])
-            for pool_name in pools_result.stdout.strip().split('\n'):
+            # Datasets de todos los pools con una sola consulta, agrupados por pool
+            # (cada pool aparece como su propio dataset raíz, no hace falta 'zpool list')
+            datasets_by_pool = self._get_zfs_datasets_by_pool()
+            
+            for pool_name in datasets_by_pool:
                 if pool_name.strip():
-                    # Obtener datasets del pool
-                    try:
-                        datasets_result = self.system.run_command(['zfs', 'list', '-H', '-r', pool_name, '-o', 'name,used,avail,mountpoint,compression'])
-                        if datasets_result.stdout.strip():
-                            # Crear tabla para datasets de este pool
-                            if RICH_AVAILABLE:
-                                datasets_table = Table(title=f"📁 Datasets del pool '{pool_name}'", show_header=True, header_style="bold cyan")
-                                datasets_table.add_column("Dataset", style="cyan")
-                                datasets_table.add_column("Usado", style="yellow")
-                                datasets_table.add_column("Disponible", style="green")
-                                datasets_table.add_column("Montaje", style="blue")
-                                datasets_table.add_column("Compresión", style="magenta")
-                                
-                                for line in datasets_result.stdout.strip().split('\n'):
-                                    parts = line.split('\t')
-                                    if len(parts) >= 4 and parts[0] != pool_name:  # Skip pool itself
-                                        dataset_name = parts[0].split('/')[-1] if '/' in parts[0] else parts[0]
-                                        used = parts[1]
-                                        avail = parts[2] 
-                                        mountpoint = parts[3]
-                                        compression = parts[4] if len(parts) > 4 else "N/A"
-                                        
-                                        datasets_table.add_row(dataset_name, used, avail, mountpoint, compression)
-                                
-                                self.console.console.print(datasets_table)
-                                
-                            else:
-                                print(f"\n📁 Datasets del pool '{pool_name}':")
-                                for line in datasets_result.stdout.strip().split('\n'):
-                                    parts = line.split('\t')
-                                    if len(parts) >= 4 and parts[0] != pool_name:
-                                        dataset_name = parts[0].split('/')[-1]
-                                        used = parts[1]
-                                        mountpoint = parts[3]
-                                        print(f"  • {dataset_name} - Usado: {used}, Montaje: {mountpoint}")
-                    except subprocess.CalledProcessError:
-                        pass
+                    pool_rows = datasets_by_pool.get(pool_name)
+                    if pool_rows:
+                        # Crear tabla para datasets de este pool
+                        if RICH_AVAILABLE:
+                            datasets_table = Table(title=f"📁 Datasets del pool '{pool_name}'", show_header=True, header_style="bold cyan")
+                            datasets_table.add_column("Dataset", style="cyan")
+                            datasets_table.add_column("Usado", style="yellow")
+                            datasets_table.add_column("Disponible", style="green")
+                            datasets_table.add_column("Montaje", style="blue")
+                            datasets_table.add_column("Compresión", style="magenta")
+                            
+                            for row in pool_rows:
+                                if row.name != pool_name:  # Skip pool itself
+                                    datasets_table.add_row(row.name.split('/')[-1], _format_size(row.used), _format_size(row.avail),
+                                                           row.mountpoint, row.compression)
+                            
+                            self.console.console.print(datasets_table)
+                        
+                        else:
+                            print(f"\n📁 Datasets del pool '{pool_name}':")
+                            for row in pool_rows:
+                                if row.name != pool_name:
+                                    print(f"  • {row.name.split('/')[-1]} - Usado: {_format_size(row.used)}, Montaje: {row.mountpoint}")
                         
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass
     
-    def _get_zfs_datasets_count(self, pool_name: str) -> int:
-        """Obtiene el número de datasets en un pool ZFS"""
+    def _get_zfs_datasets_by_pool(self) -> Dict[str, List[ZfsDatasetRow]]:
+        """Filas de 'zfs list' de todos los pools como ZfsDatasetRow, agrupadas por pool"""
+        result = self.system.run_command(['zfs', 'list', '-H', '-p', '-o', 'name,used,avail,mountpoint,compression'])
+        datasets_by_pool = {}
+        for line in result.stdout.splitlines():
+            try:
+                row = ZfsDatasetRow._make(line.split('\t'))
+            except TypeError:
+                continue
+            datasets_by_pool.setdefault(row.name.partition('/')[0], []).append(row)
+        return datasets_by_pool
+    
+    def _get_zfs_datasets_counts(self) -> Dict[str, int]:
+        """Obtiene el número de datasets de cada pool ZFS con un único 'zfs list'"""
         try:
-            result = self.system.run_command(['zfs', 'list', '-H', '-r', pool_name])
-            # Contar líneas menos la del pool principal
-            lines = result.stdout.strip().split('\n')
-            return len([line for line in lines if line.strip()]) - 1
-        except subprocess.CalledProcessError:
-            return 0
+            result = self.system.run_command(['zfs', 'list', '-H', '-o', 'name'])
+        except CalledProcessError:
+            return {}
+        
+        counts = {}
+        for name in result.stdout.splitlines():
+            pool, sep, _ = name.partition('/')
+            # El dataset raíz (el propio pool) no cuenta
+            counts[pool] = counts.get(pool, 0) + (1 if sep else 0)
+        return counts
+    
+    def _bulk_get_props(self, pool_name: str, props: List[str]) -> Dict[str, Dict[str, str]]:
+        """Obtiene propiedades de un pool y todos sus datasets con un único 'zfs get', por dataset"""
+        result = self.system.run_command(['zfs', 'get', '-H', '-p', '-r', '-o', 'name,property,value',
+                                          ','.join(props), pool_name])
+        values = {}
+        for line in result.stdout.splitlines():
+            fields = line.split('\t')
+            if len(fields) == 3:
+                values.setdefault(fields[0], {})[fields[1]] = fields[2]
+        return values
+    
+    def _get_zfs_dataset_names(self, pool_name: str) -> set:
+        """Obtiene con una sola consulta los nombres de todos los datasets de un pool ZFS"""
+        result = self.system.run_command(['zfs', 'list', '-H', '-r', '-o', 'name', pool_name], check=False)
+        return set(result.stdout.splitlines()) if result.returncode == 0 else set()
     
     def _show_zfs_pool_details(self):
         """Muestra detalles adicionales de cada pool ZFS"""
         try:
             pools_result = self.system.run_command(['zpool', 'list', '-H', '-o', 'name'])
-            for pool_name in pools_result.stdout.strip().split('\n'):
+            
+            # Datasets y estado de todos los pools con una consulta de cada tipo
+            try:
+                datasets_by_pool = self._get_zfs_datasets_by_pool()
+            except CalledProcessError:
+                datasets_by_pool = {}
+            try:
+                status_by_pool = self._get_zpool_status_by_pool()
+            except CalledProcessError:
+                status_by_pool = {}
+            
+            for pool_name in pools_result.stdout.splitlines():
                 if pool_name.strip():
                     self.console.print(f"\n📋 Detalles del pool '{pool_name}':", style="bold blue")
                     
                     # Información de datasets
-                    try:
-                        datasets_result = self.system.run_command(['zfs', 'list', '-H', '-r', pool_name, '-o', 'name,used,avail,mountpoint,compression'])
-                        if datasets_result.stdout.strip():
-                            self.console.print("  📁 Datasets:")
-                            for line in datasets_result.stdout.strip().split('\n'):
-                                parts = line.split('\t')
-                                if len(parts) >= 4 and parts[0] != pool_name:  # Skip pool itself
-                                    dataset_name = parts[0]
-                                    used = parts[1]
-                                    avail = parts[2] 
-                                    mountpoint = parts[3]
-                                    compression = parts[4] if len(parts) > 4 else "N/A"
-                                    self.console.print(f"    • {dataset_name.split('/')[-1]} - Usado: {used}, Montaje: {mountpoint}, Compresión: {compression}")
-                    except subprocess.CalledProcessError:
-                        pass
+                    pool_rows = datasets_by_pool.get(pool_name)
+                    if pool_rows:
+                        self.console.print("  📁 Datasets:")
+                        for row in pool_rows:
+                            if row.name != pool_name:  # Skip pool itself
+                                self.console.print(f"    • {row.name.split('/')[-1]} - Usado: {_format_size(row.used)}, Montaje: {row.mountpoint}, Compresión: {row.compression}")
                     
                     # Información de dispositivos
-                    try:
-                        status_result = self.system.run_command(['zpool', 'status', pool_name])
+                    status_lines = status_by_pool.get(pool_name)
+                    if status_lines is not None:
                         self.console.print("  💿 Dispositivos:")
                         
                         # Parsear salida de zpool status para mostrar dispositivos
                         in_config = False
-                        config_lines = []
+                        devices_shown = False
                         
-                        for line in status_result.stdout.split('\n'):
+                        for line in status_lines:
                             stripped_line = line.strip()
                             
                             if 'config:' in line.lower():
@@ -2687,6 +3019,7 @@ class RAIDManager:
                                             state_emoji = "❓"
                                         
                                         self.console.print(f"    • {device_name} - {state_emoji} {device_state}")
+                                        devices_shown = True
                                         
                                         # Mostrar errores si los hay
                                         if any(err != "0" for err in [read_errors, write_errors, checksum_errors]):
@@ -2695,33 +3028,35 @@ class RAIDManager:
                                 break
                                 
                         # Si no se encontraron dispositivos específicos, mostrar información básica
-                        if not any('✅' in line or '⚠️' in line or '❌' in line for line in config_lines):
-                            # Obtener información básica del pool
-                            try:
-                                list_result = self.system.run_command(['zpool', 'list', '-v', pool_name])
-                                self.console.print("    📊 Configuración del pool detectada")
-                            except subprocess.CalledProcessError:
-                                pass
-                                
-                    except subprocess.CalledProcessError:
-                        pass
+                        if not devices_shown:
+                            self.console.print("    📊 Configuración del pool detectada")
                         
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass
     
-    def _detect_btrfs_filesystems(self):
-        """Detecta filesystems BTRFS existentes"""
+    def _get_zpool_status_by_pool(self) -> Dict[str, List[str]]:
+        """Salida de un único 'zpool status' (todos los pools) partida por pool"""
+        result = self.system.run_command(['zpool', 'status'])
+        status_by_pool = {}
+        current = None
+        for line in result.stdout.splitlines():
+            stripped_line = line.strip()
+            if stripped_line.startswith('pool:'):
+                current = status_by_pool.setdefault(stripped_line.partition('pool:')[2].strip(), [])
+            if current is not None:
+                current.append(line)
+        return status_by_pool
+    
+    def _detect_btrfs_filesystems(self) -> bool:
+        """Detecta si hay filesystems BTRFS existentes (sin mostrar nada)"""
+        # Verificar si BTRFS está disponible
+        if not _tool_exists('btrfs'):
+            return False
+        
         try:
-            # Verificar si BTRFS está disponible
-            self.system.run_command(['which', 'btrfs'])
-            
             result = self.system.run_command(['btrfs', 'filesystem', 'show'])
-            if result.stdout.strip() and 'no btrfs found' not in result.stdout.lower():
-                self._show_btrfs_detailed()
-                return True
-            else:
-                return False
-        except subprocess.CalledProcessError:
+            return bool(result.stdout.strip()) and 'no btrfs found' not in result.stdout.lower()
+        except CalledProcessError:
             return False
     
     def _show_btrfs_detailed(self):
@@ -2746,9 +3081,9 @@ class RAIDManager:
                         if current_fs:
                             # Agregar filesystem anterior a la tabla
                             self._add_btrfs_to_table(table, current_fs)
-                        current_fs = {'uuid': line.split('uuid:')[1].strip()}
+                        current_fs = {'uuid': line.partition('uuid:')[2].strip()}
                     elif 'Label:' in line:
-                        current_fs['label'] = line.split('Label:')[1].strip().replace("'", "")
+                        current_fs['label'] = line.partition('Label:')[2].strip().replace("'", "")
                     elif line.startswith('devid'):
                         if 'devices' not in current_fs:
                             current_fs['devices'] = []
@@ -2771,10 +3106,10 @@ class RAIDManager:
                 for line in result.stdout.split('\n'):
                     line = line.strip()
                     if line.startswith('uuid:'):
-                        uuid = line.split('uuid:')[1].strip()
+                        uuid = line.partition('uuid:')[2].strip()
                         print(f"  📦 UUID: {uuid}")
                     elif 'Label:' in line:
-                        label = line.split('Label:')[1].strip().replace("'", "")
+                        label = line.partition('Label:')[2].strip().replace("'", "")
                         print(f"     Label: {label}")
                     elif line.startswith('devid'):
                         parts = line.split()
@@ -2782,7 +3117,7 @@ class RAIDManager:
                             if part.startswith('/dev/'):
                                 print(f"     Dispositivo: {part}")
                                 
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error obteniendo información de BTRFS: {e}", style="red")
     
     def _add_btrfs_to_table(self, table, fs_info):
@@ -2819,16 +3154,16 @@ class RAIDManager:
             
             for line in usage_lines:
                 if 'Device size:' in line:
-                    size = line.split('Device size:')[1].strip()
+                    size = line.partition('Device size:')[2].strip()
                 elif 'Used:' in line and 'Device' not in line:
-                    used = line.split('Used:')[1].strip()
+                    used = line.partition('Used:')[2].strip()
             
             return {
                 'usage': f"Usado: {used} / {size}",
                 'status': '✅ OK'
             }
             
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             return {'usage': 'Error', 'status': '❌ Error'}
     
     def _show_btrfs_usage_details(self):
@@ -2840,7 +3175,7 @@ class RAIDManager:
             if result.stdout.strip():
                 self.console.print("\n📊 Información detallada de BTRFS:", style="bold blue")
                 
-                for line in result.stdout.strip().split('\n'):
+                for line in result.stdout.splitlines():
                     parts = line.split()
                     if len(parts) >= 2:
                         mountpoint = parts[0]
@@ -2853,32 +3188,29 @@ class RAIDManager:
                         try:
                             subvol_result = self.system.run_command(['btrfs', 'subvolume', 'list', mountpoint])
                             if subvol_result.stdout.strip():
-                                subvol_count = len(subvol_result.stdout.strip().split('\n'))
+                                subvol_count = len(subvol_result.stdout.splitlines())
                                 self.console.print(f"     Subvolúmenes: {subvol_count}")
-                        except subprocess.CalledProcessError:
+                        except CalledProcessError:
                             pass
                         
                         self.console.print("")
                         
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass
     
-    def _detect_mdadm_arrays(self):
-        """Detecta arrays MDADM existentes"""
+    def _detect_mdadm_arrays(self) -> bool:
+        """Detecta si hay arrays MDADM existentes (sin mostrar nada)"""
+        # Verificar si MDADM está disponible
+        if not _tool_exists('mdadm'):
+            return False
+        
         try:
-            # Verificar si MDADM está disponible
-            self.system.run_command(['which', 'mdadm'])
-            
             # Leer /proc/mdstat
             result = self.system.run_command(['cat', '/proc/mdstat'])
             
-            if 'md' in result.stdout and 'active' in result.stdout:
-                self._show_mdadm_detailed()
-                return True
-            else:
-                return False
+            return 'md' in result.stdout and 'active' in result.stdout
                 
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             return False
     
     def _show_mdadm_detailed(self):
@@ -2921,7 +3253,7 @@ class RAIDManager:
                     print(f"  📦 {array_info['name']} - {array_info['raid_type']} - {status}")
                     print(f"     Dispositivos: {', '.join(array_info['devices'])}")
                     
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error obteniendo información de MDADM: {e}", style="red")
     
     def _parse_mdstat(self, mdstat_content):
@@ -3020,26 +3352,23 @@ class RAIDManager:
                             if failed_devs != '0':
                                 self.console.print(f"  ❌ Dispositivos fallidos: {failed_devs}")
                         
-                except subprocess.CalledProcessError:
+                except CalledProcessError:
                     self.console.print(f"  ⚠️  No se pudo obtener información detallada de {array_name}")
                     
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass
     
-    def _detect_lvm_volumes(self):
-        """Detecta Volume Groups LVM existentes"""
+    def _detect_lvm_volumes(self) -> bool:
+        """Detecta si hay Volume Groups LVM existentes (sin mostrar nada)"""
+        # Verificar si LVM está disponible
+        if not _tool_exists('vgs'):
+            return False
+        
         try:
-            # Verificar si LVM está disponible
-            self.system.run_command(['which', 'vgs'])
-            
             result = self.system.run_command(['vgs', '--noheadings'])
-            if result.stdout.strip():
-                self._show_lvm_detailed()
-                return True
-            else:
-                return False
+            return bool(result.stdout.strip())
                 
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             return False
     
     def _show_lvm_detailed(self):
@@ -3056,7 +3385,7 @@ class RAIDManager:
                 table.add_column("Libre", style="magenta")
                 table.add_column("Logical Volumes", style="white")
                 
-                for line in result.stdout.strip().split('\n'):
+                for line in result.stdout.splitlines():
                     if line.strip():
                         parts = line.split()
                         if len(parts) >= 6:
@@ -3078,21 +3407,21 @@ class RAIDManager:
                 
             else:
                 print("\n💼 Volume Groups LVM:")
-                for line in result.stdout.strip().split('\n'):
+                for line in result.stdout.splitlines():
                     if line.strip():
                         parts = line.split()
                         if len(parts) >= 6:
                             print(f"  📦 {parts[0]} - PVs: {parts[1]}, LVs: {parts[2]}, Tamaño: {parts[5]}")
                             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error obteniendo información de LVM: {e}", style="red")
     
     def _get_lvm_logical_volumes(self, vg_name):
         """Obtiene nombres de logical volumes de un VG"""
         try:
             result = self.system.run_command(['lvs', '--noheadings', '-o', 'name', vg_name])
-            return [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
-        except subprocess.CalledProcessError:
+            return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+        except CalledProcessError:
             return []
     
     def _show_lvm_details(self):
@@ -3100,7 +3429,7 @@ class RAIDManager:
         try:
             vgs_result = self.system.run_command(['vgs', '--noheadings', '-o', 'name'])
             
-            for line in vgs_result.stdout.strip().split('\n'):
+            for line in vgs_result.stdout.splitlines():
                 vg_name = line.strip()
                 if vg_name:
                     self.console.print(f"\n📋 Detalles del Volume Group '{vg_name}':", style="bold blue")
@@ -3110,11 +3439,11 @@ class RAIDManager:
                         pvs_result = self.system.run_command(['pvs', '--noheadings', '-o', 'name,size', '-S', f'vg_name={vg_name}'])
                         if pvs_result.stdout.strip():
                             self.console.print("  💿 Physical Volumes:")
-                            for pv_line in pvs_result.stdout.strip().split('\n'):
+                            for pv_line in pvs_result.stdout.splitlines():
                                 pv_parts = pv_line.strip().split()
                                 if len(pv_parts) >= 2:
                                     self.console.print(f"    • {pv_parts[0]} - {pv_parts[1]}")
-                    except subprocess.CalledProcessError:
+                    except CalledProcessError:
                         pass
                     
                     # Información de Logical Volumes
@@ -3122,7 +3451,7 @@ class RAIDManager:
                         lvs_result = self.system.run_command(['lvs', '--noheadings', '-o', 'name,size,attr', vg_name])
                         if lvs_result.stdout.strip():
                             self.console.print("  📁 Logical Volumes:")
-                            for lv_line in lvs_result.stdout.strip().split('\n'):
+                            for lv_line in lvs_result.stdout.splitlines():
                                 lv_parts = lv_line.strip().split()
                                 if len(lv_parts) >= 3:
                                     lv_name = lv_parts[0]
@@ -3130,10 +3459,10 @@ class RAIDManager:
                                     lv_attr = lv_parts[2]
                                     active_status = "✅ Activo" if lv_attr[4] == 'a' else "❌ Inactivo"
                                     self.console.print(f"    • {lv_name} - {lv_size} - {active_status}")
-                    except subprocess.CalledProcessError:
+                    except CalledProcessError:
                         pass
                         
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass
     
     def _show_available_disks(self, disks: List[Disk]):
@@ -3197,6 +3526,7 @@ class RAIDManager:
                             self.console.print("✅ ZFS instalado correctamente", style="green")
                             # Actualizar cache después de la instalación
                             self.raid_tools_status['zfs'] = True
+                            self.__dict__.pop('zfs_available', None)
                             return FilesystemType.ZFS
                         else:
                             self.console.print("❌ Error instalando ZFS. Selecciona otra opción.", style="red")
@@ -3240,10 +3570,13 @@ class RAIDManager:
         self.console.print("\n💾 Selección de discos para RAID:")
         
         selected_disks = []
+        # Las filas no cambian entre redibujados: solo varía la marca de selección
+        row_cache = self._build_disk_selection_rows(available_disks)
+        selected_mask = [False] * len(available_disks)
         
         while True:
             # Mostrar tabla actualizada con selecciones
-            self._show_disk_selection_table(available_disks, selected_disks)
+            self._show_disk_selection_table(row_cache, selected_mask)
             
             self.console.print(f"\n📋 Discos seleccionados: {len(selected_disks)}")
             if selected_disks:
@@ -3291,11 +3624,13 @@ class RAIDManager:
                         if 0 <= disk_index < len(available_disks):
                             disk = available_disks[disk_index]
                             
-                            if disk in selected_disks:
+                            if selected_mask[disk_index]:
                                 selected_disks.remove(disk)
+                                selected_mask[disk_index] = False
                                 self.console.print(f"➖ Disco {disk.name} eliminado de la selección", style="yellow")
                             else:
                                 selected_disks.append(disk)
+                                selected_mask[disk_index] = True
                                 self.console.print(f"➕ Disco {disk.name} agregado a la selección", style="green")
                         else:
                             self.console.print(f"❌ Número de disco inválido: {disk_num}", style="red")
@@ -3308,56 +3643,51 @@ class RAIDManager:
         
         return selected_disks
     
-    def _show_disk_selection_table(self, available_disks: List[Disk], selected_disks: List[Disk]):
-        """Muestra tabla de selección de discos con estado de selección"""
+    def _build_disk_selection_rows(self, available_disks: List[Disk]) -> List[Tuple[str, str, str, str, str]]:
+        """Precalcula las filas de la tabla de selección (sin la marca de selección)"""
         if RICH_AVAILABLE:
-            table = Table(title="🎯 Selección de Discos para RAID")
-            table.add_column("Sel", style="bold green", width=4, justify="center")
-            table.add_column("#", style="bold cyan", width=3)
-            table.add_column("Disco", style="cyan")
-            table.add_column("Tamaño", style="green")
-            table.add_column("Modelo", style="yellow")
-            table.add_column("Estado", style="blue")
-            
-            for i, disk in enumerate(available_disks, 1):
-                # Verificar si está seleccionado
-                is_selected = disk in selected_disks
-                selection_mark = "✅" if is_selected else "⬜"
-                
-                # Verificar estado del disco
-                status_parts = []
-                if disk.has_partitions:
-                    status_parts.append("🟡 Particiones")
-                if disk.filesystem_type:
-                    status_parts.append(f"🔵 {disk.filesystem_type}")
-                
-                status = " + ".join(status_parts) if status_parts else "🟢 Libre"
-                
-                table.add_row(
-                    selection_mark,
-                    str(i),
-                    disk.name,
-                    disk.size_human,
-                    disk.model,
-                    status
-                )
-            
-            self.console.console.print(table)
+            partitions_label, fs_prefix, free_label = "🟡 Particiones", "🔵 ", "🟢 Libre"
         else:
-            print("\n🎯 Selección de Discos para RAID:")
-            for i, disk in enumerate(available_disks, 1):
-                is_selected = disk in selected_disks
-                mark = "[✓]" if is_selected else "[ ]"
-                
-                status_parts = []
-                if disk.has_partitions:
-                    status_parts.append("Particiones")
-                if disk.filesystem_type:
-                    status_parts.append(disk.filesystem_type)
-                
-                status = " + ".join(status_parts) if status_parts else "Libre"
-                
-                print(f"  {mark} {i}. {disk.name} - {disk.size_human} - {disk.model} ({status})")
+            partitions_label, fs_prefix, free_label = "Particiones", "", "Libre"
+        
+        rows = []
+        for i, disk in enumerate(available_disks, 1):
+            # Verificar estado del disco
+            status_parts = []
+            if disk.has_partitions:
+                status_parts.append(partitions_label)
+            if disk.filesystem_type:
+                status_parts.append(f"{fs_prefix}{disk.filesystem_type}")
+            
+            status = " + ".join(status_parts) if status_parts else free_label
+            rows.append((str(i), disk.name, disk.size_human, disk.model, status))
+        
+        return rows
+    
+    def _show_disk_selection_table_rich(self, row_cache: List[Tuple[str, str, str, str, str]],
+                                        selected_mask: List[bool]):
+        """Muestra tabla de selección de discos con estado de selección (Rich)"""
+        table = Table(title="🎯 Selección de Discos para RAID")
+        table.add_column("Sel", style="bold green", width=4, justify="center")
+        table.add_column("#", style="bold cyan", width=3)
+        table.add_column("Disco", style="cyan")
+        table.add_column("Tamaño", style="green")
+        table.add_column("Modelo", style="yellow")
+        table.add_column("Estado", style="blue")
+        
+        for row, is_selected in zip(row_cache, selected_mask):
+            table.add_row("✅" if is_selected else "⬜", *row)
+        
+        self.console.console.print(table)
+    
+    def _show_disk_selection_table_plain(self, row_cache: List[Tuple[str, str, str, str, str]],
+                                         selected_mask: List[bool]):
+        """Muestra tabla de selección de discos con estado de selección (texto plano)"""
+        lines = ["\n🎯 Selección de Discos para RAID:"]
+        for (number, name, size, model, status), is_selected in zip(row_cache, selected_mask):
+            mark = "[✓]" if is_selected else "[ ]"
+            lines.append(f"  {mark} {number}. {name} - {size} - {model} ({status})")
+        print("\n".join(lines))
     
     def _select_raid_type(self, fs_type: FilesystemType, disk_count: int) -> RAIDType:
         """Selecciona tipo de RAID según filesystem y número de discos"""
@@ -3373,33 +3703,17 @@ class RAIDManager:
         """Selecciona tipo de RAID para ZFS"""
         self.console.print("\n🔷 Tipos de RAID disponibles en ZFS:")
         
-        options = []
-        
-        # Stripe (sin redundancia)
-        options.append((1, RAIDType.STRIPE, "Stripe - Sin redundancia, máximo rendimiento"))
-        
-        # Mirror (requiere 2+ discos)
-        if disk_count >= 2:
-            options.append((2, RAIDType.MIRROR, "Mirror - Datos duplicados (50% capacidad)"))
-        
-        # RAIDZ1 (requiere 3+ discos)
-        if disk_count >= 3:
-            options.append((3, RAIDType.RAIDZ1, "RAIDZ1 - Tolerancia a 1 fallo (equivalente RAID 5)"))
-        
-        # RAIDZ2 (requiere 4+ discos)  
-        if disk_count >= 4:
-            options.append((4, RAIDType.RAIDZ2, "RAIDZ2 - Tolerancia a 2 fallos (equivalente RAID 6)"))
-        
-        # RAIDZ3 (requiere 5+ discos)
-        if disk_count >= 5:
-            options.append((5, RAIDType.RAIDZ3, "RAIDZ3 - Tolerancia a 3 fallos"))
-        
-        # Mostrar opciones
-        for num, raid_type, description in options:
-            self.console.print(f"   {num}. {description}")
+        # Filtrar una sola vez las opciones válidas para este número de discos
+        options = [(key, raid_type, description)
+                   for key, raid_type, min_disks, description in ZFS_RAID_OPTIONS
+                   if disk_count >= min_disks]
+        choices = {key: raid_type for key, raid_type, _ in options}
         
-        # Opción para volver a selección de discos
-        self.console.print(f"   0. ← Volver a selección de discos")
+        # Mostrar opciones junto con la opción para volver a selección de discos
+        self.console.print("\n".join(
+            [f"   {key}. {description}" for key, _, description in options] +
+            ["   0. ← Volver a selección de discos"]
+        ))
         
         while True:
             choice = self.console.prompt("👉 Selecciona tipo de RAID", "2" if disk_count >= 2 else "1")
@@ -3407,9 +3721,9 @@ class RAIDManager:
             if choice == "0":
                 return None  # Señal para volver a selección de discos
             
-            for num, raid_type, description in options:
-                if choice == str(num):
-                    return raid_type
+            raid_type = choices.get(choice)
+            if raid_type:
+                return raid_type
             
             self.console.print("❌ Opción inválida", style="red")
     
@@ -3417,36 +3731,23 @@ class RAIDManager:
         """Selecciona tipo de RAID para BTRFS"""
         self.console.print("\n🌿 Tipos de RAID disponibles en BTRFS:")
         
-        options = []
-        
-        # RAID 0
-        options.append((1, RAIDType.BTRFS_RAID0, "RAID 0 - Sin redundancia, máximo rendimiento"))
-        
-        # RAID 1 (requiere 2+ discos)
-        if disk_count >= 2:
-            options.append((2, RAIDType.BTRFS_RAID1, "RAID 1 - Datos duplicados (50% capacidad)"))
-        
-        # RAID 10 (requiere 4+ discos)
-        if disk_count >= 4:
-            options.append((3, RAIDType.BTRFS_RAID10, "RAID 10 - Combinación RAID 0+1 (requiere 4+ discos)"))
-        
-        # RAID 5 (requiere 3+ discos) - EXPERIMENTAL
-        if disk_count >= 3:
-            options.append((4, RAIDType.BTRFS_RAID5, "RAID 5 - Tolerancia a 1 fallo ⚠️ EXPERIMENTAL"))
-        
-        # RAID 6 (requiere 4+ discos) - EXPERIMENTAL  
-        if disk_count >= 4:
-            options.append((5, RAIDType.BTRFS_RAID6, "RAID 6 - Tolerancia a 2 fallos ⚠️ EXPERIMENTAL"))
+        # Filtrar una sola vez las opciones válidas para este número de discos
+        options = [(key, raid_type, description)
+                   for key, raid_type, min_disks, description in BTRFS_RAID_OPTIONS
+                   if disk_count >= min_disks]
+        choices = {key: raid_type for key, raid_type, _ in options}
         
         # Mostrar opciones
-        for num, raid_type, description in options:
-            self.console.print(f"   {num}. {description}")
+        self.console.print("\n".join(f"   {key}. {description}" for key, _, description in options))
         
         # Advertencia sobre RAID 5/6 experimental
         if disk_count >= 3:
-            self.console.print("\n⚠️  ADVERTENCIA: RAID 5/6 en BTRFS es experimental", style="yellow")
-            self.console.print("   • Puede tener problemas de estabilidad y rendimiento", style="yellow")
-            self.console.print("   • No recomendado para sistemas de producción críticos", style="yellow")
+            self.console.print(
+                "\n⚠️  ADVERTENCIA: RAID 5/6 en BTRFS es experimental\n"
+                "   • Puede tener problemas de estabilidad y rendimiento\n"
+                "   • No recomendado para sistemas de producción críticos",
+                style="yellow"
+            )
         
         # Opción para volver a selección de discos
         self.console.print(f"\n   0. ← Volver a selección de discos")
@@ -3457,9 +3758,9 @@ class RAIDManager:
             if choice == "0":
                 return None  # Señal para volver a selección de discos
             
-            for num, raid_type, description in options:
-                if choice == str(num):
-                    return raid_type
+            raid_type = choices.get(choice)
+            if raid_type:
+                return raid_type
             
             self.console.print("❌ Opción inválida", style="red")
     
@@ -3498,18 +3799,23 @@ class RAIDManager:
         if not disks:
             return {"total": "0 GB", "usable": "0 GB", "redundancy": "Ninguna"}
         
-        # Encontrar disco más pequeño
-        min_size = min(disk.size for disk in disks)
-        total_raw = sum(disk.size for disk in disks)
+        # Encontrar disco más pequeño y capacidad bruta en una sola pasada
+        min_size = disks[0].size
+        total_raw = 0
+        for disk in disks:
+            size = disk.size
+            total_raw += size
+            if size < min_size:
+                min_size = size
         disk_count = len(disks)
         
         # Calcular según tipo de RAID
-        if raid_type in [RAIDType.STRIPE, RAIDType.BTRFS_RAID0]:
+        if raid_type in _NO_REDUNDANCY:
             usable_size = total_raw
             redundancy = "Ninguna - Sin tolerancia a fallos"
             efficiency = "100%"
             
-        elif raid_type in [RAIDType.MIRROR, RAIDType.BTRFS_RAID1]:
+        elif raid_type in _MIRROR_LIKE:
             usable_size = min_size * (disk_count // 2)
             redundancy = f"Tolerancia a {disk_count // 2} fallos"
             efficiency = f"{((disk_count // 2) / disk_count) * 100:.1f}%"
@@ -3565,115 +3871,195 @@ class RAIDManager:
             "min_disk": size_to_human(min_size)
         }
     
+    def _show_raid_summary_tables_rich(self, fs_type: FilesystemType, raid_type: RAIDType,
+                                       disks: List[Disk], capacity_info: Dict[str, str]):
+        """Muestra las tablas de resumen RAID y discos seleccionados (Rich)"""
+        # Crear tabla de resumen
+        summary_table = Table(title="📋 Resumen de Configuración RAID", show_header=False)
+        summary_table.add_column("Concepto", style="bold cyan", width=20)
+        summary_table.add_column("Valor", style="white")
+        
+        summary_table.add_row("Filesystem", fs_type.value.upper())
+        summary_table.add_row("Tipo RAID", raid_type.value)
+        summary_table.add_row("Número de discos", str(len(disks)))
+        summary_table.add_row("Capacidad total", capacity_info["total"])
+        summary_table.add_row("Capacidad utilizable", capacity_info["usable"])
+        summary_table.add_row("Eficiencia", capacity_info["efficiency"])
+        summary_table.add_row("Redundancia", capacity_info["redundancy"])
+        
+        self.console.console.print(summary_table)
+        
+        # Crear tabla de discos
+        disks_table = Table(title="💾 Discos Seleccionados", show_header=True)
+        disks_table.add_column("Disco", style="cyan")
+        disks_table.add_column("Tamaño", style="green")
+        disks_table.add_column("Modelo", style="yellow")
+        disks_table.add_column("Sectores", style="blue")
+        
+        for disk in disks:
+            disks_table.add_row(
+                disk.name,
+                disk.size_human,
+                disk.model,
+                str(disk.sector_size)
+            )
+        
+        self.console.console.print(disks_table)
+    
+    def _show_raid_summary_tables_plain(self, fs_type: FilesystemType, raid_type: RAIDType,
+                                        disks: List[Disk], capacity_info: Dict[str, str]):
+        """Muestra el resumen RAID y los discos seleccionados (texto plano)"""
+        print("\n📋 Resumen de Configuración RAID:")
+        print(f"   Filesystem: {fs_type.value.upper()}")
+        print(f"   Tipo RAID: {raid_type.value}")
+        print(f"   Discos: {len(disks)}")
+        print(f"   Capacidad total: {capacity_info['total']}")
+        print(f"   Capacidad utilizable: {capacity_info['usable']}")
+        print(f"   Redundancia: {capacity_info['redundancy']}")
+        
+        print("\n💾 Discos seleccionados:")
+        print("\n".join(f"   • {disk.name} - {disk.size_human} - {disk.model}" for disk in disks))
+    
     def _show_raid_summary(self, fs_type: FilesystemType, raid_type: RAIDType, 
                           disks: List[Disk], capacity_info: Dict[str, str]):
         """Muestra resumen de la configuración RAID"""
-        if RICH_AVAILABLE:
-            # Crear tabla de resumen
-            summary_table = Table(title="📋 Resumen de Configuración RAID", show_header=False)
-            summary_table.add_column("Concepto", style="bold cyan", width=20)
-            summary_table.add_column("Valor", style="white")
-            
-            summary_table.add_row("Filesystem", fs_type.value.upper())
-            summary_table.add_row("Tipo RAID", raid_type.value)
-            summary_table.add_row("Número de discos", str(len(disks)))
-            summary_table.add_row("Capacidad total", capacity_info["total"])
-            summary_table.add_row("Capacidad utilizable", capacity_info["usable"])
-            summary_table.add_row("Eficiencia", capacity_info["efficiency"])
-            summary_table.add_row("Redundancia", capacity_info["redundancy"])
-            
-            self.console.console.print(summary_table)
-            
-            # Crear tabla de discos
-            disks_table = Table(title="💾 Discos Seleccionados", show_header=True)
-            disks_table.add_column("Disco", style="cyan")
-            disks_table.add_column("Tamaño", style="green")
-            disks_table.add_column("Modelo", style="yellow")
-            disks_table.add_column("Sectores", style="blue")
-            
-            for disk in disks:
-                disks_table.add_row(
-                    disk.name,
-                    disk.size_human,
-                    disk.model,
-                    str(disk.sector_size)
-                )
-            
-            self.console.console.print(disks_table)
-            
-        else:
-            print("\n📋 Resumen de Configuración RAID:")
-            print(f"   Filesystem: {fs_type.value.upper()}")
-            print(f"   Tipo RAID: {raid_type.value}")
-            print(f"   Discos: {len(disks)}")
-            print(f"   Capacidad total: {capacity_info['total']}")
-            print(f"   Capacidad utilizable: {capacity_info['usable']}")
-            print(f"   Redundancia: {capacity_info['redundancy']}")
-            
-            print("\n💾 Discos seleccionados:")
-            for disk in disks:
-                print(f"   • {disk.name} - {disk.size_human} - {disk.model}")
+        self._show_raid_summary_tables(fs_type, raid_type, disks, capacity_info)
         
         # Advertencias específicas
         warnings = []
         
-        if raid_type in [RAIDType.STRIPE, RAIDType.BTRFS_RAID0]:
+        if raid_type in _NO_REDUNDANCY:
             warnings.append("⚠️  Sin redundancia: la pérdida de cualquier disco significa pérdida total de datos")
         
         if fs_type == FilesystemType.BTRFS and "raid" in raid_type.value:
             warnings.append("⚠️  BTRFS RAID puede requerir configuración adicional después de la creación")
         
-        if raid_type in [RAIDType.BTRFS_RAID5, RAIDType.BTRFS_RAID6]:
+        if raid_type in _EXPERIMENTAL:
             warnings.append("🚨 RAID 5/6 en BTRFS es EXPERIMENTAL - no recomendado para producción")
             warnings.append("⚠️  Riesgo de corrupción de datos durante reconstrucción en RAID 5/6")
         
-        # Verificar si los discos tienen tamaños muy diferentes
-        sizes = [disk.size for disk in disks]
-        if max(sizes) > min(sizes) * 1.5:  # Si hay más de 50% de diferencia
-            warnings.append("⚠️  Los discos tienen tamaños muy diferentes - se usará el tamaño del más pequeño")
+        # Verificar si los discos tienen tamaños muy diferentes (mínimo y máximo en una pasada)
+        if disks:
+            sizes = iter(disks)
+            min_size = max_size = next(sizes).size
+            for disk in sizes:
+                size = disk.size
+                if size < min_size:
+                    min_size = size
+                elif size > max_size:
+                    max_size = size
+            
+            if max_size > min_size * 1.5:  # Si hay más de 50% de diferencia
+                warnings.append("⚠️  Los discos tienen tamaños muy diferentes - se usará el tamaño del más pequeño")
         
         if warnings:
             self.console.print("\n🚨 Advertencias importantes:")
-            for warning in warnings:
-                self.console.print(f"   {warning}", style="yellow")
+            self.console.print("\n".join(f"   {warning}" for warning in warnings), style="yellow")
     
     def _clean_disks(self, disks: List[Disk]):
         """Limpia los discos antes de crear el RAID"""
         self.console.print_panel("Analizando y limpiando discos seleccionados", title="🧹 Preparación")
         
-        for disk in disks:
-            self.console.print(f"🔍 Analizando disco {disk.name}...")
+        if not disks:
+            return
+        
+        # Una sola consulta a lsblk para todo el proceso de análisis y limpieza
+        block_devices = self.disk_manager.snapshot_block_devices()
+        
+        def analyze(disk: Disk):
+            try:
+                return self._analyze_disk_configuration(disk.name, block_devices), None
+            except Exception as e:
+                return None, e
+        
+        # 1. Detectar la configuración de todos los discos en paralelo (solo lectura).
+        # El desmontaje y la destrucción de pools/arrays se hacen después en serie.
+        self.console.print(f"🔍 Analizando {len(disks)} discos...")
+        with ThreadPoolExecutor(max_workers=min(8, len(disks))) as executor:
+            analyses = list(executor.map(analyze, disks))
+        
+        # 2. Desmontar y desmantelar pools/arrays en serie: pueden compartir varios discos
+        to_wipe = []
+        basic_cleanup = set()
+        for disk, (disk_info, analysis_error) in zip(disks, analyses):
+            self.console.print(f"🧹 Preparando disco {disk.name}...")
             
             try:
-                # 1. Detectar qué tipo de configuración tiene el disco
-                disk_info = self._analyze_disk_configuration(disk.name)
+                if analysis_error:
+                    raise analysis_error
                 
-                # 2. Mostrar información encontrada automáticamente
+                # Mostrar información encontrada automáticamente
                 if disk_info['has_data']:
                     self.console.print(f"   📋 Configuración detectada en {disk.name}:")
-                    for info in disk_info['details']:
-                        self.console.print(f"      • {info}")
+                    self.console.print("\n".join(f"      • {info}" for info in disk_info['details']))
                     
-                    # 3. Limpiar automáticamente sin preguntar (como el script bash)
+                    # Limpiar automáticamente sin preguntar (como el script bash)
                     self.console.print(f"   🧹 Procediendo con limpieza automática...")
-                    self._perform_disk_cleanup(disk.name, disk_info)
+                    self._perform_disk_cleanup(disk.name, disk_info, block_devices)
+                    to_wipe.append(disk)
                 else:
                     self.console.print(f"   ✅ Disco {disk.name} está limpio")
-                
-                self.console.print(f"✅ Disco {disk.name} preparado correctamente", style="green")
+                    self.console.print(f"✅ Disco {disk.name} preparado correctamente", style="green")
                 
             except Exception as e:
                 self.console.print(f"⚠️  Advertencia preparando disco {disk.name}: {e}", style="yellow")
                 # Continuar con el siguiente disco en lugar de fallar completamente
                 self.console.print(f"   🔄 Continuando con limpieza básica...", style="blue")
-                try:
-                    self._wipe_disk_completely(disk.name)
-                    self.console.print(f"✅ Limpieza básica completada para {disk.name}", style="green")
-                except Exception as e2:
-                    self.console.print(f"❌ Error crítico con disco {disk.name}: {e2}", style="red")
-                    raise
+                to_wipe.append(disk)
+                basic_cleanup.add(disk.name)
+        
+        # 3. Limpiar metadatos de todos los discos en paralelo (dispositivos independientes)
+        errors = self._wipe_disks(to_wipe, block_devices)
+        
+        for disk in to_wipe:
+            error = errors.get(disk.name)
+            if error:
+                self.console.print(f"❌ Error crítico con disco {disk.name}: {error}", style="red")
+            elif disk.name in basic_cleanup:
+                self.console.print(f"✅ Limpieza básica completada para {disk.name}", style="green")
+            else:
+                self.console.print(f"✅ Disco {disk.name} preparado correctamente", style="green")
+        
+        if errors:
+            raise next(iter(errors.values()))
     
-    def _analyze_disk_configuration(self, disk_name: str) -> Dict:
+    def _wipe_disks(self, disks: List[Disk], block_devices: Dict[str, Dict]) -> Dict[str, Exception]:
+        """Limpia los metadatos de varios discos en paralelo, retorna los errores por disco"""
+        if not disks:
+            return {}
+        
+        def wipe(disk: Disk):
+            # Acumular mensajes por disco para no intercalar la salida de los hilos;
+            # los discos ya se limpian a la vez, así que sus pasos internos van en serie
+            lines = []
+            try:
+                self._wipe_disk_completely(disk.name, block_devices, log=lines.append,
+                                           parallel_partitions=False)
+                return lines, None
+            except Exception as e:
+                return lines, e
+        
+        self.console.print(f"🧽 Limpiando metadatos de {len(disks)} discos...")
+        errors = {}
+        with ThreadPoolExecutor(max_workers=min(8, len(disks))) as executor:
+            futures = {}
+            for disk in disks:
+                self.console.print(f"   🧽 {disk.name}: limpiando...")
+                futures[executor.submit(wipe, disk)] = disk
+            # Mostrar cada disco en cuanto termina en lugar de esperar a todos
+            for future in as_completed(futures):
+                disk = futures[future]
+                lines, error = future.result()
+                status = "❌ error" if error else "✅ terminado"
+                self.console.print(f"   🧽 {disk.name}: {status}")
+                if lines:
+                    self.console.print("\n".join(lines))
+                if error:
+                    errors[disk.name] = error
+        
+        return errors
+    
+    def _analyze_disk_configuration(self, disk_name: str, block_devices: Optional[Dict[str, Dict]] = None) -> Dict:
         """Analiza la configuración actual de un disco"""
         info = {
             'has_data': False,
@@ -3689,68 +4075,56 @@ class RAIDManager:
         device_path = f"/dev/{disk_name}"
         
         # 1. Verificar particiones
-        try:
-            result = self.system.run_command(['lsblk', '-n', '-o', 'NAME,MOUNTPOINT,FSTYPE', device_path])
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) >= 1:
-                        part_name = parts[0].strip()
-                        mountpoint = parts[1].strip() if len(parts) > 1 and parts[1] != '' else None
-                        fstype = parts[2].strip() if len(parts) > 2 and parts[2] != '' else None
-                        
-                        if part_name != disk_name:  # Es una partición
-                            info['partitions'].append(part_name)
-                            info['has_data'] = True
-                            
-                            if mountpoint and mountpoint != '':
-                                info['mounted_partitions'].append(f"/dev/{part_name} en {mountpoint}")
-                                info['details'].append(f"Partición {part_name} montada en {mountpoint}")
-                            elif fstype:
-                                info['details'].append(f"Partición {part_name} con filesystem {fstype}")
-                            else:
-                                info['details'].append(f"Partición {part_name}")
-        except subprocess.CalledProcessError:
-            pass
+        if block_devices is None:
+            block_devices = self.disk_manager.snapshot_block_devices()
         
-        # 2. Verificar si forma parte de pools ZFS
-        try:
-            self.system.run_command(['which', 'zpool'])
-            result = self.system.run_command(['zpool', 'status'])
+        for part in DiskManager.iter_descendants(block_devices.get(disk_name, {})):
+            part_name = part['name']
+            mountpoint = part.get('mountpoint')
+            fstype = part.get('fstype')
             
-            current_pool = None
-            for line in result.stdout.split('\n'):
-                line = line.strip()
-                if line.startswith('pool:'):
-                    current_pool = line.split('pool:')[1].strip()
-                elif current_pool and (disk_name in line or any(f"{disk_name}p{i}" in line for i in range(1, 10))):
-                    if current_pool not in info['zfs_pools']:
-                        info['zfs_pools'].append(current_pool)
+            info['partitions'].append(part_name)
+            info['has_data'] = True
+            
+            if mountpoint:
+                info['mounted_partitions'].append(f"/dev/{part_name} en {mountpoint}")
+                info['details'].append(f"Partición {part_name} montada en {mountpoint}")
+            elif fstype:
+                info['details'].append(f"Partición {part_name} con filesystem {fstype}")
+            else:
+                info['details'].append(f"Partición {part_name}")
+        
+        # 2. Verificar si forma parte de pools ZFS
+        if self.zfs_available:
+            try:
+                for pool, devices in self._get_zfs_pool_devices().items():
+                    if any(self._device_belongs_to_disk(device, disk_name) for device in devices):
+                        info['zfs_pools'].append(pool)
                         info['has_data'] = True
-                        info['details'].append(f"Miembro del pool ZFS '{current_pool}'")
-        except subprocess.CalledProcessError:
-            pass
+                        info['details'].append(f"Miembro del pool ZFS '{pool}'")
+            except CalledProcessError:
+                pass
         
         # 3. Verificar si forma parte de filesystems BTRFS
-        try:
-            self.system.run_command(['which', 'btrfs'])
-            result = self.system.run_command(['btrfs', 'filesystem', 'show'])
-            
-            current_uuid = None
-            current_label = None
-            for line in result.stdout.split('\n'):
-                if 'uuid:' in line:
-                    current_uuid = line.split('uuid:')[1].strip()
-                    current_label = None
-                elif 'Label:' in line:
-                    current_label = line.split('Label:')[1].strip().replace("'", "")
-                elif 'devid' in line and device_path in line:
-                    fs_name = current_label if current_label else f"UUID {current_uuid[:8]}..."
-                    info['btrfs_filesystems'].append(fs_name)
-                    info['has_data'] = True
-                    info['details'].append(f"Miembro del filesystem BTRFS '{fs_name}'")
-        except subprocess.CalledProcessError:
-            pass
+        if _tool_exists('btrfs'):
+            try:
+                result = self.system.run_command(['btrfs', 'filesystem', 'show'])
+                
+                current_uuid = None
+                current_label = None
+                for line in result.stdout.split('\n'):
+                    if 'uuid:' in line:
+                        current_uuid = line.partition('uuid:')[2].strip()
+                        current_label = None
+                    elif 'Label:' in line:
+                        current_label = line.partition('Label:')[2].strip().replace("'", "")
+                    elif 'devid' in line and device_path in line:
+                        fs_name = current_label if current_label else f"UUID {current_uuid[:8]}..."
+                        info['btrfs_filesystems'].append(fs_name)
+                        info['has_data'] = True
+                        info['details'].append(f"Miembro del filesystem BTRFS '{fs_name}'")
+            except CalledProcessError:
+                pass
         
         # 4. Verificar arrays MDADM
         try:
@@ -3762,27 +4136,28 @@ class RAIDManager:
                     info['mdadm_arrays'].append(array_name)
                     info['has_data'] = True
                     info['details'].append(f"Miembro del array MDADM '{array_name}'")
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass
         
         # 5. Verificar Volume Groups LVM
-        try:
-            self.system.run_command(['which', 'pvs'])
-            result = self.system.run_command(['pvs', '--noheadings', '-o', 'pv_name,vg_name'])
-            for line in result.stdout.strip().split('\n'):
-                if line.strip() and device_path in line:
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        vg_name = parts[1]
-                        info['lvm_volumes'].append(vg_name)
-                        info['has_data'] = True
-                        info['details'].append(f"Physical Volume en VG '{vg_name}'")
-        except subprocess.CalledProcessError:
-            pass
+        if _tool_exists('pvs'):
+            try:
+                result = self.system.run_command(['pvs', '--noheadings', '-o', 'pv_name,vg_name'])
+                for line in result.stdout.splitlines():
+                    if line.strip() and device_path in line:
+                        parts = line.split()
+                        if len(parts) >= 2:
+                            vg_name = parts[1]
+                            info['lvm_volumes'].append(vg_name)
+                            info['has_data'] = True
+                            info['details'].append(f"Physical Volume en VG '{vg_name}'")
+            except CalledProcessError:
+                pass
         
         return info
     
-    def _perform_disk_cleanup(self, disk_name: str, disk_info: Dict):
+    def _perform_disk_cleanup(self, disk_name: str, disk_info: Dict,
+                              block_devices: Optional[Dict[str, Dict]] = None):
         """Realiza la limpieza del disco según la configuración detectada"""
         if not disk_info['has_data']:
             self.console.print(f"   ✅ Disco {disk_name} ya está limpio")
@@ -3792,7 +4167,7 @@ class RAIDManager:
         if disk_info['mounted_partitions']:
             self.console.print(f"   📤 Desmontando particiones...")
             for partition_info in disk_info['mounted_partitions']:
-                partition = partition_info.split(' en ')[0]  # Extraer solo el dispositivo
+                partition = partition_info.partition(' en ')[0]  # Extraer solo el dispositivo
                 self.console.print(f"      • Desmontando {partition}")
                 
                 # Intentar desmontaje normal
@@ -3824,21 +4199,15 @@ class RAIDManager:
         if disk_info['btrfs_filesystems']:
             self.console.print(f"   🌿 Limpiando filesystems BTRFS...")
             device_path = f"/dev/{disk_name}"
-            try:
-                # Buscar y desmontar puntos de montaje BTRFS
-                result = self.system.run_command(['findmnt', '-t', 'btrfs', '-n', '-o', 'TARGET,SOURCE'], check=False)
-                if result.returncode == 0:
-                    for line in result.stdout.strip().split('\n'):
-                        if line.strip() and device_path in line:
-                            mountpoint = line.split()[0]
-                            if self.system.run_command_safe(['umount', mountpoint]):
-                                self.console.print(f"      ✅ Desmontado BTRFS en {mountpoint}")
-                            elif self.system.run_command_safe(['umount', '-f', mountpoint]):
-                                self.console.print(f"      ✅ Desmontado BTRFS forzadamente en {mountpoint}")
-                            else:
-                                self.console.print(f"      ⚠️  No se pudo desmontar {mountpoint}")
-            except subprocess.CalledProcessError:
-                pass  # No hay filesystems BTRFS montados
+            # Buscar y desmontar puntos de montaje BTRFS
+            for device, mountpoint, fstype in _read_mountinfo():
+                if fstype == 'btrfs' and device_path in device:
+                    if self.system.run_command_safe(['umount', mountpoint]):
+                        self.console.print(f"      ✅ Desmontado BTRFS en {mountpoint}")
+                    elif self.system.run_command_safe(['umount', '-f', mountpoint]):
+                        self.console.print(f"      ✅ Desmontado BTRFS forzadamente en {mountpoint}")
+                    else:
+                        self.console.print(f"      ⚠️  No se pudo desmontar {mountpoint}")
         
         # 4. Parar arrays MDADM
         if disk_info['mdadm_arrays']:
@@ -3867,127 +4236,233 @@ class RAIDManager:
                 else:
                     self.console.print(f"      ⚠️  Error removiendo PV de {vg}, continuando...")
         
-        # 6. Limpiar completamente el disco
-        self.console.print(f"   🧽 Limpiando todos los metadatos...")
-        self._wipe_disk_completely(disk_name)
+        # 6. La limpieza de metadatos se hace después para todos los discos a la vez (_wipe_disks)
     
-    def _wipe_disk_completely(self, disk_name: str):
+    def _wipe_disk_completely(self, disk_name: str, block_devices: Optional[Dict[str, Dict]] = None,
+                              log=None, parallel_partitions: bool = True):
         """Limpia completamente un disco de todos los metadatos"""
+        # log permite acumular los mensajes cuando se limpian varios discos en paralelo;
+        # parallel_partitions=False evita abrir otro pool de hilos dentro de cada disco
+        log = log or self.console.print
         device_path = f"/dev/{disk_name}"
+        if block_devices is None:
+            block_devices = self.disk_manager.snapshot_block_devices()
+        
+        # 0. Limpiar firmas dentro de las particiones antes de borrar la tabla
+        # (cada partición es un dispositivo independiente: se pueden limpiar a la vez).
+        # Solo particiones: md/LVM/dm ya se desmontaron en la limpieza previa, pueden ser
+        # compartidos entre discos y sus nombres de lsblk no siempre existen en /dev
+        partition_names = [node['name'] for node in
+                           DiskManager.iter_descendants(block_devices.get(disk_name, {}))
+                           if node.get('type') == 'part']
+        partition_commands = [['wipefs', '-af', f'/dev/{name}'] for name in partition_names]
+        if parallel_partitions:
+            partition_results = self.system.run_commands_parallel(partition_commands, max_workers=8)
+        else:
+            partition_results = [self.system.run_command_safe(cmd) for cmd in partition_commands]
+        for partition_name, ok in zip(partition_names, partition_results):
+            if ok:
+                log(f"      ✅ Partición {partition_name} limpiada")
+            else:
+                log(f"      ⚠️  No se pudo limpiar partición {partition_name}")
         
         # 1. Limpiar etiquetas ZFS si es posible
-        try:
-            self.system.run_command(['which', 'zpool'], check=False)
+        # (los pasos 1-3 escriben sobre el mismo dispositivo: se ejecutan en orden)
+        if self.zfs_available:
             if self.system.run_command_safe(['zpool', 'labelclear', '-f', device_path]):
-                self.console.print(f"      ✅ Etiquetas ZFS limpiadas")
-        except subprocess.CalledProcessError:
-            pass  # ZFS no disponible
+                log(f"      ✅ Etiquetas ZFS limpiadas")
         
         # 2. Limpiar metadatos MDADM
         if self.system.run_command_safe(['mdadm', '--zero-superblock', device_path]):
-            self.console.print(f"      ✅ Metadatos MDADM limpiados")
+            log(f"      ✅ Metadatos MDADM limpiados")
         
         # 3. Usar wipefs para limpiar todas las firmas de filesystem
-        self.console.print(f"      • Limpiando firmas de filesystem...")
+        log(f"      • Limpiando firmas de filesystem...")
         if self.system.run_command_safe(['wipefs', '-af', device_path]):
-            self.console.print(f"      ✅ Firmas de filesystem limpiadas")
+            log(f"      ✅ Firmas de filesystem limpiadas")
         else:
-            self.console.print(f"      ⚠️  Error con wipefs, usando método alternativo...")
+            log(f"      ⚠️  Error con wipefs, usando método alternativo...")
         
-        # 4. Limpiar primeros sectores con dd (como en script bash)
-        self.console.print(f"      • Limpiando primeros 100MB...")
-        if self.system.run_command_safe(['dd', 'if=/dev/zero', f'of={device_path}', 'bs=1M', 'count=100', 'conv=fsync']):
-            self.console.print(f"      ✅ Primeros sectores limpiados")
+        # 4. Limpiar primeros sectores (como en script bash)
+        log(f"      • Limpiando primeros 100MB...")
+        if self._zero_disk_range(device_path, 0, 100):
+            log(f"      ✅ Primeros sectores limpiados")
         else:
-            self.console.print(f"      ⚠️  Error limpiando primeros sectores")
+            log(f"      ⚠️  Error limpiando primeros sectores")
         
         # 5. Limpiar últimos sectores (metadatos al final del disco)
         try:
-            self.console.print(f"      • Limpiando últimos sectores...")
+            log(f"      • Limpiando últimos sectores...")
             # Obtener tamaño del disco en bytes
-            result = self.system.run_command(['lsblk', '-dpno', 'SIZE', device_path, '--bytes'], check=False)
-            if result.returncode == 0:
-                disk_size = int(result.stdout.strip())
-                
-                if disk_size > 104857600:  # Mayor a 100MB
-                    seek_mb = (disk_size // 1048576) - 100  # 100MB antes del final
-                    if self.system.run_command_safe(['dd', 'if=/dev/zero', f'of={device_path}', 
-                                                   'bs=1M', f'seek={seek_mb}', 'count=100', 'conv=fsync']):
-                        self.console.print(f"      ✅ Últimos sectores limpiados")
-                    else:
-                        self.console.print(f"      ⚠️  Error limpiando últimos sectores")
-        except (subprocess.CalledProcessError, ValueError):
-            self.console.print(f"      ⚠️  Error obteniendo tamaño del disco")
+            disk_size = self._get_disk_size_bytes(disk_name, block_devices)
+            
+            if disk_size > 104857600:  # Mayor a 100MB
+                seek_mb = (disk_size // 1048576) - 100  # 100MB antes del final
+                if self._zero_disk_range(device_path, seek_mb, 100):
+                    log(f"      ✅ Últimos sectores limpiados")
+                else:
+                    log(f"      ⚠️  Error limpiando últimos sectores")
+        except (CalledProcessError, ValueError):
+            log(f"      ⚠️  Error obteniendo tamaño del disco")
         
         # 6. Limpiar tabla de particiones con sgdisk si está disponible
         if self.system.run_command_safe(['sgdisk', '--zap-all', device_path]):
-            self.console.print(f"      ✅ Tabla de particiones GPT limpiada")
+            log(f"      ✅ Tabla de particiones GPT limpiada")
         else:
             # sgdisk no disponible, usar dd básico para MBR
             if self.system.run_command_safe(['dd', 'if=/dev/zero', f'of={device_path}', 'bs=512', 'count=1', 'conv=fsync']):
-                self.console.print(f"      ✅ Tabla de particiones MBR limpiada")
+                log(f"      ✅ Tabla de particiones MBR limpiada")
         
-        # 7. Informar al kernel sobre los cambios y esperar
+        # 7. Informar al kernel sobre los cambios y esperar a que udev procese los eventos
+        # (espera acotada por eventos en lugar de una pausa fija)
         self.system.run_command_safe(['partprobe', device_path])
-        self.system.run_command_safe(['udevadm', 'settle'])
+        self.system.run_command_safe(['udevadm', 'settle', '--timeout=5'])
+    
+    def _get_disk_size_bytes(self, disk_name: str, block_devices: Dict[str, Dict]) -> int:
+        """Obtiene el tamaño del disco en bytes leyendo sysfs (sin lanzar procesos)"""
+        try:
+            # /sys/block/<disco>/size siempre se expresa en sectores de 512 bytes
+            with open(f'/sys/block/{disk_name}/size') as f:
+                return int(f.read()) * 512
+        except (OSError, ValueError):
+            pass
         
-        # 8. Esperar como en el script bash
-        import time
-        time.sleep(3)
+        # Respaldo: instantánea de lsblk y, en último caso, blockdev
+        size = block_devices.get(disk_name, {}).get('size')
+        if size:
+            return int(size)
+        result = self.system.run_command(['blockdev', '--getsize64', f'/dev/{disk_name}'])
+        return int(result.stdout.strip())
+    
+    def _zero_disk_range(self, device_path: str, start_mb: int, count_mb: int) -> bool:
+        """Pone a cero count_mb MiB desde start_mb, con dd como respaldo"""
+        offset, length = start_mb << 20, count_mb << 20
+        if self._zero_range_ioctl(device_path, offset, length):
+            return True
+        if self._write_zeros_direct(device_path, offset, length):
+            return True
+        return self.system.run_command_safe(['dd', 'if=/dev/zero', f'of={device_path}', 'bs=1M',
+                                             f'seek={start_mb}', f'count={count_mb}', 'conv=fsync'])
+    
+    def _zero_range_ioctl(self, device_path: str, offset: int, length: int) -> bool:
+        """Pone a cero el rango con BLKZEROOUT (el kernel usa WRITE ZEROES/UNMAP si el disco lo soporta)"""
+        if not self.system.is_root():
+            return False
+        
+        try:
+            fd = os.open(device_path, os.O_WRONLY | os.O_CLOEXEC)
+        except OSError:
+            return False
+        
+        try:
+            fcntl.ioctl(fd, BLKZEROOUT, struct.pack('QQ', offset, length))
+            return True
+        except OSError:
+            return False  # Dispositivo sin soporte (o no es un dispositivo de bloques)
+        finally:
+            os.close(fd)
     
-    def _unmount_disk(self, disk_name: str):
+    def _write_zeros_direct(self, device_path: str, offset: int, length: int) -> bool:
+        """Escribe ceros con O_DIRECT desde el propio proceso (requiere root)"""
+        if not self.system.is_root():
+            return False  # Sin root solo es posible mediante sudo dd
+        
+        chunk = 1 << 20
+        try:
+            fd = os.open(device_path, os.O_WRONLY | os.O_CLOEXEC | getattr(os, 'O_DIRECT', 0))
+        except OSError:
+            return False
+        
+        # mmap anónimo: alineado a página y ya relleno de ceros, como exige O_DIRECT
+        zero_buf = mmap.mmap(-1, chunk)
+        try:
+            for position in range(offset, offset + length, chunk):
+                # Una escritura corta (p. ej. al pasar del final del disco) no cuenta como
+                # éxito: retornar False para que _zero_disk_range recurra a dd
+                written = os.pwrite(fd, zero_buf, position)
+                if written != chunk:
+                    self.system.logger.error(
+                        f"Escritura corta en {device_path} ({written}/{chunk} bytes en {position})")
+                    return False
+            os.fsync(fd)
+            return True
+        except OSError as e:
+            self.system.logger.error(f"Error escribiendo ceros en {device_path}: {e}")
+            return False
+        finally:
+            zero_buf.close()
+            os.close(fd)
+    
+    def _unmount_disk(self, disk_name: str, block_devices: Optional[Dict[str, Dict]] = None):
         """Desmonta todas las particiones de un disco"""
         try:
-            # Obtener particiones montadas
-            result = self.system.run_command(['mount'])
-            mounted_partitions = []
-            
-            for line in result.stdout.split('\n'):
-                if f'/dev/{disk_name}' in line:
-                    parts = line.split()
-                    if len(parts) > 0:
-                        mounted_partitions.append(parts[0])
+            # Obtener particiones montadas desde la instantánea de lsblk
+            if block_devices is None:
+                block_devices = self.disk_manager.snapshot_block_devices()
+            
+            disk_entry = block_devices.get(disk_name, {})
+            mounted_partitions = [
+                f"/dev/{device['name']}"
+                for device in [disk_entry, *DiskManager.iter_descendants(disk_entry)]
+                if device.get('mountpoint')
+            ]
             
             # Desmontar cada partición
             for partition in mounted_partitions:
                 self.console.print(f"   📤 Desmontando {partition}...")
                 try:
                     self.system.run_command(['umount', partition])
-                except subprocess.CalledProcessError:
+                except CalledProcessError:
                     # Forzar desmontaje si es necesario
                     try:
                         self.system.run_command(['umount', '-f', partition])
-                    except subprocess.CalledProcessError:
+                    except CalledProcessError:
                         self.console.print(f"   ⚠️  No se pudo desmontar {partition}", style="yellow")
                         
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             pass  # No hay problema si no hay particiones montadas
     
+    def _get_zfs_pool_devices(self) -> Dict[str, List[str]]:
+        """Obtiene los dispositivos de cada pool ZFS con un único 'zpool list -vHPL'"""
+        result = self.system.run_command(['zpool', 'list', '-v', '-H', '-P', '-L'])
+        
+        pool_devices = {}
+        current_pool = None
+        for line in result.stdout.split('\n'):
+            fields = line.split()
+            if not fields:
+                continue
+            if line[0].isspace():
+                # vdevs indentados bajo el pool actual
+                if current_pool and fields[0].startswith('/dev/'):
+                    pool_devices[current_pool].append(fields[0])
+            elif len(fields) > 1 and fields[1] != '-':
+                # Línea de pool; 'cache', 'logs', 'spares'... tampoco van indentadas pero no tienen tamaño
+                current_pool = fields[0]
+                pool_devices[current_pool] = []
+        
+        return pool_devices
+    
+    @staticmethod
+    def _device_belongs_to_disk(device_path: str, disk_name: str) -> bool:
+        """Indica si una ruta /dev/... es el disco o una de sus particiones"""
+        # Discos terminados en dígito (nvme0n1, mmcblk0) usan sufijo 'p' en las particiones
+        partition_suffix = r'p\d+' if disk_name[-1].isdigit() else r'\d+'
+        return re.fullmatch(rf'/dev/{re.escape(disk_name)}(?:{partition_suffix})?',
+                            os.path.realpath(device_path)) is not None
+    
     def _destroy_zfs_pools_using_disk(self, disk_name: str):
         """Destruye pools ZFS que usen el disco especificado"""
+        # Verificar si ZFS está disponible
+        if not self.zfs_available:
+            return
+        
         try:
-            # Verificar si ZFS está disponible
-            self.system.run_command(['which', 'zpool'])
-            
-            # Obtener lista de pools
-            result = self.system.run_command(['zpool', 'list', '-H', '-o', 'name'])
-            pools = [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
-            
-            pools_to_destroy = []
-            
-            for pool in pools:
-                try:
-                    # Verificar si el disco está en el pool
-                    status_result = self.system.run_command(['zpool', 'status', pool])
-                    
-                    # Buscar el disco en la salida del status
-                    for line in status_result.stdout.split('\n'):
-                        if disk_name in line and ('/dev/' in line or line.strip().startswith(disk_name)):
-                            pools_to_destroy.append(pool)
-                            break
-                            
-                except subprocess.CalledProcessError:
-                    continue
+            # Una sola consulta con las rutas reales de todos los vdevs
+            pools_to_destroy = [
+                pool for pool, devices in self._get_zfs_pool_devices().items()
+                if any(self._device_belongs_to_disk(device, disk_name) for device in devices)
+            ]
             
             # Destruir pools que usen este disco
             for pool in pools_to_destroy:
@@ -3998,14 +4473,14 @@ class RAIDManager:
                         try:
                             self.system.run_command(['zpool', 'export', pool])
                             self.console.print(f"   📤 Pool {pool} exportado", style="blue")
-                        except subprocess.CalledProcessError:
+                        except CalledProcessError:
                             self.console.print(f"   ⚠️  No se pudo exportar {pool}, forzando destrucción", style="yellow")
                         
                         # Luego destruir
                         self.system.run_command(['zpool', 'destroy', '-f', pool])
                         self.console.print(f"   ✅ Pool {pool} destruido", style="green")
                         
-                    except subprocess.CalledProcessError as e:
+                    except CalledProcessError as e:
                         # Intentar forzar la destrucción más agresivamente
                         self.console.print(f"   ⚠️  Error destruyendo {pool}, intentando limpieza forzada", style="yellow")
                         try:
@@ -4013,93 +4488,23 @@ class RAIDManager:
                             self.system.run_command(['zfs', 'unmount', '-f', pool])
                             self.system.run_command(['zpool', 'destroy', '-f', pool])
                             self.console.print(f"   ✅ Pool {pool} destruido (forzado)", style="green")
-                        except subprocess.CalledProcessError:
+                        except CalledProcessError:
                             self.console.print(f"   ❌ No se pudo destruir el pool {pool}. Continúa con limpieza manual.", style="red")
                             self.console.print(f"   💡 Comando manual: sudo zpool destroy -f {pool}", style="blue")
                 else:
                     self.console.print("❌ Operación cancelada por el usuario", style="red")
                     raise Exception("Operación cancelada")
                     
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             # ZFS no disponible, continuar
             pass
     
-    def _wipe_disk_metadata(self, disk_name: str):
-        """Limpia todos los metadatos del disco"""
-        self.console.print(f"   🧽 Limpiando metadatos de /dev/{disk_name}...")
-        
-        try:
-            # Primero intentar con dd para limpiar los primeros sectores
-            try:
-                self.system.run_command(['dd', 'if=/dev/zero', f'of=/dev/{disk_name}', 'bs=1M', 'count=100'])
-                self.console.print(f"   ✨ Primeros sectores limpiados con dd", style="blue")
-            except subprocess.CalledProcessError:
-                self.console.print(f"   ⚠️  No se pudieron limpiar sectores con dd", style="yellow")
-            
-            # Usar wipefs para limpiar metadatos
-            try:
-                self.system.run_command(['wipefs', '-af', f'/dev/{disk_name}'])
-                self.console.print(f"   ✨ Metadatos limpiados con wipefs", style="green")
-            except subprocess.CalledProcessError:
-                self.console.print(f"   ⚠️  wipefs falló, intentando limpieza manual", style="yellow")
-                
-                # Intentar limpiar manualmente con dd
-                try:
-                    # Limpiar el principio del disco
-                    self.system.run_command(['dd', 'if=/dev/zero', f'of=/dev/{disk_name}', 'bs=512', 'count=2048'])
-                    
-                    # Obtener tamaño del disco y limpiar el final
-                    result = self.system.run_command(['blockdev', '--getsz', f'/dev/{disk_name}'])
-                    sectors = int(result.stdout.strip())
-                    end_sector = sectors - 2048
-                    
-                    self.system.run_command(['dd', 'if=/dev/zero', f'of=/dev/{disk_name}', 
-                                           f'seek={end_sector}', 'bs=512', 'count=2048'])
-                    
-                    self.console.print(f"   ✨ Limpieza manual completada", style="green")
-                    
-                except subprocess.CalledProcessError as e:
-                    self.console.print(f"   ❌ Error en limpieza manual: {e}", style="red")
-                    # Continuar de todas formas
-            
-            # Limpiar también particiones existentes si existen
-            try:
-                result = self.system.run_command(['lsblk', '-ln', '-o', 'NAME', f'/dev/{disk_name}'])
-                partitions = result.stdout.strip().split('\n')[1:]  # Skip el disco principal
-                
-                for partition in partitions:
-                    if partition.strip():
-                        partition_name = partition.strip()
-                        try:
-                            self.system.run_command(['wipefs', '-af', f'/dev/{partition_name}'])
-                            self.console.print(f"   ✨ Partición {partition_name} limpiada", style="blue")
-                        except subprocess.CalledProcessError:
-                            self.console.print(f"   ⚠️  No se pudo limpiar partición {partition_name}", style="yellow")
-                            
-            except subprocess.CalledProcessError:
-                pass  # No hay particiones para limpiar
-                
-            # Notificar al kernel sobre los cambios
-            try:
-                self.system.run_command(['partprobe', f'/dev/{disk_name}'])
-                self.console.print(f"   🔄 Kernel notificado de cambios", style="blue")
-            except subprocess.CalledProcessError:
-                pass
-                
-            self.console.print(f"   ✅ Disco /dev/{disk_name} preparado", style="green")
-            
-        except Exception as e:
-            self.console.print(f"   ⚠️  Algunos errores durante la limpieza, pero continuando: {e}", style="yellow")
-            # No lanzar excepción, continuar con el proceso
-    
     def _create_zfs_raid(self, raid_type: RAIDType, disks: List[Disk]):
         """Crea un RAID ZFS"""
         self.console.print_panel("Configurando ZFS RAID", title="🔷 ZFS")
         
         # Verificar que ZFS esté disponible
-        try:
-            self.system.run_command(['which', 'zpool'])
-        except subprocess.CalledProcessError:
+        if not self.zfs_available:
             self.console.print("❌ ZFS no está disponible en el sistema", style="red")
             raise Exception("ZFS no disponible")
         
@@ -4129,47 +4534,43 @@ class RAIDManager:
     def _ensure_zfs_module_loaded(self):
         """Asegura que el módulo ZFS esté cargado"""
         try:
-            result = self.system.run_command(['lsmod'])
-            if 'zfs' not in result.stdout:
+            if not _zfs_module_loaded():
                 self.console.print("📦 Cargando módulo ZFS...")
                 self.system.run_command(['modprobe', 'zfs'])
                 
                 # Esperar un poco y verificar
-                import time
                 time.sleep(2)
                 
-                result = self.system.run_command(['lsmod'])
-                if 'zfs' not in result.stdout:
+                _zfs_module_loaded.cache_clear()
+                if not _zfs_module_loaded():
                     raise Exception("No se pudo cargar el módulo ZFS")
                     
                 self.console.print("✅ Módulo ZFS cargado", style="green")
                 
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error cargando módulo ZFS: {e}", style="red")
             raise
     
     def _get_zfs_pool_name(self) -> str:
         """Obtiene el nombre del pool ZFS del usuario"""
+        # Consultar una sola vez los pools existentes; cada reintento solo mira el conjunto
+        result = self.system.run_command(['zpool', 'list', '-H', '-o', 'name'], check=False)
+        existing_pools = set(result.stdout.split()) if result.returncode == 0 else set()
+        
+        return self._prompt_validated("📝 Nombre del pool ZFS", "storage", [
+            (bool, "❌ El nombre no puede estar vacío"),
+            (_VALID_NAME_RE.match, "❌ El nombre solo puede contener letras, números, _ y -"),
+            (lambda name: name not in existing_pools, "❌ El pool '{}' ya existe"),
+        ])
+    
+    def _prompt_validated(self, message: str, default: str, validators: list) -> str:
+        """Solicita un valor hasta que cumpla todas las validaciones (predicado, mensaje de error)"""
         while True:
-            pool_name = self.console.prompt("📝 Nombre del pool ZFS", "storage").strip()
-            
-            if not pool_name:
-                self.console.print("❌ El nombre no puede estar vacío", style="red")
-                continue
-                
-            # Verificar que el nombre sea válido
-            if not pool_name.replace('_', '').replace('-', '').isalnum():
-                self.console.print("❌ El nombre solo puede contener letras, números, _ y -", style="red")
-                continue
-                
-            # Verificar que no exista ya
-            try:
-                result = self.system.run_command(['zpool', 'list', pool_name])
-                self.console.print(f"❌ El pool '{pool_name}' ya existe", style="red")
-                continue
-            except subprocess.CalledProcessError:
-                # Pool no existe, perfecto
-                return pool_name
+            value = self.console.prompt(message, default).strip()
+            error = next((error for check, error in validators if not check(value)), None)
+            if error is None:
+                return value
+            self.console.print(error.format(value), style="red")
     
     def _get_mount_point(self, default_path: str) -> str:
         """Obtiene el punto de montaje del usuario"""
@@ -4192,7 +4593,7 @@ class RAIDManager:
                         # SystemManager ahora maneja sudo automáticamente
                         self.system.run_command(['mkdir', '-p', mount_point])
                         self.console.print(f"✅ Directorio {mount_point} creado", style="green")
-                    except subprocess.CalledProcessError as e:
+                    except CalledProcessError as e:
                         self.console.print(f"❌ Error creando directorio: {e}", style="red")
                         raise Exception(f"No se pudo crear el directorio {mount_point}")
             else:
@@ -4203,13 +4604,19 @@ class RAIDManager:
     def _configure_zfs_arc(self) -> int:
         """Configura el tamaño del ARC de ZFS"""
         try:
-            # Obtener RAM del sistema
-            with open('/proc/meminfo', 'r') as f:
-                for line in f:
-                    if line.startswith('MemTotal:'):
-                        ram_kb = int(line.split()[1])
-                        ram_gb = ram_kb // (1024 * 1024)
-                        break
+            # Obtener RAM del sistema (MemTotal es la primera línea de /proc/meminfo)
+            fd = os.open('/proc/meminfo', os.O_RDONLY)
+            try:
+                buf = os.read(fd, 512)
+            finally:
+                os.close(fd)
+            
+            start = buf.find(b'MemTotal:')
+            if start < 0:
+                raise ValueError("MemTotal no encontrado en /proc/meminfo")
+            start += len(b'MemTotal:')
+            ram_kb = int(buf[start:buf.find(b'kB', start)])
+            ram_gb = ram_kb // (1024 * 1024)
             
             # Calcular ARC recomendado (25% de RAM)
             recommended_arc = max(1, ram_gb // 4)
@@ -4217,19 +4624,11 @@ class RAIDManager:
             self.console.print(f"💾 RAM del sistema: {ram_gb}GB")
             self.console.print(f"📊 ARC recomendado: {recommended_arc}GB")
             
-            while True:
-                arc_input = self.console.prompt(f"🎯 Tamaño del ARC en GB", str(recommended_arc)).strip()
-                try:
-                    arc_size = int(arc_input)
-                    if arc_size < 1:
-                        self.console.print("❌ El ARC debe ser al menos 1GB", style="red")
-                        continue
-                    if arc_size > ram_gb:
-                        self.console.print(f"❌ El ARC no puede ser mayor que la RAM ({ram_gb}GB)", style="red")
-                        continue
-                    return arc_size
-                except ValueError:
-                    self.console.print("❌ Ingresa un número válido", style="red")
+            return int(self._prompt_validated("🎯 Tamaño del ARC en GB", str(recommended_arc), [
+                (lambda value: value.isascii() and value.isdigit(), "❌ Ingresa un número válido"),
+                (lambda value: int(value) >= 1, "❌ El ARC debe ser al menos 1GB"),
+                (lambda value: int(value) <= ram_gb, f"❌ El ARC no puede ser mayor que la RAM ({ram_gb}GB)"),
+            ]))
                     
         except Exception as e:
             self.console.print(f"⚠️  Error detectando RAM, usando 1GB para ARC: {e}", style="yellow")
@@ -4237,23 +4636,17 @@ class RAIDManager:
     
     def _detect_optimal_ashift(self, disks: List[Disk]) -> int:
         """Detecta el ashift óptimo para ZFS"""
-        max_sector_size = 512
-        has_4k_sectors = False
-        
-        for disk in disks:
-            if disk.sector_size > max_sector_size:
-                max_sector_size = disk.sector_size
-            if disk.sector_size == 4096:
-                has_4k_sectors = True
+        sizes = [disk.sector_size for disk in disks]
+        max_sector_size = max([512, *sizes])
+        has_4k_sectors = 4096 in sizes
         
         # Estrategia de ashift optimizada para compatibilidad
         if max_sector_size <= 512 and not has_4k_sectors:
             ashift = 12  # Compatibilidad con cache devices SSD
             self.console.print("🔧 Usando ashift=12 para compatibilidad con cache devices", style="blue")
         else:
-            # Calcular ashift basado en el tamaño de sector
-            import math
-            ashift = int(math.log2(max_sector_size)) if max_sector_size >= 512 else 12
+            # Calcular ashift basado en el tamaño de sector (log2 entero, sin pasar por float)
+            ashift = max_sector_size.bit_length() - 1 if max_sector_size >= 512 else 12
             if ashift < 9:
                 ashift = 12  # Mínimo seguro
             self.console.print(f"🔧 Ashift detectado: {ashift} (sector size: {max_sector_size})", style="blue")
@@ -4285,22 +4678,13 @@ class RAIDManager:
         # Añadir nombre del pool
         cmd.append(pool_name)
         
-        # Añadir configuración RAID
-        if raid_type == RAIDType.STRIPE:
-            # Stripe: solo añadir los discos directamente
-            pass
-        elif raid_type == RAIDType.MIRROR:
-            cmd.append('mirror')
-        elif raid_type == RAIDType.RAIDZ1:
-            cmd.append('raidz1')
-        elif raid_type == RAIDType.RAIDZ2:
-            cmd.append('raidz2')
-        elif raid_type == RAIDType.RAIDZ3:
-            cmd.append('raidz3')
+        # Añadir configuración RAID (stripe no lleva palabra clave: solo los discos)
+        vdev_keyword = _ZFS_VDEV_KEYWORDS.get(raid_type)
+        if vdev_keyword:
+            cmd.append(vdev_keyword)
         
         # Añadir discos
-        for disk in disks:
-            cmd.append(f'/dev/{disk.name}')
+        cmd += [f'/dev/{disk.name}' for disk in disks]
         
         try:
             self.console.print(f"📝 Ejecutando: {' '.join(cmd)}")
@@ -4310,7 +4694,7 @@ class RAIDManager:
             # Mostrar información del pool creado
             self._show_created_pool_info(pool_name)
             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error creando pool: {e}", style="red")
             raise
     
@@ -4318,20 +4702,14 @@ class RAIDManager:
         """Muestra información del pool recién creado"""
         try:
             # Obtener información básica del pool
-            result = self.system.run_command(['zfs', 'get', 'mounted,mountpoint', pool_name])
+            props = self._bulk_get_props(pool_name, ['mounted', 'mountpoint']).get(pool_name, {})
             self.console.print(f"\n📋 Información del pool '{pool_name}':")
             
-            for line in result.stdout.strip().split('\n')[1:]:  # Skip header
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        property_name = parts[1]
-                        value = parts[2]
-                        if property_name == 'mountpoint':
-                            self.console.print(f"   📁 Punto de montaje: {value}")
-                        elif property_name == 'mounted':
-                            mounted_status = "✅ Montado" if value == 'yes' else "❌ No montado"
-                            self.console.print(f"   🔗 Estado: {mounted_status}")
+            if 'mounted' in props:
+                mounted_status = "✅ Montado" if props['mounted'] == 'yes' else "❌ No montado"
+                self.console.print(f"   🔗 Estado: {mounted_status}")
+            if 'mountpoint' in props:
+                self.console.print(f"   📁 Punto de montaje: {props['mountpoint']}")
             
             # Mostrar comando útil
             self.console.print(f"\n💡 Comandos útiles:")
@@ -4339,7 +4717,7 @@ class RAIDManager:
             self.console.print(f"   • Ver propiedades: zfs get all {pool_name}")
             self.console.print(f"   • Crear dataset: zfs create {pool_name}/mi_dataset")
             
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             self.console.print("   ⚠️  No se pudo obtener información adicional del pool", style="yellow")
     
     def _configure_zfs_properties(self, pool_name: str, arc_size: int):
@@ -4360,8 +4738,9 @@ class RAIDManager:
         ]
         
         # Aplicar propiedades básicas
-        for prop, value, description in basic_properties:
-            if self._set_zfs_property(pool_name, prop, value):
+        for (prop, value, description), applied in zip(basic_properties,
+                                                       self._set_zfs_properties(pool_name, basic_properties)):
+            if applied:
                 self.console.print(f"   ✅ {description}")
             else:
                 self.console.print(f"   ⚠️  {description} - no aplicada", style="yellow")
@@ -4371,6 +4750,7 @@ class RAIDManager:
         
         # Preguntar tipo de uso previsto
         use_case = self._get_zfs_use_case()
+        self._zfs_use_case = use_case  # Se reutiliza al añadir L2ARC
         
         if use_case == "storage":
             self._configure_zfs_for_storage(pool_name)
@@ -4397,9 +4777,33 @@ class RAIDManager:
         try:
             self.system.run_command(['zfs', 'set', f'{prop}={value}', pool_name])
             return True
-        except subprocess.CalledProcessError:
+        except CalledProcessError:
             return False
     
+    def _set_zfs_properties(self, pool_name: str, properties: List[Tuple[str, str, str]]) -> List[bool]:
+        """Establece varias propiedades ZFS con un único 'zfs set', retorna el éxito de cada una"""
+        try:
+            self.system.run_command(['zfs', 'set', *[f'{prop}={value}' for prop, value, _ in properties], pool_name])
+            return [True] * len(properties)
+        except CalledProcessError:
+            # Versión antigua de ZFS o alguna propiedad inválida: aplicar una a una para aislar el fallo
+            return [self._set_zfs_property(pool_name, prop, value) for prop, value, _ in properties]
+    
+    def _create_zfs_dataset(self, dataset_name: str, properties: List[Tuple[str, str, str]]) -> List[bool]:
+        """Crea un dataset con sus propiedades en un único 'zfs create', retorna el éxito de cada una"""
+        cmd = ['zfs', 'create']
+        for prop, value, _ in properties:
+            cmd.extend(['-o', f'{prop}={value}'])
+        cmd.append(dataset_name)
+        try:
+            self.system.run_command(cmd)
+            return [True] * len(properties)
+        except CalledProcessError:
+            # Alguna propiedad no soportada: crear el dataset sin ellas y aplicarlas después
+            # (si el dataset tampoco puede crearse así, la excepción llega al llamador)
+            self.system.run_command(['zfs', 'create', dataset_name])
+            return self._set_zfs_properties(dataset_name, properties)
+    
     def _get_zfs_use_case(self) -> str:
         """Obtiene el caso de uso previsto para el pool ZFS"""
         self.console.print("\n📊 ¿Cuál será el uso principal de este pool?")
@@ -4408,18 +4812,11 @@ class RAIDManager:
         self.console.print("   3. Media server (vídeos, música, fotos)")
         self.console.print("   4. Uso mixto")
         
-        while True:
-            choice = self.console.prompt("👉 Selecciona el tipo de uso", "1")
-            if choice == "1":
-                return "storage"
-            elif choice == "2":
-                return "database"
-            elif choice == "3":
-                return "media"
-            elif choice == "4":
-                return "mixed"
-            else:
-                self.console.print("❌ Opción inválida", style="red")
+        use_cases = {"1": "storage", "2": "database", "3": "media", "4": "mixed"}
+        choice = self._prompt_validated("👉 Selecciona el tipo de uso", "1", [
+            (lambda value: value in use_cases, "❌ Opción inválida"),
+        ])
+        return use_cases[choice]
     
     def _configure_zfs_for_storage(self, pool_name: str):
         """Configuración optimizada para almacenamiento general"""
@@ -4432,8 +4829,9 @@ class RAIDManager:
             ('redundant_metadata', 'most', 'Metadatos redundantes')
         ]
         
-        for prop, value, description in storage_properties:
-            if self._set_zfs_property(pool_name, prop, value):
+        for (prop, value, description), applied in zip(storage_properties,
+                                                       self._set_zfs_properties(pool_name, storage_properties)):
+            if applied:
                 self.console.print(f"      ✅ {description}")
     
     def _configure_zfs_for_database(self, pool_name: str):
@@ -4448,8 +4846,9 @@ class RAIDManager:
             ('redundant_metadata', 'all', 'Todos los metadatos redundantes')
         ]
         
-        for prop, value, description in db_properties:
-            if self._set_zfs_property(pool_name, prop, value):
+        for (prop, value, description), applied in zip(db_properties,
+                                                       self._set_zfs_properties(pool_name, db_properties)):
+            if applied:
                 self.console.print(f"      ✅ {description}")
     
     def _configure_zfs_for_media(self, pool_name: str):
@@ -4464,8 +4863,9 @@ class RAIDManager:
             ('primarycache', 'all', 'Cache completo para acceso frecuente')
         ]
         
-        for prop, value, description in media_properties:
-            if self._set_zfs_property(pool_name, prop, value):
+        for (prop, value, description), applied in zip(media_properties,
+                                                       self._set_zfs_properties(pool_name, media_properties)):
+            if applied:
                 self.console.print(f"      ✅ {description}")
     
     def _configure_zfs_for_mixed(self, pool_name: str):
@@ -4480,8 +4880,9 @@ class RAIDManager:
             ('redundant_metadata', 'most', 'Metadatos importantes redundantes')
         ]
         
-        for prop, value, description in mixed_properties:
-            if self._set_zfs_property(pool_name, prop, value):
+        for (prop, value, description), applied in zip(mixed_properties,
+                                                       self._set_zfs_properties(pool_name, mixed_properties)):
+            if applied:
                 self.console.print(f"      ✅ {description}")
     
     def _configure_zfs_arc_system(self, arc_size: int):
@@ -4489,71 +4890,67 @@ class RAIDManager:
         self.console.print("\n💾 Configurando ZFS ARC del sistema...")
         
         try:
-            # Crear directorio de configuración si no existe
+            # Crear directorio de configuración si no existe (normalmente lo trae la distribución)
             config_dir = "/etc/modprobe.d"
-            if not os.path.exists(config_dir):
-                if self.system.run_command_safe(['mkdir', '-p', config_dir]):
-                    self.console.print(f"   ✅ Directorio {config_dir} creado")
+            self.system.make_dirs(config_dir)
             
             # Configurar ARC
             arc_bytes = arc_size * 1024 * 1024 * 1024
             arc_min = arc_bytes // 4  # Mínimo 25% del máximo
             
+            if self._has_nvme_device():
+                # Con NVMe como L2ARC: recorrer todo el ARC (headroom=0), escribir más por
+                # ciclo y conservar la caché tras reiniciar (L2ARC persistente)
+                l2arc_options = """options zfs l2arc_write_max=536870912
+options zfs l2arc_headroom=0
+options zfs l2arc_noprefetch=0
+options zfs l2arc_rebuild_enabled=1"""
+            else:
+                l2arc_options = """options zfs l2arc_write_max=134217728
+options zfs l2arc_headroom=4"""
+            
             zfs_conf_content = f"""# ZFS ARC Configuration - Configurado por raid_manager.py
 # Tamaño máximo del ARC: {arc_size}GB
 options zfs zfs_arc_max={arc_bytes}
 # Tamaño mínimo del ARC: {arc_size//4}GB  
 options zfs zfs_arc_min={arc_min}
 # Configuración de L2ARC
-options zfs l2arc_write_max=134217728
-options zfs l2arc_headroom=4
+{l2arc_options}
 """
             
-            # Escribir configuración usando sudo
+            # write_file escribe de forma atómica (temporal .tmp junto al destino + rename) como root, o con tee si no
             config_file = '/etc/modprobe.d/zfs.conf'
-            temp_file = '/tmp/zfs_config.tmp'
             
-            # Escribir a archivo temporal primero
-            try:
-                with open(temp_file, 'w') as f:
-                    f.write(zfs_conf_content)
+            if self.system.write_file(config_file, zfs_conf_content):
+                self.console.print(f"   ✅ ARC máximo: {arc_size}GB")
+                self.console.print(f"   ✅ ARC mínimo: {arc_size//4}GB")
+                self.console.print("   ✅ Configuración L2ARC optimizada")
                 
-                # Mover archivo con sudo
-                if self.system.run_command_safe(['sudo', 'cp', temp_file, config_file]):
-                    self.console.print(f"   ✅ ARC máximo: {arc_size}GB")
-                    self.console.print(f"   ✅ ARC mínimo: {arc_size//4}GB")
-                    self.console.print("   ✅ Configuración L2ARC optimizada")
-                    
-                    # Limpiar archivo temporal
-                    try:
-                        os.remove(temp_file)
-                    except:
-                        pass
-                        
-                    # Aplicar configuración actual (si es posible)
-                    try:
-                        current_max = f"/sys/module/zfs/parameters/zfs_arc_max"
-                        if os.path.exists(current_max):
-                            # Usar echo con sudo para escribir al sistema
-                            if self.system.run_command_safe(['sudo', 'bash', '-c', f'echo {arc_bytes} > {current_max}']):
-                                self.console.print("   ✅ ARC aplicado inmediatamente")
-                            else:
-                                self.console.print("   💡 ARC se aplicará en el próximo reinicio")
-                        else:
-                            self.console.print("   💡 ARC se aplicará cuando se cargue el módulo ZFS")
-                    except Exception:
+                # Aplicar configuración actual (si es posible)
+                current_max = "/sys/module/zfs/parameters/zfs_arc_max"
+                if os.path.exists(current_max):
+                    if self.system.write_file(current_max, str(arc_bytes), atomic=False):
+                        self.console.print("   ✅ ARC aplicado inmediatamente")
+                    else:
                         self.console.print("   💡 ARC se aplicará en el próximo reinicio")
                 else:
-                    self.console.print("   ⚠️  No se pudo escribir configuración ARC", style="yellow")
-                    self.console.print("   💡 Puedes configurar manualmente editando /etc/modprobe.d/zfs.conf", style="blue")
-                    
-            except Exception as e:
-                self.console.print(f"   ⚠️  Error escribiendo configuración temporal: {e}", style="yellow")
+                    self.console.print("   💡 ARC se aplicará cuando se cargue el módulo ZFS")
+            else:
+                self.console.print("   ⚠️  No se pudo escribir configuración ARC", style="yellow")
+                self.console.print("   💡 Puedes configurar manualmente editando /etc/modprobe.d/zfs.conf", style="blue")
                 
         except Exception as e:
             self.console.print(f"   ⚠️  Error configurando ARC: {e}", style="yellow")
             self.console.print("   💡 Puedes configurar manualmente editando /etc/modprobe.d/zfs.conf", style="blue")
     
+    def _has_nvme_device(self) -> bool:
+        """Indica si hay algún disco NVMe no rotacional (candidato a L2ARC rápido)"""
+        # El NVMe de arranque (protegido) nunca se usará como cache: no cuenta
+        result = self.system.run_command(['lsblk', '-d', '-n', '-o', 'NAME,ROTA'], check=False)
+        return any(fields[0].startswith('nvme') and fields[1] == '0' and fields[0] not in _PROTECTED_DISKS
+                   for fields in (line.split() for line in result.stdout.splitlines())
+                   if len(fields) == 2)
+    
     def _configure_zfs_advanced_properties(self, pool_name: str):
         """Configuraciones avanzadas adicionales de ZFS"""
         self.console.print("\n🔧 Configuraciones avanzadas del pool...")
@@ -4571,6 +4968,13 @@ options zfs l2arc_headroom=4
         if not self.console.confirm("¿Crear datasets organizados?", default=True):
             return
         
+        # Volver a comprobar zfs-auto-snapshot en cada ejecución del asistente
+        self._zfs_autosnapshot_verified = None
+        
+        # ZSTD comprime bastante más que LZ4 con velocidad similar, pero GRUB no sabe
+        # leer ZSTD: si el pool es de arranque se mantiene LZ4
+        compression = 'lz4' if self._pool_has_bootfs(pool_name) else 'zstd'
+        
         while True:
             self.console.print("\n🎯 Opciones de creación de datasets:")
             self.console.print("   1. Configuración rápida recomendada")
@@ -4581,8 +4985,8 @@ options zfs l2arc_headroom=4
             
             if choice == "1":
                 # Mostrar explicación y pedir confirmación
-                if self._explain_recommended_setup(pool_name):
-                    self._create_recommended_datasets(pool_name)
+                if self._explain_recommended_setup(pool_name, compression):
+                    self._create_recommended_datasets(pool_name, compression)
                     break  # Salir del bucle después de crear
                 # Si no confirma, volver al menú de opciones
                 
@@ -4597,37 +5001,36 @@ options zfs l2arc_headroom=4
             else:
                 self.console.print("❌ Opción inválida", style="red")
     
-    def _explain_recommended_setup(self, pool_name: str):
+    def _explain_recommended_setup(self, pool_name: str, compression: str = 'zstd'):
         """Explica la configuración rápida recomendada al usuario"""
-        self.console.print("\n📋 Configuración Rápida Recomendada:")
-        self.console.print(f"   Se crearán 5 datasets organizados en el pool '{pool_name}':")
-        
-        self.console.print("\n   📁 Datasets que se crearán:")
-        self.console.print("   ┌─ 📦 data/       → Datos generales del usuario")
-        self.console.print("   ├─ 🎬 media/      → Videos, música, fotos (optimizado para streaming)")
-        self.console.print("   ├─ 💾 backups/    → Respaldos (máxima compresión)")
-        self.console.print("   ├─ 🌐 shares/     → Carpetas compartidas en red")
-        self.console.print("   └─ ⚙️  apps/       → Datos de aplicaciones y servicios")
-        
-        self.console.print("\n   🔧 Configuraciones específicas por dataset:")
-        self.console.print("   • data/    → Compresión LZ4, recordsize 128K (uso general)")
-        self.console.print("   • media/   → Compresión LZ4, recordsize 1M (archivos grandes)")
-        self.console.print("   • backups/ → Compresión ZSTD, recordsize 1M (máximo ratio)")
-        self.console.print("   • shares/  → Compresión LZ4, recordsize 128K (red)")
-        self.console.print("   • apps/    → Compresión LZ4, recordsize 64K (aplicaciones)")
-        
-        self.console.print("\n   📍 Puntos de montaje:")
-        self.console.print(f"   • /{pool_name}/data    → Datos del usuario")
-        self.console.print(f"   • /{pool_name}/media   → Biblioteca multimedia")
-        self.console.print(f"   • /{pool_name}/backups → Respaldos importantes")
-        self.console.print(f"   • /{pool_name}/shares  → Recursos compartidos")
-        self.console.print(f"   • /{pool_name}/apps    → Datos de aplicaciones")
-        
-        self.console.print("\n   ✅ Beneficios de esta estructura:")
-        self.console.print("   • Organización clara y escalable")
-        self.console.print("   • Configuraciones optimizadas por tipo de contenido")
-        self.console.print("   • Gestión independiente por dataset")
-        self.console.print("   • Fácil gestión de permisos y políticas")
+        algorithm = compression.upper()
+        self.console.print(
+            "\n📋 Configuración Rápida Recomendada:\n"
+            f"   Se crearán 5 datasets organizados en el pool '{pool_name}':\n"
+            "\n   📁 Datasets que se crearán:\n"
+            "   ┌─ 📦 data/       → Datos generales del usuario\n"
+            "   ├─ 🎬 media/      → Videos, música, fotos (optimizado para streaming)\n"
+            "   ├─ 💾 backups/    → Respaldos (máxima compresión)\n"
+            "   ├─ 🌐 shares/     → Carpetas compartidas en red\n"
+            "   └─ ⚙️  apps/       → Datos de aplicaciones y servicios\n"
+            "\n   🔧 Configuraciones específicas por dataset:\n"
+            f"   • data/    → Compresión {algorithm}, recordsize 128K (uso general)\n"
+            f"   • media/   → Compresión {algorithm}, recordsize 1M (archivos grandes)\n"
+            f"   • backups/ → Compresión {algorithm}, recordsize 1M (máximo ratio)\n"
+            "   • shares/  → Compresión LZ4, recordsize 128K (red)\n"
+            "   • apps/    → Compresión LZ4, recordsize 64K (aplicaciones)\n"
+            "\n   📍 Puntos de montaje:\n"
+            f"   • /{pool_name}/data    → Datos del usuario\n"
+            f"   • /{pool_name}/media   → Biblioteca multimedia\n"
+            f"   • /{pool_name}/backups → Respaldos importantes\n"
+            f"   • /{pool_name}/shares  → Recursos compartidos\n"
+            f"   • /{pool_name}/apps    → Datos de aplicaciones\n"
+            "\n   ✅ Beneficios de esta estructura:\n"
+            "   • Organización clara y escalable\n"
+            "   • Configuraciones optimizadas por tipo de contenido\n"
+            "   • Gestión independiente por dataset\n"
+            "   • Fácil gestión de permisos y políticas"
+        )
         
         if not self.console.confirm("\n¿Proceder con esta configuración básica?", default=True):
             self.console.print("   ❌ Configuración cancelada")
@@ -4635,7 +5038,7 @@ options zfs l2arc_headroom=4
         
         return True
     
-    def _create_recommended_datasets(self, pool_name: str):
+    def _create_recommended_datasets(self, pool_name: str, compression: str = 'zstd'):
         """Crea una estructura de datasets recomendada"""
         self.console.print("\n🏗️  Creando estructura de datasets recomendada...")
         
@@ -4657,9 +5060,11 @@ options zfs l2arc_headroom=4
                 'name': 'data',
                 'description': 'Datos generales del usuario',
                 'properties': {
-                    'compression': 'lz4',
+                    'compression': compression,
                     'atime': 'off',
-                    'recordsize': '128K'
+                    'recordsize': '128K',
+                    # Acceso aleatorio que se relee: datos y metadatos en el ARC
+                    'primarycache': 'all'
                 },
                 'suggested_quota': '500G'
             },
@@ -4667,9 +5072,12 @@ options zfs l2arc_headroom=4
                 'name': 'media',
                 'description': 'Archivos multimedia (videos, música, fotos)',
                 'properties': {
-                    'compression': 'lz4',
+                    'compression': compression,
                     'atime': 'off',
-                    'recordsize': '1M'
+                    'recordsize': '1M',
+                    # Streaming que no se relee: no ocupar el ARC/L2ARC con sus datos
+                    'primarycache': 'metadata',
+                    'secondarycache': 'metadata'
                 },
                 'suggested_quota': '2T'
             },
@@ -4677,9 +5085,11 @@ options zfs l2arc_headroom=4
                 'name': 'backups',
                 'description': 'Respaldos y archivos importantes',
                 'properties': {
-                    'compression': 'zstd',
+                    'compression': compression,
                     'atime': 'off',
-                    'recordsize': '1M'
+                    'recordsize': '1M',
+                    'primarycache': 'metadata',
+                    'secondarycache': 'metadata'
                 },
                 'suggested_quota': '1T'
             },
@@ -4689,7 +5099,8 @@ options zfs l2arc_headroom=4
                 'properties': {
                     'compression': 'lz4',
                     'atime': 'off',
-                    'recordsize': '128K'
+                    'recordsize': '128K',
+                    'primarycache': 'all'
                 },
                 'suggested_quota': '200G'
             },
@@ -4699,43 +5110,48 @@ options zfs l2arc_headroom=4
                 'properties': {
                     'compression': 'lz4',
                     'atime': 'off',
-                    'recordsize': '64K'
+                    'recordsize': '64K',
+                    'primarycache': 'all'
                 },
                 'suggested_quota': '100G'
             }
         ]
         
         created_datasets = []
+        existing_datasets = self._get_zfs_dataset_names(pool_name)
         
         for dataset_config in recommended_datasets:
             dataset_full_name = f"{pool_name}/{dataset_config['name']}"
             
+            if dataset_full_name in existing_datasets:
+                self.console.print(f"   ⚠️  El dataset '{dataset_full_name}' ya existe, se omite", style="yellow")
+                continue
+            
             try:
-                # Crear dataset
+                # Crear dataset con sus propiedades específicas y el automontaje
+                # (ZFS automáticamente usa /{pool_name}/{dataset_name} como mountpoint por defecto)
                 self.console.print(f"   📁 Creando dataset: {dataset_full_name}")
-                self.system.run_command(['zfs', 'create', dataset_full_name])
+                properties = [(prop, value, f'{prop}={value}') for prop, value in dataset_config['properties'].items()]
+                properties.append(('canmount', 'on', 'automontaje'))
                 
-                # Aplicar propiedades específicas
-                for prop, value in dataset_config['properties'].items():
-                    try:
-                        self.system.run_command(['zfs', 'set', f'{prop}={value}', dataset_full_name])
-                    except subprocess.CalledProcessError:
-                        self.console.print(f"      ⚠️  No se pudo configurar {prop}={value}", style="yellow")
+                # Cuota solo si el usuario lo pidió
+                if enable_quotas:
+                    quota = dataset_config['suggested_quota']
+                    properties.append(('quota', quota, f'cuota de {quota}'))
                 
-                # Configurar automontaje para este dataset (ZFS maneja automáticamente)
-                try:
-                    self.system.run_command(['zfs', 'set', 'canmount=on', dataset_full_name])
-                    # ZFS automáticamente usa /{pool_name}/{dataset_name} como mountpoint por defecto
-                except subprocess.CalledProcessError:
-                    self.console.print(f"      ⚠️  No se pudo configurar automontaje", style="yellow")
+                # Las propiedades de snapshots se aplican en el mismo 'zfs create'
+                # (solo si el usuario lo pidió)
+                snapshots = self._configure_dataset_snapshots(dataset_full_name) if enable_snapshots else None
+                if snapshots:
+                    properties.extend(snapshots[1])
                 
-                # Configurar snapshots solo si el usuario lo pidió
-                if enable_snapshots:
-                    self._configure_dataset_snapshots(dataset_full_name)
+                for (prop, value, description), applied in zip(properties,
+                                                               self._create_zfs_dataset(dataset_full_name, properties)):
+                    if not applied:
+                        self.console.print(f"      ⚠️  No se pudo configurar {description}", style="yellow")
                 
-                # Configurar cuota solo si el usuario lo pidió
-                if enable_quotas:
-                    self._configure_dataset_quota(dataset_full_name, dataset_config['suggested_quota'])
+                if snapshots:
+                    self._finish_dataset_snapshots(dataset_full_name, snapshots[0])
                 
                 created_datasets.append({
                     'name': dataset_full_name,
@@ -4745,18 +5161,25 @@ options zfs l2arc_headroom=4
                 
                 self.console.print(f"      ✅ Dataset creado: {dataset_config['description']}", style="green")
                 
-            except subprocess.CalledProcessError as e:
+            except CalledProcessError as e:
                 self.console.print(f"      ❌ Error creando dataset {dataset_config['name']}: {e}", style="red")
         
         # Mostrar resumen de datasets creados
         if created_datasets:
             self._show_datasets_summary(created_datasets)
     
+    def _pool_has_bootfs(self, pool_name: str) -> bool:
+        """Indica si el pool tiene un dataset de arranque configurado (bootfs)"""
+        result = self.system.run_command(['zpool', 'list', '-H', '-o', 'bootfs', pool_name], check=False)
+        return result.returncode == 0 and result.stdout.strip() not in ('', '-')
+    
     def _create_custom_datasets(self, pool_name: str):
         """Permite al usuario crear datasets personalizados"""
         self.console.print("\n🛠️  Creación de datasets personalizados")
         
         datasets_created = []
+        # Una sola consulta al inicio; se actualiza al crear cada dataset
+        existing_datasets = self._get_zfs_dataset_names(pool_name)
         
         while True:
             self.console.print(f"\n📁 Crear nuevo dataset en pool '{pool_name}'")
@@ -4774,13 +5197,9 @@ options zfs l2arc_headroom=4
             dataset_full_name = f"{pool_name}/{dataset_name}"
             
             # Verificar si ya existe
-            try:
-                result = self.system.run_command(['zfs', 'list', dataset_full_name], check=False)
-                if result.returncode == 0:
-                    self.console.print(f"❌ El dataset '{dataset_full_name}' ya existe", style="red")
-                    continue
-            except:
-                pass
+            if dataset_full_name in existing_datasets:
+                self.console.print(f"❌ El dataset '{dataset_full_name}' ya existe", style="red")
+                continue
             
             # Descripción opcional
             description = self.console.prompt("📋 Descripción (opcional)", "").strip()
@@ -4793,7 +5212,8 @@ options zfs l2arc_headroom=4
                 '1': 'off',
                 '2': 'lz4',
                 '3': 'zstd',
-                '4': 'gzip'
+                '4': 'gzip',
+                '5': 'zstd-fast-1'
             }
             
             self.console.print("   Compresión:")
@@ -4801,25 +5221,28 @@ options zfs l2arc_headroom=4
             self.console.print("   2. LZ4 (rápida)")
             self.console.print("   3. ZSTD (alta ratio)")
             self.console.print("   4. GZIP (máxima ratio)")
+            self.console.print("   5. ZSTD-FAST (descompresión rápida, para shares/apps)")
             
             comp_choice = self.console.prompt("   👉 Compresión", "2")
             compression = compression_options.get(comp_choice, 'lz4')
             
             # Recordsize
             recordsize_options = {
-                '1': '16K',
-                '2': '64K', 
-                '3': '128K',
-                '4': '1M'
+                '1': '8K',
+                '2': '16K',
+                '3': '64K',
+                '4': '128K',
+                '5': '1M'
             }
             
-            self.console.print("\n   Tamaño de registro:")
-            self.console.print("   1. 16K (bases de datos)")
-            self.console.print("   2. 64K (aplicaciones)")
-            self.console.print("   3. 128K (uso general)")
-            self.console.print("   4. 1M (archivos grandes)")
+            self.console.print("\n   Tamaño de registro (para bases de datos, igual a su tamaño de página):")
+            self.console.print("   1. 8K (PostgreSQL)")
+            self.console.print("   2. 16K (MySQL/InnoDB)")
+            self.console.print("   3. 64K (aplicaciones/contenedores)")
+            self.console.print("   4. 128K (uso general)")
+            self.console.print("   5. 1M (multimedia/backups)")
             
-            rec_choice = self.console.prompt("   👉 Recordsize", "3")
+            rec_choice = self.console.prompt("   👉 Recordsize", "4")
             recordsize = recordsize_options.get(rec_choice, '128K')
             
             # Atime
@@ -4844,26 +5267,31 @@ options zfs l2arc_headroom=4
                 self.console.print(f"\n🔨 Creando dataset '{dataset_full_name}'...")
                 
                 # Crear con propiedades
-                cmd = ['zfs', 'create']
-                cmd.extend(['-o', f'compression={compression}'])
-                cmd.extend(['-o', f'recordsize={recordsize}'])
-                cmd.extend(['-o', f'atime={atime}'])
-                if enable_automount:
-                    cmd.extend(['-o', 'canmount=on'])
-                    # ZFS automáticamente usa /{pool_name}/{dataset_name} como mountpoint por defecto
-                else:
-                    cmd.extend(['-o', 'canmount=off'])
-                cmd.append(dataset_full_name)
+                # (con canmount=on ZFS usa /{pool_name}/{dataset_name} como mountpoint por defecto)
+                properties = [
+                    ('compression', compression, f'compression={compression}'),
+                    ('recordsize', recordsize, f'recordsize={recordsize}'),
+                    ('atime', atime, f'atime={atime}'),
+                    ('canmount', 'on' if enable_automount else 'off', 'automontaje'),
+                ]
+                
+                # Cuota si se especificó
+                if quota_size:
+                    properties.append(('quota', quota_size, f'cuota de {quota_size}'))
                 
-                self.system.run_command(cmd)
+                # Las propiedades de snapshots se aplican en el mismo 'zfs create'
+                snapshots = self._configure_dataset_snapshots(dataset_full_name) if enable_snapshots else None
+                if snapshots:
+                    properties.extend(snapshots[1])
                 
-                # Configurar snapshots si está habilitado
-                if enable_snapshots:
-                    self._configure_dataset_snapshots(dataset_full_name)
+                for (prop, value, description), applied in zip(properties,
+                                                               self._create_zfs_dataset(dataset_full_name, properties)):
+                    if not applied:
+                        self.console.print(f"⚠️  No se pudo configurar {description}", style="yellow")
+                existing_datasets.add(dataset_full_name)
                 
-                # Configurar cuota si se especificó
-                if quota_size:
-                    self._configure_dataset_quota(dataset_full_name, quota_size)
+                if snapshots:
+                    self._finish_dataset_snapshots(dataset_full_name, snapshots[0])
                 
                 datasets_created.append({
                     'name': dataset_full_name,
@@ -4880,7 +5308,7 @@ options zfs l2arc_headroom=4
                 if not self.console.confirm("¿Crear otro dataset?", default=False):
                     break
                     
-            except subprocess.CalledProcessError as e:
+            except CalledProcessError as e:
                 self.console.print(f"❌ Error creando dataset: {e}", style="red")
         
         # Mostrar resumen
@@ -4889,19 +5317,15 @@ options zfs l2arc_headroom=4
     
     def _validate_dataset_name(self, name: str) -> bool:
         """Valida que el nombre del dataset sea válido"""
-        if not name:
-            return False
-        
-        # Solo letras, números, guiones y guiones bajos
-        import re
-        return bool(re.match(r'^[a-zA-Z0-9_-]+$', name))
+        # Solo letras, números, guiones y guiones bajos (el patrón ya rechaza la cadena vacía)
+        return _VALID_NAME_RE.match(name) is not None
     
     def _show_datasets_summary(self, datasets: list):
         """Muestra un resumen de los datasets creados"""
         self.console.print("\n📊 Resumen de Datasets Creados:")
         
-        if RICH_AVAILABLE:
-            from rich.table import Table
+        # Para uno o dos datasets basta el listado simple, sin construir una tabla
+        if RICH_AVAILABLE and len(datasets) >= 3:
             table = Table(title="📁 Datasets ZFS Creados")
             table.add_column("Dataset", style="cyan")
             table.add_column("Punto de Montaje", style="green")
@@ -4916,83 +5340,61 @@ options zfs l2arc_headroom=4
             
             self.console.console.print(table)
         else:
-            for dataset in datasets:
-                print(f"   📁 {dataset['name']}")
-                print(f"      📍 Montaje: {dataset['mountpoint']}")
-                print(f"      📝 Descripción: {dataset['description']}")
-                print()
-        
-        self.console.print("\n💡 Comandos útiles para datasets:")
-        self.console.print("   • Listar datasets: zfs list")
-        self.console.print("   • Ver propiedades: zfs get all <dataset>")
-        self.console.print("   • Crear snapshot: zfs snapshot <dataset>@<nombre>")
-        self.console.print("   • Configurar cuota: zfs set quota=<tamaño> <dataset>")
-    
-    def _configure_dataset_snapshots(self, dataset_name: str):
-        """Configura snapshots automáticos para un dataset específico con selección de frecuencia"""
+            # Una sola escritura para todo el listado
+            print("".join(f"   📁 {dataset['name']}\n"
+                          f"      📍 Montaje: {dataset['mountpoint']}\n"
+                          f"      📝 Descripción: {dataset['description']}\n\n"
+                          for dataset in datasets), end="")
+        
+        self.console.print(
+            "\n💡 Comandos útiles para datasets:\n"
+            "   • Listar datasets: zfs list\n"
+            "   • Ver propiedades: zfs get all <dataset>\n"
+            "   • Crear snapshot: zfs snapshot <dataset>@<nombre>\n"
+            "   • Configurar cuota: zfs set quota=<tamaño> <dataset>"
+        )
+    
+    def _configure_dataset_snapshots(self, dataset_name: str) -> Optional[Tuple[str, List[Tuple[str, str, str]]]]:
+        """Selecciona la frecuencia de snapshots de un dataset, retorna la opción y las propiedades para 'zfs create'"""
         self.console.print(f"      📸 Configurando snapshots para {dataset_name}")
         
-        # MEJORA 1: Verificar/instalar servicio zfs-auto-snapshot
-        if not self._verify_zfs_auto_snapshot_service():
-            return
+        # MEJORA 1: Verificar/instalar servicio zfs-auto-snapshot (una vez por sesión de datasets)
+        if self._zfs_autosnapshot_verified is None:
+            self._zfs_autosnapshot_verified = self._verify_zfs_auto_snapshot_service()
+        if not self._zfs_autosnapshot_verified:
+            return None
         
         # Preguntar qué tipo de snapshots quiere el usuario
-        self.console.print("         🕐 Frecuencia de snapshots automáticos:")
-        self.console.print("         1. Solo diarios (recomendado para uso general)")
-        self.console.print("         2. Solo semanales (para datos poco cambiantes)")
-        self.console.print("         3. Solo mensuales (para archivos estáticos)")
-        self.console.print("         4. Diarios + semanales (balance espacio/protección)")
-        self.console.print("         5. Semanales + mensuales (mínimo espacio)")
-        self.console.print("         6. Todos (cada hora, día, semana, mes) ⚠️ Consume más espacio")
+        self.console.print(
+            "         🕐 Frecuencia de snapshots automáticos:\n"
+            "         1. Solo diarios (recomendado para uso general)\n"
+            "         2. Solo semanales (para datos poco cambiantes)\n"
+            "         3. Solo mensuales (para archivos estáticos)\n"
+            "         4. Diarios + semanales (balance espacio/protección)\n"
+            "         5. Semanales + mensuales (mínimo espacio)\n"
+            "         6. Todos (cada hora, día, semana, mes) ⚠️ Consume más espacio"
+        )
         
         choice = self.console.prompt("         👉 Selecciona frecuencia", "1")
         
         # Configurar snapshots base (siempre necesario)
         base_properties = [('com.sun:auto-snapshot', 'true', 'Snapshots automáticos base')]
         
-        # Configurar según la elección del usuario
-        if choice == "1":  # Solo diarios
-            snapshot_properties = base_properties + [
-                ('com.sun:auto-snapshot:daily', 'true', 'Snapshots diarios')
-            ]
-        elif choice == "2":  # Solo semanales
-            snapshot_properties = base_properties + [
-                ('com.sun:auto-snapshot:weekly', 'true', 'Snapshots semanales')
-            ]
-        elif choice == "3":  # Solo mensuales
-            snapshot_properties = base_properties + [
-                ('com.sun:auto-snapshot:monthly', 'true', 'Snapshots mensuales')
-            ]
-        elif choice == "4":  # Diarios + semanales
-            snapshot_properties = base_properties + [
-                ('com.sun:auto-snapshot:daily', 'true', 'Snapshots diarios'),
-                ('com.sun:auto-snapshot:weekly', 'true', 'Snapshots semanales')
-            ]
-        elif choice == "5":  # Semanales + mensuales
-            snapshot_properties = base_properties + [
-                ('com.sun:auto-snapshot:weekly', 'true', 'Snapshots semanales'),
-                ('com.sun:auto-snapshot:monthly', 'true', 'Snapshots mensuales')
-            ]
-        elif choice == "6":  # Todos
-            snapshot_properties = base_properties + [
-                ('com.sun:auto-snapshot:hourly', 'true', 'Snapshots cada hora'),
-                ('com.sun:auto-snapshot:daily', 'true', 'Snapshots diarios'),
-                ('com.sun:auto-snapshot:weekly', 'true', 'Snapshots semanales'),
-                ('com.sun:auto-snapshot:monthly', 'true', 'Snapshots mensuales')
-            ]
-        else:  # Default a diarios
+        # Configurar según la elección del usuario: las frecuencias de cada opción son
+        # las claves de su retención recomendada
+        if choice not in _SNAPSHOT_RETENTION_DEFAULTS:
             self.console.print("         ⚠️  Opción inválida, usando snapshots diarios por defecto", style="yellow")
-            snapshot_properties = base_properties + [
-                ('com.sun:auto-snapshot:daily', 'true', 'Snapshots diarios')
-            ]
-        
-        # Aplicar configuración seleccionada
-        for prop, value, description in snapshot_properties:
-            try:
-                self.system.run_command(['zfs', 'set', f'{prop}={value}', dataset_name])
-            except subprocess.CalledProcessError:
-                self.console.print(f"         ⚠️  No se pudo configurar {description}", style="yellow")
+            choice = "1"
+        snapshot_properties = base_properties + [
+            (f'com.sun:auto-snapshot:{freq}', 'true', f'Snapshots {_SNAPSHOT_FREQUENCY_NAMES[freq]}')
+            for freq in _SNAPSHOT_RETENTION_DEFAULTS[choice]
+        ]
         
+        # Las propiedades se aplican al crear el dataset
+        return choice, snapshot_properties
+    
+    def _finish_dataset_snapshots(self, dataset_name: str, choice: str):
+        """Completa la configuración de snapshots una vez creado el dataset"""
         # MEJORA 2: Crear snapshot de demostración
         self._create_demo_snapshot(dataset_name)
         
@@ -5029,25 +5431,17 @@ options zfs l2arc_headroom=4
         self.console.print("         ⚙️  Configurando retención de snapshots...")
         
         # Configuraciones recomendadas para cada frecuencia
-        retention_config = {}
-        
-        if choice == "1":  # Solo diarios
-            retention_config['daily'] = self._ask_retention_count("diarios", 30)
-        elif choice == "2":  # Solo semanales
-            retention_config['weekly'] = self._ask_retention_count("semanales", 12)
-        elif choice == "3":  # Solo mensuales
-            retention_config['monthly'] = self._ask_retention_count("mensuales", 12)
-        elif choice == "4":  # Diarios + semanales
-            retention_config['daily'] = self._ask_retention_count("diarios", 30)
-            retention_config['weekly'] = self._ask_retention_count("semanales", 12)
-        elif choice == "5":  # Semanales + mensuales
-            retention_config['weekly'] = self._ask_retention_count("semanales", 12)
-            retention_config['monthly'] = self._ask_retention_count("mensuales", 12)
-        elif choice == "6":  # Todos
-            retention_config['hourly'] = self._ask_retention_count("por hora", 24)
-            retention_config['daily'] = self._ask_retention_count("diarios", 30)
-            retention_config['weekly'] = self._ask_retention_count("semanales", 12)
-            retention_config['monthly'] = self._ask_retention_count("mensuales", 12)
+        retention_config = dict(_SNAPSHOT_RETENTION_DEFAULTS.get(choice, {}))
+        
+        if retention_config:
+            summary = " + ".join(f"{count} {_SNAPSHOT_FREQUENCY_NAMES[freq]}"
+                                 for freq, count in retention_config.items())
+            self.console.print(f"         📅 Retención recomendada: {summary}")
+            
+            # Preguntar cada frecuencia solo si el usuario quiere personalizarla
+            if not self.console.confirm("         ¿Aceptar la retención recomendada?", default=True):
+                for freq, recommended in retention_config.items():
+                    retention_config[freq] = self._ask_retention_count(_SNAPSHOT_FREQUENCY_NAMES[freq], recommended)
         
         # Aplicar configuración de retención
         self._apply_retention_configuration(retention_config)
@@ -5087,70 +5481,30 @@ options zfs l2arc_headroom=4
         self.console.print("         🔧 Aplicando configuración de retención...")
         
         config_file = '/etc/default/zfs-auto-snapshot'
-        temp_file = '/tmp/zfs_auto_snapshot_config.tmp'
         
         try:
             # Leer configuración actual si existe
-            current_config = {}
-            if os.path.exists(config_file):
-                try:
-                    result = self.system.run_command(['sudo', 'cat', config_file], check=False)
-                    if result.returncode == 0:
-                        for line in result.stdout.strip().split('\n'):
-                            if '=' in line and not line.strip().startswith('#'):
-                                key, value = line.split('=', 1)
-                                current_config[key.strip()] = value.strip()
-                except:
-                    pass
-            
-            # Preparar nueva configuración
-            new_config = {
-                'HOURLY': str(retention_config.get('hourly', current_config.get('HOURLY', '0'))),
-                'DAILY': str(retention_config.get('daily', current_config.get('DAILY', '0'))),
-                'WEEKLY': str(retention_config.get('weekly', current_config.get('WEEKLY', '0'))),
-                'MONTHLY': str(retention_config.get('monthly', current_config.get('MONTHLY', '0')))
-            }
+            try:
+                # El archivo es legible por todos: sudo solo si no hay permisos
+                with open(config_file) as f:
+                    data = f.read()
+            except PermissionError:
+                result = self.system.run_command(['sudo', 'cat', config_file], check=False)
+                data = result.stdout if result.returncode == 0 else ''
+            except OSError:
+                data = ''
+            current_config = dict(_parse_ini_lines(data))
             
             # Crear contenido del archivo de configuración
-            config_content = f"""# ZFS Auto-Snapshot Configuration
-# Configurado por raid_manager.py - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-# Número de snapshots a mantener para cada frecuencia
-# 0 = deshabilitado, >0 = número de snapshots a conservar
-
-# Snapshots por hora (0-24 recomendado)
-HOURLY={new_config['HOURLY']}
-
-# Snapshots diarios (7-60 recomendado)
-DAILY={new_config['DAILY']}
-
-# Snapshots semanales (4-12 recomendado)
-WEEKLY={new_config['WEEKLY']}
-
-# Snapshots mensuales (6-24 recomendado)
-MONTHLY={new_config['MONTHLY']}
-
-# Configuraciones adicionales
-VERBOSE=false
-DRYRUN=false
-"""
+            config_content = _render_retention_config(retention_config, current_config)
             
-            # Escribir a archivo temporal
-            with open(temp_file, 'w') as f:
-                f.write(config_content)
-            
-            # Copiar con sudo al destino final
-            result = self.system.run_command(['sudo', 'cp', temp_file, config_file], check=False)
-            
-            if result.returncode == 0:
+            # write_file reemplaza el archivo de forma atómica (temporal .tmp + rename) o usa tee sin root
+            if self.system.write_file(config_file, config_content):
                 self.console.print("         ✅ Configuración de retención aplicada", style="green")
                 
                 # Mostrar resumen de configuración
                 self._show_retention_summary(retention_config)
                 
-                # Limpiar archivo temporal
-                os.remove(temp_file)
-                
             else:
                 self.console.print("         ⚠️  Error aplicando configuración, usando valores por defecto", style="yellow")
                 
@@ -5162,15 +5516,8 @@ DRYRUN=false
         """Muestra un resumen de la configuración de retención aplicada"""
         self.console.print("         📊 Configuración de retención aplicada:", style="blue")
         
-        frequency_names = {
-            'hourly': 'Por hora',
-            'daily': 'Diarios', 
-            'weekly': 'Semanales',
-            'monthly': 'Mensuales'
-        }
-        
         for freq, count in retention_config.items():
-            name = frequency_names.get(freq, freq.capitalize())
+            name = _SNAPSHOT_FREQUENCY_NAMES.get(freq, freq).capitalize()
             self.console.print(f"            📅 {name}: {count} snapshots")
         
         # Calcular estimación de snapshots totales
@@ -5183,36 +5530,37 @@ DRYRUN=false
     def _show_snapshot_management_commands(self, dataset_name: str):
         """Muestra comandos útiles para gestionar snapshots"""
         self.console.print(f"         📚 Comandos útiles para gestionar snapshots:", style="blue")
-        self.console.print(f"         • Ver snapshots: zfs list -t snapshot {dataset_name}")
-        self.console.print(f"         • Crear manual: zfs snapshot {dataset_name}@manual-$(date +%Y%m%d)")
-        self.console.print(f"         • Restaurar archivo: zfs send/recv o acceso directo en .zfs/snapshot/")
-        self.console.print(f"         • Eliminar snapshot: zfs destroy {dataset_name}@nombre_snapshot")
+        self.console.print(
+            f"         • Ver snapshots: zfs list -t snapshot {dataset_name}\n"
+            f"         • Crear manual: zfs snapshot {dataset_name}@manual-$(date +%Y%m%d)\n"
+            f"         • Restaurar archivo: zfs send/recv o acceso directo en .zfs/snapshot/\n"
+            f"         • Eliminar snapshot: zfs destroy {dataset_name}@nombre_snapshot"
+        )
     
     def _verify_zfs_auto_snapshot_service(self) -> bool:
         """MEJORA 1: Verifica si el servicio zfs-auto-snapshot está instalado y lo instala si es necesario"""
         self.console.print("         🔍 Verificando servicio zfs-auto-snapshot...")
         
         # Verificar si zfs-auto-snapshot está instalado
-        try:
-            self.system.run_command(['which', 'zfs-auto-snapshot'])
+        if _tool_exists('zfs-auto-snapshot'):
             self.console.print("         ✅ Servicio zfs-auto-snapshot encontrado", style="green")
             
             # Verificar que los cron jobs estén configurados
             self._verify_snapshot_cron_jobs()
             return True
-            
-        except subprocess.CalledProcessError:
-            self.console.print("         ❌ zfs-auto-snapshot no está instalado", style="red")
-            
-            if self.console.confirm("         ¿Instalar zfs-auto-snapshot automáticamente?", default=True):
-                return self._install_zfs_auto_snapshot()
-            else:
-                self.console.print("         ⚠️  Sin zfs-auto-snapshot, los snapshots automáticos no funcionarán", style="yellow")
-                self.console.print("         💡 Instala manualmente: apt install zfs-auto-snapshot", style="blue")
-                return False
+        
+        self.console.print("         ❌ zfs-auto-snapshot no está instalado", style="red")
+        
+        if self.console.confirm("         ¿Instalar zfs-auto-snapshot automáticamente?", default=True):
+            return self._install_zfs_auto_snapshot()
+        else:
+            self.console.print("         ⚠️  Sin zfs-auto-snapshot, los snapshots automáticos no funcionarán", style="yellow")
+            self.console.print("         💡 Instala manualmente: apt install zfs-auto-snapshot", style="blue")
+            return False
     
-    def _verify_snapshot_cron_jobs(self):
-        """Verifica que los cron jobs de snapshots estén activos"""
+    @functools.cached_property
+    def _snapshot_cron_jobs_active(self) -> List[str]:
+        """Frecuencias con cron job de zfs-auto-snapshot ejecutable (se comprueba una sola vez)"""
         cron_files = [
             '/etc/cron.hourly/zfs-auto-snapshot',
             '/etc/cron.daily/zfs-auto-snapshot', 
@@ -5222,9 +5570,17 @@ DRYRUN=false
         
         active_jobs = []
         for cron_file in cron_files:
-            if os.path.exists(cron_file) and os.access(cron_file, os.X_OK):
-                active_jobs.append(cron_file.split('/')[-2])  # hourly, daily, etc.
-        
+            # Un solo stat por archivo: existencia y bit de ejecución
+            try:
+                if os.stat(cron_file).st_mode & 0o111:
+                    active_jobs.append(cron_file.split('/')[-2])  # hourly, daily, etc.
+            except OSError:
+                pass
+        return active_jobs
+    
+    def _verify_snapshot_cron_jobs(self):
+        """Verifica que los cron jobs de snapshots estén activos"""
+        active_jobs = self._snapshot_cron_jobs_active
         if active_jobs:
             self.console.print(f"         ✅ Cron jobs activos: {', '.join(active_jobs)}", style="green")
         else:
@@ -5235,31 +5591,44 @@ DRYRUN=false
         self.console.print("         🔄 Instalando zfs-auto-snapshot...")
         
         try:
-            # Actualizar lista de paquetes
-            self.console.print("         📦 Actualizando lista de paquetes...")
-            self.system.run_command(['sudo', 'apt', 'update', '-qq'])
-            
-            # Instalar zfs-auto-snapshot
-            self.console.print("         📥 Instalando zfs-auto-snapshot...")
-            result = self.system.run_command(['sudo', 'apt', 'install', '-y', 'zfs-auto-snapshot'])
+            # Si el paquete ya está instalado no hace falta tocar apt
+            status = self.system.run_command(['dpkg-query', '-W', '-f=${Status}', 'zfs-auto-snapshot'],
+                                             check=False, use_sudo=False)
+            already_installed = status.stdout.strip() == 'install ok installed'
+            if already_installed:
+                self.console.print("         ✅ zfs-auto-snapshot ya estaba instalado", style="green")
+                result = status
+            else:
+                # Actualizar lista de paquetes solo si tiene más de una hora
+                if self.system.apt_lists_are_fresh():
+                    self.console.print("         📦 Lista de paquetes reciente, sin actualizar")
+                else:
+                    self.console.print("         📦 Actualizando lista de paquetes...")
+                    self.system.run_command(['sudo', 'apt-get', 'update'])
+                
+                # Instalar zfs-auto-snapshot
+                self.console.print("         📥 Instalando zfs-auto-snapshot...")
+                result = self.system.run_command(['sudo', 'apt-get', 'install', '-y', '--no-install-recommends',
+                                                  'zfs-auto-snapshot'])
             
             if result.returncode == 0:
-                self.console.print("         ✅ zfs-auto-snapshot instalado exitosamente", style="green")
+                if not already_installed:
+                    self.console.print("         ✅ zfs-auto-snapshot instalado exitosamente", style="green")
                 
-                # Verificar instalación
-                try:
-                    self.system.run_command(['which', 'zfs-auto-snapshot'])
+                # Verificar instalación (sin el resultado cacheado de antes de instalar)
+                _which.cache_clear()
+                self.__dict__.pop('_snapshot_cron_jobs_active', None)
+                if _tool_exists('zfs-auto-snapshot'):
                     self.console.print("         ✅ Instalación verificada", style="green")
                     self._verify_snapshot_cron_jobs()
                     return True
-                except subprocess.CalledProcessError:
-                    self.console.print("         ❌ Error verificando instalación", style="red")
-                    return False
+                self.console.print("         ❌ Error verificando instalación", style="red")
+                return False
             else:
                 self.console.print("         ❌ Error durante la instalación", style="red")
                 return False
                 
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"         ❌ Error instalando zfs-auto-snapshot: {e}", style="red")
             self.console.print("         💡 Instala manualmente: sudo apt install zfs-auto-snapshot", style="blue")
             return False
@@ -5270,7 +5639,6 @@ DRYRUN=false
         
         try:
             # Crear timestamp para el snapshot
-            import datetime
             timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
             snapshot_name = f"{dataset_name}@demo-{timestamp}"
             
@@ -5278,87 +5646,50 @@ DRYRUN=false
             self.system.run_command(['zfs', 'snapshot', snapshot_name])
             self.console.print(f"         ✅ Snapshot creado: {snapshot_name}", style="green")
             
-            # Verificar que se creó correctamente
+            # Verificar que se creó correctamente (la misma consulta trae la información a mostrar)
             try:
-                result = self.system.run_command(['zfs', 'list', '-t', 'snapshot', snapshot_name])
+                result = self.system.run_command(['zfs', 'list', '-t', 'snapshot', '-o', 'name,used,refer', snapshot_name])
                 if result.returncode == 0:
                     self.console.print("         ✅ Snapshot verificado correctamente", style="green")
                     
                     # Mostrar información del snapshot
-                    self._show_demo_snapshot_info(dataset_name, snapshot_name)
+                    self._show_demo_snapshot_info(dataset_name, snapshot_name, result.stdout)
                     
-            except subprocess.CalledProcessError:
+            except CalledProcessError:
                 self.console.print("         ⚠️  No se pudo verificar el snapshot", style="yellow")
                 
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"         ❌ Error creando snapshot de demostración: {e}", style="red")
     
-    def _show_demo_snapshot_info(self, dataset_name: str, snapshot_name: str):
-        """Muestra información del snapshot de demostración creado"""
+    def _show_demo_snapshot_info(self, dataset_name: str, snapshot_name: str, listing: str):
+        """Muestra información del snapshot de demostración creado (salida de 'zfs list' ya obtenida)"""
         self.console.print("         📊 Información del snapshot de demostración:", style="blue")
         
-        try:
-            # Obtener información del snapshot
-            result = self.system.run_command(['zfs', 'list', '-t', 'snapshot', '-o', 'name,used,refer', snapshot_name])
-            lines = result.stdout.strip().split('\n')
-            if len(lines) > 1:
-                self.console.print(f"         📸 {lines[1]}")
-            
-            # Mostrar cómo acceder al snapshot
-            pool_name = dataset_name.split('/')[0]
-            dataset_path = dataset_name.replace(pool_name, f"/{pool_name}")
-            snapshot_timestamp = snapshot_name.split('@')[1]
-            
-            self.console.print(f"         🔗 Acceso al snapshot:")
-            self.console.print(f"             • Ruta directa: {dataset_path}/.zfs/snapshot/{snapshot_timestamp}/")
-            self.console.print(f"             • Navegación: cd {dataset_path}/.zfs/snapshot/")
-            
-        except subprocess.CalledProcessError:
-            self.console.print("         ⚠️  No se pudo obtener información detallada", style="yellow")
+        lines = listing.strip().split('\n')
+        if len(lines) > 1:
+            self.console.print(f"         📸 {lines[1]}")
+        
+        # Mostrar cómo acceder al snapshot (montado en /pool/hijo...)
+        dataset_path = '/' + dataset_name
+        snapshot_timestamp = snapshot_name.split('@')[1]
+        
+        self.console.print(f"         🔗 Acceso al snapshot:")
+        self.console.print(f"             • Ruta directa: {dataset_path}/.zfs/snapshot/{snapshot_timestamp}/")
+        self.console.print(f"             • Navegación: cd {dataset_path}/.zfs/snapshot/")
     
     def _show_snapshot_access_methods(self, dataset_name: str):
         """MEJORA 4: Muestra métodos detallados para acceder a snapshots"""
-        pool_name = dataset_name.split('/')[0]
-        dataset_path = dataset_name.replace(pool_name, f"/{pool_name}")
+        dataset_path = '/' + dataset_name
         
         self.console.print("         🔗 Métodos de acceso a snapshots:", style="blue")
-        self.console.print("         ")
-        self.console.print("         📁 1. Acceso directo por navegación:")
-        self.console.print(f"            cd {dataset_path}/.zfs/snapshot/")
-        self.console.print("            ls -la                    # Ver todos los snapshots")
-        self.console.print("            cd auto-2024MMDD-HHMM/    # Entrar en snapshot específico")
-        self.console.print("            ")
-        self.console.print("         📁 2. Restaurar archivos específicos:")
-        self.console.print(f"            cp {dataset_path}/.zfs/snapshot/SNAPSHOT_NAME/archivo.txt {dataset_path}/")
-        self.console.print("            # Copia archivo desde snapshot a ubicación actual")
-        self.console.print("            ")
-        self.console.print("         📁 3. Explorar contenido de snapshots:")
-        self.console.print(f"            find {dataset_path}/.zfs/snapshot/ -name '*archivo*' -type f")
-        self.console.print("            # Busca archivos en todos los snapshots")
-        self.console.print("            ")
-        self.console.print("         📁 4. Comparar versiones:")
-        self.console.print(f"            diff {dataset_path}/archivo.txt {dataset_path}/.zfs/snapshot/SNAPSHOT/archivo.txt")
-        self.console.print("            # Compara archivo actual con versión en snapshot")
-        self.console.print("            ")
-        self.console.print("         💡 Los snapshots son de solo lectura y no ocupan espacio inicialmente")
-        self.console.print("         💡 Solo los cambios posteriores al snapshot consumen espacio adicional")
-    
-    def _configure_dataset_quota(self, dataset_name: str, suggested_quota: str):
-        """Configura cuota para un dataset específico"""
-        try:
-            self.system.run_command(['zfs', 'set', f'quota={suggested_quota}', dataset_name])
-            self.console.print(f"      💾 Cuota de {suggested_quota} configurada")
-        except subprocess.CalledProcessError:
-            self.console.print(f"      ⚠️  No se pudo configurar cuota de {suggested_quota}", style="yellow")
+        self.console.print(_SNAPSHOT_ACCESS_METHODS_TEMPLATE.format(dataset_path=dataset_path))
     
     def _create_btrfs_raid(self, raid_type: RAIDType, disks: List[Disk]):
         """Crea un RAID BTRFS"""
         self.console.print_panel("Configurando BTRFS RAID", title="🌿 BTRFS")
         
         # Verificar que BTRFS esté disponible
-        try:
-            self.system.run_command(['which', 'mkfs.btrfs'])
-        except subprocess.CalledProcessError:
+        if not _tool_exists('mkfs.btrfs'):
             self.console.print("❌ BTRFS no está disponible en el sistema", style="red")
             raise Exception("BTRFS no disponible")
         
@@ -5379,7 +5710,7 @@ DRYRUN=false
             raise Exception(f"Tipo de RAID no soportado: {raid_type}")
         
         # Mostrar advertencia para RAID experimentales
-        if raid_type in [RAIDType.BTRFS_RAID5, RAIDType.BTRFS_RAID6]:
+        if raid_type in _EXPERIMENTAL:
             self.console.print("⚠️  ADVERTENCIA: RAID 5/6 en BTRFS es experimental", style="yellow")
             if not self.console.confirm("¿Continuar con RAID experimental?", default=False):
                 raise Exception("Operación cancelada por el usuario")
@@ -5413,7 +5744,7 @@ DRYRUN=false
             self.system.run_command(['mount', f'/dev/{disks[0].name}', mount_point])
             self.console.print(f"✅ Montado en {mount_point}", style="green")
             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error creando filesystem BTRFS: {e}", style="red")
             raise
     
@@ -5425,17 +5756,15 @@ DRYRUN=false
         try:
             self.system.run_command(['btrfs', 'property', 'set', mount_point, 'compression', 'lzo'])
             self.console.print("   ✅ Compresión LZO habilitada", style="green")
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"   ⚠️  No se pudo habilitar compresión: {e}", style="yellow")
         
         # Mostrar información del filesystem
         try:
             result = self.system.run_command(['btrfs', 'filesystem', 'show', mount_point])
-            self.console.print("📊 Información del filesystem:")
-            for line in result.stdout.split('\n'):
-                if line.strip():
-                    self.console.print(f"   {line}")
-        except subprocess.CalledProcessError:
+            self.console.print("📊 Información del filesystem:\n" +
+                               "\n".join(f"   {line}" for line in result.stdout.splitlines() if line.strip()))
+        except CalledProcessError:
             pass
     
     def _configure_auto_mount(self, fs_type: FilesystemType, raid_type: RAIDType, disks: List[Disk]):
@@ -5472,27 +5801,30 @@ DRYRUN=false
             ('zfs.target', 'Target principal de ZFS')
         ]
         
-        for service, description in zfs_services:
-            if self.system.run_command_safe(['systemctl', 'enable', service]):
+        # Un solo 'systemctl enable' para todos; si falla, uno a uno para saber cuál falla
+        units = [service for service, _ in zfs_services]
+        if self.system.run_command_safe(['systemctl', 'enable', *units]):
+            enabled = [True] * len(units)
+        else:
+            enabled = [self.system.run_command_safe(['systemctl', 'enable', unit]) for unit in units]
+        
+        for (service, description), ok in zip(zfs_services, enabled):
+            if ok:
                 self.console.print(f"   ✅ {service} habilitado - {description}")
             else:
                 self.console.print(f"   ⚠️  Error con {service} - {description}", style="yellow")
         
         # Verificar que los servicios estén activos
         self.console.print("\n🔍 Verificando estado de servicios ZFS...")
+        statuses = self._get_units_enabled_state(units)
         for service, description in zfs_services:
-            try:
-                result = self.system.run_command(['systemctl', 'is-enabled', service], check=False)
-                if result.returncode == 0:
-                    status = result.stdout.strip()
-                    if status == 'enabled':
-                        self.console.print(f"   ✅ {service}: {status}")
-                    else:
-                        self.console.print(f"   ⚠️  {service}: {status}", style="yellow")
-                else:
-                    self.console.print(f"   ❌ {service}: no disponible", style="red")
-            except subprocess.CalledProcessError:
-                self.console.print(f"   ❌ {service}: error verificando", style="red")
+            status = statuses.get(service)
+            if status is None:
+                self.console.print(f"   ❌ {service}: no disponible", style="red")
+            elif status == 'enabled':
+                self.console.print(f"   ✅ {service}: {status}")
+            else:
+                self.console.print(f"   ⚠️  {service}: {status}", style="yellow")
         
         # Información adicional sobre montaje ZFS
         self.console.print("\n📚 Información sobre montaje ZFS:")
@@ -5516,17 +5848,10 @@ DRYRUN=false
             uuid = result.stdout.strip() if result.returncode == 0 else None
             
             if not uuid:
-                # Si no hay UUID, el filesystem podría no estar montado aún
+                # Si no hay UUID (caché de blkid sin actualizar), buscarlo en sysfs: cada
+                # filesystem BTRFS registrado es /sys/fs/btrfs/<uuid>/devices/<disco>
                 self.console.print("⚠️  No se encontró UUID, intentando detectar filesystem BTRFS...", style="yellow")
-                try:
-                    # Usar btrfs filesystem show para obtener UUID
-                    result = self.system.run_command(['btrfs', 'filesystem', 'show', device_path])
-                    for line in result.stdout.split('\n'):
-                        if 'uuid:' in line:
-                            uuid = line.split('uuid:')[1].strip()
-                            break
-                except subprocess.CalledProcessError:
-                    pass
+                uuid = self._get_btrfs_uuid_from_sysfs(disks[0].name)
             
             if not uuid:
                 raise Exception("No se pudo obtener UUID del filesystem BTRFS")
@@ -5542,30 +5867,26 @@ DRYRUN=false
                 else:
                     self.console.print(f"📁 Usando punto de montaje por defecto: {mount_point}")
                     # Crear directorio si no existe
-                    if self.system.run_command_safe(['mkdir', '-p', mount_point]):
+                    if self.system.make_dirs(mount_point):
                         self.console.print(f"   ✅ Directorio {mount_point} creado")
-            except subprocess.CalledProcessError:
+            except CalledProcessError:
                 self.console.print(f"📁 Usando punto de montaje por defecto: {mount_point}")
-                self.system.run_command_safe(['mkdir', '-p', mount_point])
+                self.system.make_dirs(mount_point)
             
             # Crear entrada fstab optimizada para BTRFS
-            fstab_options = []
-            fstab_options.append("defaults")
-            fstab_options.append("compress=zstd")  # Compresión moderna y eficiente
-            fstab_options.append("noatime")        # Mejor rendimiento
-            fstab_options.append("space_cache=v2") # Cache de espacio v2
-            
-            fstab_entry = f"UUID={uuid} {mount_point} btrfs {','.join(fstab_options)} 0 2\n"
+            fstab_entry = f"UUID={uuid} {mount_point} btrfs {_BTRFS_FSTAB_OPTS} 0 2\n"
             
             # Crear backup de fstab
             if self.system.run_command_safe(['cp', '/etc/fstab', '/etc/fstab.backup']):
                 self.console.print("   ✅ Backup de /etc/fstab creado")
             
             # Verificar si ya existe una entrada para este UUID
+            # (una sola lectura; el nuevo contenido se construye en memoria y se escribe una vez)
             try:
                 with open('/etc/fstab', 'r') as f:
                     fstab_content = f.read()
                 
+                replaced = False
                 if uuid in fstab_content:
                     self.console.print("⚠️  Ya existe una entrada para este UUID en fstab", style="yellow")
                     if not self.console.confirm("¿Sobrescribir entrada existente?", default=False):
@@ -5573,24 +5894,22 @@ DRYRUN=false
                         return
                     
                     # Remover entrada existente
-                    lines = fstab_content.split('\n')
-                    new_lines = [line for line in lines if uuid not in line]
-                    fstab_content = '\n'.join(new_lines)
-                    
-                    with open('/etc/fstab', 'w') as f:
-                        f.write(fstab_content)
-                    
-                    self.console.print("   🔄 Entrada anterior removida")
+                    # Una única pasada de re en lugar de split + filtro + join
+                    fstab_content = re.sub(rf'^[^\n]*{re.escape(uuid)}[^\n]*\n?', '', fstab_content, flags=re.M)
+                    replaced = True
                 
                 # Añadir nueva entrada a fstab
-                with open('/etc/fstab', 'a') as f:
-                    f.write(f"\n# BTRFS RAID configurado por raid_manager.py - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(fstab_entry)
+                fstab_content += (f"\n# BTRFS RAID configurado por raid_manager.py - {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                                  f"{fstab_entry}")
+                if not self.system.write_file('/etc/fstab', fstab_content):
+                    raise Exception("no se pudo escribir /etc/fstab")
                 
+                if replaced:
+                    self.console.print("   🔄 Entrada anterior removida")
                 self.console.print("✅ Entrada añadida a /etc/fstab", style="green")
                 self.console.print(f"   📄 UUID: {uuid}")
                 self.console.print(f"   📁 Punto de montaje: {mount_point}")
-                self.console.print(f"   ⚙️  Opciones: {','.join(fstab_options)}")
+                self.console.print(f"   ⚙️  Opciones: {_BTRFS_FSTAB_OPTS}")
                 
                 # Verificar que el montaje funciona
                 if self.console.confirm("¿Probar montaje automático?", default=True):
@@ -5606,15 +5925,29 @@ DRYRUN=false
             self.console.print(f"❌ Error configurando fstab: {e}", style="red")
             self.console.print("💡 Puedes configurar el montaje manualmente después", style="blue")
     
+    def _get_btrfs_uuid_from_sysfs(self, disk_name: str) -> Optional[str]:
+        """Obtiene el UUID del filesystem BTRFS al que pertenece un disco leyendo /sys/fs/btrfs"""
+        try:
+            fsids = os.listdir('/sys/fs/btrfs')
+        except OSError:
+            return None
+        for fsid in fsids:
+            if os.path.exists(f'/sys/fs/btrfs/{fsid}/devices/{disk_name}'):
+                return fsid
+        return None
+    
     def _show_final_summary(self, fs_type: FilesystemType, raid_type: RAIDType, disks: List[Disk]):
         """Muestra el resumen final de la configuración"""
         self.console.print_panel("¡RAID configurado exitosamente!", title="🎉 ¡Completado!")
         
         if RICH_AVAILABLE:
             # Crear tabla de resumen final
+            # Anchos fijos: rich no necesita medir el contenido de cada celda
+            # (20 de la primera columna + 7 de bordes y relleno)
             summary_table = Table(title="📋 Configuración Final", show_header=False)
-            summary_table.add_column("Aspecto", style="bold cyan", width=20)
-            summary_table.add_column("Detalle", style="white")
+            summary_table.add_column("Aspecto", style="bold cyan", width=20, no_wrap=True)
+            summary_table.add_column("Detalle", style="white", width=max(self.console.console.width - 27, 20),
+                                     overflow="fold")
             
             summary_table.add_row("Filesystem", fs_type.value.upper())
             summary_table.add_row("Tipo RAID", raid_type.value)
@@ -5653,8 +5986,7 @@ DRYRUN=false
                 "btrfs scrub start <mount> - Iniciar verificación de integridad"
             ]
         
-        for cmd in useful_commands:
-            self.console.print(f"   • {cmd}", style="blue")
+        self.console.print("\n".join(f"   • {cmd}" for cmd in useful_commands), style="blue")
         
         # Advertencias finales
         warnings = [
@@ -5664,8 +5996,7 @@ DRYRUN=false
         ]
         
         self.console.print("\n⚠️  Recomendaciones importantes:", style="bold yellow")
-        for warning in warnings:
-            self.console.print(f"   {warning}", style="yellow")
+        self.console.print("\n".join(f"   {warning}" for warning in warnings), style="yellow")
     
     def _configure_cache_devices(self, pool_name: str, pool_disks: List[Disk]):
         """Configura dispositivos de cache (SLOG/L2ARC) para el pool ZFS"""
@@ -5690,23 +6021,26 @@ DRYRUN=false
             )
             return
         
+        # Preguntar primero: quien no quiere cache no paga el renderizado de la información
+        if not self.console.confirm("¿Deseas configurar dispositivos de cache para mejorar el rendimiento?", default=True):
+            self.console.print("⏭️  Saltando configuración de cache devices", style="yellow")
+            return
+        
         # Mostrar información sobre cache devices
         self._show_cache_info()
         
         # Mostrar dispositivos disponibles
         self._show_available_cache_devices(cache_devices)
         
-        # Preguntar si quiere configurar cache devices
-        if not self.console.confirm("¿Deseas configurar dispositivos de cache para mejorar el rendimiento?", default=True):
-            self.console.print("⏭️  Saltando configuración de cache devices", style="yellow")
-            return
-        
         # Menú de opciones de cache
         self._show_cache_menu(pool_name, cache_devices)
     
     def _detect_cache_devices(self, pool_disks: List[Disk]) -> Dict[str, List[Disk]]:
         """Detecta dispositivos disponibles para cache (NVMe/SSD)"""
-        all_disks = self.disk_manager.detect_disks()
+        # Reutilizar la detección del asistente: los discos ajenos al pool no han cambiado
+        if self._cached_disks is None:
+            self._cached_disks = self.disk_manager.detect_disks()
+        all_disks = self._cached_disks
         pool_disk_names = {disk.name for disk in pool_disks}
         
         cache_devices = {
@@ -5715,45 +6049,33 @@ DRYRUN=false
             'other': []
         }
         
-        for disk in all_disks:
-            # Excluir discos del sistema y discos usados en el pool principal
-            if disk.is_system or disk.name in pool_disk_names:
-                continue
-            
-            # Clasificar por tipo
+        # Excluir discos del sistema y discos usados en el pool principal antes de sondear nada
+        candidates = [disk for disk in all_disks if not disk.is_system and disk.name not in pool_disk_names]
+        if not candidates:
+            return cache_devices
+        
+        # Tipo de todos los candidatos de una vez en lugar de un lsblk por disco
+        rotational_map = self.system.get_rotational_map([disk.name for disk in candidates])
+        
+        for disk in candidates:
+            # Clasificar por tipo una sola vez; el resto del flujo lee disk.cache_class
             if disk.name.startswith('nvme'):
-                cache_devices['nvme'].append(disk)
-            elif self._is_ssd(disk):
-                cache_devices['ssd'].append(disk)
+                disk.cache_class = 'nvme'
+            elif self._is_ssd(disk, rotational_map):
+                disk.cache_class = 'ssd'
             else:
-                cache_devices['other'].append(disk)
+                disk.cache_class = 'hdd'
+            cache_devices['other' if disk.cache_class == 'hdd' else disk.cache_class].append(disk)
         
         return cache_devices
     
-    def _is_ssd(self, disk: Disk) -> bool:
-        """Verifica si un disco es SSD"""
-        try:
-            # Verificar ROTA (rotational) - 0 significa SSD
-            result = self.system.run_command(['lsblk', '-dpno', 'ROTA', f'/dev/{disk.name}'])
-            return result.stdout.strip() == '0'
-        except subprocess.CalledProcessError:
-            return False
+    def _is_ssd(self, disk: Disk, rotational_map: Dict[str, bool]) -> bool:
+        """Verifica si un disco es SSD (no rotacional) según el mapa de get_rotational_map"""
+        return rotational_map.get(disk.name) is False
     
     def _show_cache_info(self):
         """Muestra información sobre cache devices"""
-        info_text = (
-            "🚀 L2ARC (Level 2 Adaptive Replacement Cache):\n"
-            "   • Cache de segundo nivel para lecturas frecuentes\n"
-            "   • Ideal: SSD rápido (NVMe > SATA SSD)\n"
-            "   • Mejora rendimiento de lectura en datasets accedidos frecuentemente\n"
-            "   • No es crítico - si falla, el pool sigue funcionando\n\n"
-            "📝 SLOG (Separate Intent Log):\n"
-            "   • Log de transacciones para escrituras síncronas\n"
-            "   • Ideal: SSD con baja latencia (NVMe recomendado)\n"
-            "   • Mejora rendimiento de escrituras síncronas (bases de datos, VMs)\n"
-            "   • Crítico para integridad - usar dispositivos confiables"
-        )
-        self.console.print_panel(info_text, title="💡 Información sobre Cache Devices")
+        self.console.print_panel(_CACHE_INFO_TEXT, title="💡 Información sobre Cache Devices")
     
     def _show_available_cache_devices(self, cache_devices: Dict[str, List[Disk]]):
         """Muestra dispositivos disponibles para cache"""
@@ -5765,43 +6087,23 @@ DRYRUN=false
             table.add_column("Modelo", style="blue")
             table.add_column("Recomendación", style="magenta")
             
-            # Dispositivos NVMe
-            for disk in cache_devices['nvme']:
-                table.add_row(
-                    "🚀 NVMe", 
-                    disk.name, 
-                    disk.size_human, 
-                    disk.model,
-                    "✅ EXCELENTE"
-                )
-            
-            # Dispositivos SSD
-            for disk in cache_devices['ssd']:
-                table.add_row(
-                    "💾 SSD", 
-                    disk.name, 
-                    disk.size_human, 
-                    disk.model,
-                    "⚠️ ACEPTABLE"
-                )
-            
-            # Otros dispositivos (no recomendados)
-            for disk in cache_devices['other']:
-                table.add_row(
-                    "🐌 HDD", 
-                    disk.name, 
-                    disk.size_human, 
-                    disk.model,
-                    "❌ NO RECOMENDADO"
-                )
+            # Todas las filas en una sola pasada (NVMe, SSD y otros no recomendados, en ese orden)
+            rows = [(icon, disk.name, disk.size_human, disk.model, recommendation)
+                    for group, icon, recommendation in (('nvme', "🚀 NVMe", "✅ EXCELENTE"),
+                                                        ('ssd', "💾 SSD", "⚠️ ACEPTABLE"),
+                                                        ('other', "🐌 HDD", "❌ NO RECOMENDADO"))
+                    for disk in cache_devices[group]]
+            for row in rows:
+                table.add_row(*row)
             
             self.console.console.print(table)
         else:
-            print("\n💾 Dispositivos Disponibles para Cache:")
-            for disk in cache_devices['nvme']:
-                print(f"  🚀 {disk.name} - {disk.size_human} - {disk.model} (NVMe - EXCELENTE)")
-            for disk in cache_devices['ssd']:
-                print(f"  💾 {disk.name} - {disk.size_human} - {disk.model} (SSD - ACEPTABLE)")
+            lines = ["\n💾 Dispositivos Disponibles para Cache:"]
+            lines.extend(f"  🚀 {disk.name} - {disk.size_human} - {disk.model} (NVMe - EXCELENTE)"
+                         for disk in cache_devices['nvme'])
+            lines.extend(f"  💾 {disk.name} - {disk.size_human} - {disk.model} (SSD - ACEPTABLE)"
+                         for disk in cache_devices['ssd'])
+            print('\n'.join(lines))
     
     def _show_cache_menu(self, pool_name: str, cache_devices: Dict[str, List[Disk]]):
         """Muestra menú de opciones de cache"""
@@ -5851,7 +6153,9 @@ DRYRUN=false
             self.console.print(f"📦 Agregando {device.name} como L2ARC al pool {pool_name}...")
             self.system.run_command(['zpool', 'add', pool_name, 'cache', f'/dev/{device.name}'])
             self.console.print("✅ L2ARC configurado exitosamente", style="green")
-        except subprocess.CalledProcessError as e:
+            self._apply_l2arc_tunables()
+            self._apply_workload_profile(pool_name)
+        except CalledProcessError as e:
             self.console.print(f"❌ Error configurando L2ARC: {e}", style="red")
     
     def _setup_slog_only(self, pool_name: str, cache_devices: Dict[str, List[Disk]]):
@@ -5872,7 +6176,7 @@ DRYRUN=false
             self.console.print(f"📦 Agregando {device.name} como SLOG al pool {pool_name}...")
             self.system.run_command(['zpool', 'add', pool_name, 'log', f'/dev/{device.name}'])
             self.console.print("✅ SLOG configurado exitosamente", style="green")
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error configurando SLOG: {e}", style="red")
     
     def _setup_separate_cache_devices(self, pool_name: str, cache_devices: Dict[str, List[Disk]]):
@@ -5908,10 +6212,13 @@ DRYRUN=false
         # Configurar L2ARC y SLOG
         try:
             self.console.print(f"📦 Configurando cache devices...")
-            self.system.run_command(['zpool', 'add', pool_name, 'cache', f'/dev/{l2arc_device.name}'])
-            self.system.run_command(['zpool', 'add', pool_name, 'log', f'/dev/{slog_device.name}'])
+            # Ambos vdevs en un solo 'zpool add': una única actualización de la configuración del pool
+            self.system.run_command(['zpool', 'add', pool_name,
+                                     'log', f'/dev/{slog_device.name}', 'cache', f'/dev/{l2arc_device.name}'])
             self.console.print("✅ L2ARC y SLOG configurados exitosamente", style="green")
-        except subprocess.CalledProcessError as e:
+            self._apply_l2arc_tunables()
+            self._apply_workload_profile(pool_name)
+        except CalledProcessError as e:
             self.console.print(f"❌ Error configurando cache devices: {e}", style="red")
     
     def _setup_partitioned_cache(self, pool_name: str, cache_devices: Dict[str, List[Disk]]):
@@ -5936,64 +6243,122 @@ DRYRUN=false
         try:
             self.console.print(f"🔧 Particionando {device.name}...")
             
-            # Calcular tamaños (SLOG: 10% o máximo 32GB, resto para L2ARC)
+            # Calcular tamaños: el SLOG solo guarda las transacciones pendientes (dos grupos
+            # de datos sucios), entre 4 y 16GB y nunca más de un cuarto del dispositivo;
+            # el resto para L2ARC
             total_size = device.size
-            slog_size = min(int(total_size * 0.1), 32 * 1024**3)  # 10% o 32GB máximo
-            
-            # Limpiar tabla de particiones primero
-            self.console.print("   • Limpiando tabla de particiones...")
-            self.system.run_command(['sgdisk', '--zap-all', f'/dev/{device.name}'])
-            
-            # Crear nueva tabla GPT y particiones
-            self.console.print("   • Creando particiones...")
-            # Crear SLOG (partición 1)
-            self.system.run_command(['sgdisk', '-n', f'1:0:+{slog_size // 512}', f'/dev/{device.name}'])
-            # Crear L2ARC (partición 2 - resto del espacio)
-            self.system.run_command(['sgdisk', '-n', '2:0:0', f'/dev/{device.name}'])
-            
-            # Establecer etiquetas para identificar las particiones
-            self.system.run_command(['sgdisk', '-c', '1:ZFS-SLOG', f'/dev/{device.name}'])
-            self.system.run_command(['sgdisk', '-c', '2:ZFS-L2ARC', f'/dev/{device.name}'])
+            dirty_data_max = self._estimate_txg_write_bytes()
+            if dirty_data_max:
+                slog_size = min(max(4 * 1024**3, dirty_data_max * 2), 16 * 1024**3)
+            else:
+                slog_size = 8 * 1024**3
+            slog_size = min(slog_size, total_size // 4)
+            self.console.print(f"   • SLOG de {slog_size / 1024**3:.1f}GB ajustado a los datos sucios "
+                               f"que ZFS acumula por transacción")
+            
+            # Limpiar la tabla, crear SLOG (partición 1) y L2ARC (partición 2, resto del espacio)
+            # y etiquetarlas en una sola invocación: una única escritura de la GPT
+            self.console.print("   • Creando tabla GPT y particiones...")
+            self.system.run_command(['sgdisk', '--zap-all',
+                                     '-n', f'1:0:+{slog_size // 512}', '-n', '2:0:0',
+                                     '-c', '1:ZFS-SLOG', '-c', '2:ZFS-L2ARC',
+                                     f'/dev/{device.name}'])
             
             # Notificar al kernel sobre cambios en particiones
             self.console.print("   • Actualizando tabla de particiones...")
             self.system.run_command(['partprobe', f'/dev/{device.name}'])
-            self.system.run_command(['udevadm', 'settle'])
             
-            # Determinar nombres de particiones según el tipo de dispositivo
-            if device.name.startswith('nvme'):
-                slog_partition = f"{device.name}p1"
-                l2arc_partition = f"{device.name}p2"
-            else:
-                slog_partition = f"{device.name}1"
-                l2arc_partition = f"{device.name}2"
+            slog_partition = device.partition_name(1)
+            l2arc_partition = device.partition_name(2)
             
-            # Esperar a que las particiones estén disponibles
+            # Esperar a que udev cree los nodos: settle retorna en cuanto existe el nodo
+            # (sin sondear cada segundo)
             self.console.print("   • Esperando a que las particiones estén disponibles...")
-            import time
             max_wait = 10
-            for i in range(max_wait):
-                if (Path(f'/dev/{slog_partition}').exists() and 
-                    Path(f'/dev/{l2arc_partition}').exists()):
-                    break
-                time.sleep(1)
-                if i == max_wait - 1:
-                    raise Exception(f"Las particiones no están disponibles después de {max_wait} segundos")
+            for partition in (slog_partition, l2arc_partition):
+                self.system.run_command(['udevadm', 'settle', f'--timeout={max_wait}',
+                                         f'--exit-if-exists=/dev/{partition}'], check=False)
+            if not (Path(f'/dev/{slog_partition}').exists() and Path(f'/dev/{l2arc_partition}').exists()):
+                raise Exception(f"Las particiones no están disponibles después de {max_wait} segundos")
             
             # Agregar particiones al pool
             self.console.print("📦 Agregando particiones al pool...")
-            self.system.run_command(['zpool', 'add', pool_name, 'log', f'/dev/{slog_partition}'])
-            self.system.run_command(['zpool', 'add', pool_name, 'cache', f'/dev/{l2arc_partition}'])
+            # Ambos vdevs en un solo 'zpool add': una única actualización de la configuración del pool
+            self.system.run_command(['zpool', 'add', pool_name,
+                                     'log', f'/dev/{slog_partition}', 'cache', f'/dev/{l2arc_partition}'])
             
             self.console.print("✅ Cache particionado configurado exitosamente", style="green")
             self.console.print(f"   📝 SLOG: {slog_partition} ({slog_size // (1024**3)}GB)")
             self.console.print(f"   🚀 L2ARC: {l2arc_partition} ({(total_size - slog_size) // (1024**3)}GB)")
+            self._apply_l2arc_tunables()
+            self._apply_workload_profile(pool_name)
             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error configurando cache particionado: {e}", style="red")
         except Exception as e:
             self.console.print(f"❌ Error configurando cache particionado: {e}", style="red")
     
+    def _apply_workload_profile(self, pool_name: str):
+        """Ajusta secondarycache del pool al caso de uso elegido una vez añadido el L2ARC"""
+        properties = _L2ARC_WORKLOAD_PROPERTIES.get(self._zfs_use_case)
+        if not properties:
+            return
+        
+        for (prop, value, description), applied in zip(properties, self._set_zfs_properties(pool_name, properties)):
+            if applied:
+                self.console.print(f"   ✅ {description}")
+    
+    def _estimate_txg_write_bytes(self) -> Optional[int]:
+        """Máximo de datos sucios por grupo de transacciones (zfs_dirty_data_max), None si no se puede leer"""
+        try:
+            with open('/sys/module/zfs/parameters/zfs_dirty_data_max') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+    
+    def _apply_l2arc_tunables(self):
+        """Aplica los parámetros de L2ARC en caliente y los persiste en /etc/modprobe.d/zfs.conf"""
+        self.console.print("\n⚙️  Ajustando parámetros de L2ARC...")
+        tunables = dict(_L2ARC_TUNABLES)
+        if self.console.confirm("¿El pool tendrá sobre todo acceso a metadatos (muchos archivos pequeños)?", default=False):
+            tunables['l2arc_mfuonly'] = '2'  # Todos los metadatos (MRU y MFU), pero solo datos MFU al L2ARC
+        
+        config_file = '/etc/modprobe.d/zfs.conf'
+        try:
+            with open(config_file) as f:
+                config_content = f.read()
+        except OSError:
+            config_content = ''
+        
+        # Los valores ya configurados (p. ej. los de NVMe del ajuste del ARC) tienen prioridad
+        configured = {}
+        for line in config_content.splitlines():
+            fields = line.split()
+            if fields[:2] == ['options', 'zfs']:
+                configured.update(option.partition('=')[::2] for option in fields[2:])
+        missing = {param: value for param, value in tunables.items() if param not in configured}
+        tunables.update((param, configured[param]) for param in tunables if param in configured)
+        
+        # Aplicar en caliente si el módulo está cargado
+        applied = 0
+        for param, value in tunables.items():
+            param_path = f'/sys/module/zfs/parameters/{param}'
+            if os.path.exists(param_path) and self.system.write_file(param_path, value, atomic=False):
+                applied += 1
+        if applied:
+            self.console.print(f"   ✅ {applied} parámetros aplicados inmediatamente")
+        
+        # Persistir los que falten para que sobrevivan al reinicio
+        if missing:
+            if config_content and not config_content.endswith('\n'):
+                config_content += '\n'
+            config_content += "# Parámetros de L2ARC - Configurado por raid_manager.py\n"
+            config_content += ''.join(f"options zfs {param}={value}\n" for param, value in missing.items())
+            if self.system.write_file(config_file, config_content):
+                self.console.print(f"   ✅ Parámetros guardados en {config_file}")
+            else:
+                self.console.print(f"   ⚠️  No se pudo escribir {config_file}", style="yellow")
+    
     def _select_cache_device(self, cache_devices: Dict[str, List[Disk]], purpose: str) -> Optional[Disk]:
         """Selecciona un dispositivo para cache"""
         available_devices = cache_devices['nvme'] + cache_devices['ssd']
@@ -6004,7 +6369,7 @@ DRYRUN=false
         
         if len(available_devices) == 1:
             device = available_devices[0]
-            device_type = "NVMe" if device.name.startswith('nvme') else "SSD"
+            device_type = "NVMe" if device.cache_class == 'nvme' else "SSD"
             if self.console.confirm(f"¿Usar {device.name} ({device.size_human} {device_type}) para {purpose}?", default=True):
                 return device
             return None
@@ -6012,7 +6377,7 @@ DRYRUN=false
         # Mostrar opciones
         self.console.print(f"\n💾 Dispositivos disponibles para {purpose}:")
         for i, device in enumerate(available_devices, 1):
-            device_type = "🚀 NVMe" if device.name.startswith('nvme') else "💾 SSD"
+            device_type = "🚀 NVMe" if device.cache_class == 'nvme' else "💾 SSD"
             self.console.print(f"   {i}. {device_type} {device.name} - {device.size_human} - {device.model}")
         
         while True:
@@ -6050,25 +6415,27 @@ DRYRUN=false
         # Limpiar dispositivo
         try:
             self.console.print(f"🧹 Limpiando dispositivo {device.name}...")
+            self._cached_disks = None  # Se va a modificar: invalidar la detección
             
-            # Desmontar particiones si están montadas
+            # Desmontar particiones si están montadas (un solo umount para todas)
             if device.mount_points:
-                for mount_point in device.mount_points:
-                    try:
-                        self.system.run_command(['umount', mount_point])
-                    except subprocess.CalledProcessError:
-                        pass
+                self.system.run_command(['umount', *device.mount_points], check=False)
             
-            # Limpiar firmas de filesystem
-            self.system.run_command(['wipefs', '-a', f'/dev/{device.name}'])
-            
-            # Limpiar tabla de particiones
-            self.system.run_command(['sgdisk', '-Z', f'/dev/{device.name}'])
+            # En SSD/NVMe un único discard invalida firmas y tabla de particiones y además
+            # libera los bloques en la FTL; si no está soportado, limpieza clásica
+            discarded = (device.cache_class in ('nvme', 'ssd') and
+                         self.system.run_command_safe(['blkdiscard', '-f', f'/dev/{device.name}']))
+            if not discarded:
+                # Limpiar firmas de filesystem
+                self.system.run_command(['wipefs', '-a', f'/dev/{device.name}'])
+                
+                # Limpiar tabla de particiones
+                self.system.run_command(['sgdisk', '-Z', f'/dev/{device.name}'])
             
             self.console.print(f"✅ Dispositivo {device.name} preparado", style="green")
             return True
             
-        except subprocess.CalledProcessError as e:
+        except CalledProcessError as e:
             self.console.print(f"❌ Error preparando dispositivo: {e}", style="red")
             return False
 
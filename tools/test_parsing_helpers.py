@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test de los helpers de parseo y formato (tamaños, nombres de partición y zpool status)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from raid_manager import RAIDManager, Disk, _format_size
+from unittest.mock import MagicMock
+
+ZPOOL_STATUS_SAMPLE = """  pool: tank
+ state: ONLINE
+config:
+
+	NAME        STATE     READ WRITE CKSUM
+	tank        ONLINE       0     0     0
+	  mirror-0  ONLINE       0     0     0
+	    sda     ONLINE       0     0     0
+	    sdb     ONLINE       0     0     0
+
+errors: No known data errors
+
+  pool: backup
+ state: DEGRADED
+config:
+
+	NAME        STATE     READ WRITE CKSUM
+	backup      DEGRADED     0     0     0
+	  sdc       UNAVAIL      0     0     0
+
+errors: No known data errors
+"""
+
+def test_format_size():
+    """Verifica los límites entre unidades y que los valores no numéricos pasan tal cual"""
+    print("\n📏 Probando _format_size...")
+
+    cases = [
+        (0, "0.0 B"),
+        (1023, "1023.0 B"),
+        (1024, "1.0 KB"),
+        ("1048576", "1.0 MB"),
+        (1024**5, "1.0 PB"),
+        (1024**6, "1024.0 PB"),
+        ('-', '-'),
+        (None, 'None'),
+    ]
+    for value, expected in cases:
+        result = _format_size(value)
+        assert result == expected, f"_format_size({value!r}) = {result!r}, esperado {expected!r}"
+        print(f"   ✅ {value!r} → {result}")
+
+def test_partition_name():
+    """Verifica el sufijo 'p' en discos cuyo nombre acaba en dígito"""
+    print("\n💽 Probando Disk.partition_name...")
+
+    cases = [
+        ('nvme0n1', 1, 'nvme0n1p1'),
+        ('mmcblk0', 2, 'mmcblk0p2'),
+        ('sda', 1, 'sda1'),
+    ]
+    for name, number, expected in cases:
+        disk = Disk(name=name, size=0, model='', serial='', sector_size=512)
+        result = disk.partition_name(number)
+        assert result == expected, f"{name}.partition_name({number}) = {result!r}, esperado {expected!r}"
+        print(f"   ✅ {name} + {number} → {result}")
+
+def test_zpool_status_by_pool():
+    """Verifica que un 'zpool status' con varios pools se parte por pool"""
+    print("\n🏊 Probando _get_zpool_status_by_pool...")
+
+    # Sin __init__: solo hace falta un SystemManager simulado que devuelva la muestra
+    raid_manager = RAIDManager.__new__(RAIDManager)
+    raid_manager.system = MagicMock()
+    raid_manager.system.run_command.return_value = MagicMock(stdout=ZPOOL_STATUS_SAMPLE)
+
+    status = raid_manager._get_zpool_status_by_pool()
+    assert list(status) == ['tank', 'backup'], f"Pools inesperados: {list(status)}"
+    assert any('mirror-0' in line for line in status['tank'])
+    assert not any('sdc' in line for line in status['tank'])
+    assert any('UNAVAIL' in line for line in status['backup'])
+    assert not any('sda' in line for line in status['backup'])
+    print(f"   ✅ tank: {len(status['tank'])} líneas, backup: {len(status['backup'])} líneas")
+
+if __name__ == "__main__":
+    test_format_size()
+    test_partition_name()
+    test_zpool_status_by_pool()
+    print("\n✅ Todos los helpers de parseo funcionan correctamente")